@@ -0,0 +1,103 @@
+import os
+import random
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from benchmarks.common import Measure, Report
+
+"""
+Session archive: compression ratio and throughput of the delta + zigzag +
+varint + zlib blocks against zlib on the raw int32 samples, at zlib levels
+1 and 6, and the cost of reading a plot's worth of samples at a random
+position.
+
+The stream is what the scale sends while weighing, like RealTimeSender in
+testing: an empty basket, then an item whose weight is held with +-2 counts
+of noise for a few thousand samples, and so on.
+
+    py -m benchmarks.bench_archive
+"""
+
+SAMPLES = 1 << 24  # 64 MB of int32
+READ = 2000  # samples per random read
+
+
+def Weighing(n: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    samples = np.empty(n, np.int32)
+    i, weight = 0, 0
+    while i < n:
+        hold = int(rng.integers(200, 5000))
+        weight = 0 if weight else int(rng.integers(5, 950))
+        stop = min(i + hold, n)
+        samples[i:stop] = weight + rng.integers(-2, 2, stop - i)
+        i = stop
+    return samples
+
+
+def Throughput(nbytes: int, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return round(nbytes / (time.perf_counter() - start) / 1e6, 1)
+
+
+def Archive(samples: np.ndarray, level: int) -> dict:
+    from wac.archive import ArchiveReader, ArchiveWriter
+
+    path = os.path.join(tempfile.mkdtemp(), "session.wacz")
+
+    def Write():
+        writer = ArchiveWriter(path, level=level)
+        writer.Append(samples)
+        writer.Close()
+
+    encode = Throughput(samples.nbytes, Write)
+    reader = ArchiveReader(path)
+    decode = Throughput(samples.nbytes, reader.Read)
+    assert np.array_equal(reader.Read(), samples)
+
+    def Random():
+        start = random.randint(0, len(samples) - READ)
+        reader.Read(start, start + READ)
+
+    read = Measure(Random, 200)
+    reader.Close()
+    return {
+        "ratio": round(samples.nbytes / os.path.getsize(path), 2),
+        "encode_MB_s": encode,
+        "decode_MB_s": decode,
+        f"read_{READ}": read,
+    }
+
+
+def RawZlib(samples: np.ndarray, level: int) -> dict:
+    raw = samples.tobytes()
+    blocks = [raw[i : i + (1 << 18)] for i in range(0, len(raw), 1 << 18)]
+    compressed = []
+    encode = Throughput(
+        len(raw), lambda: compressed.extend(zlib.compress(_, level) for _ in blocks)
+    )
+    decode = Throughput(len(raw), lambda: [zlib.decompress(_) for _ in compressed])
+    return {
+        "ratio": round(len(raw) / sum(map(len, compressed)), 2),
+        "encode_MB_s": encode,
+        "decode_MB_s": decode,
+    }
+
+
+def run(n: int = SAMPLES) -> dict:
+    samples = Weighing(n)
+    return {
+        "samples": n,
+        "raw_zlib_1": RawZlib(samples, 1),
+        "raw_zlib_6": RawZlib(samples, 6),
+        "archive_1": Archive(samples, 1),
+        "archive_6": Archive(samples, 6),
+    }
+
+
+if __name__ == "__main__":
+    Report("archive", run())
@@ -0,0 +1,201 @@
+import os
+import tempfile
+import time
+import tty
+
+from benchmarks.common import Measure, QtApp, Report
+from benchmarks.fake_scale import StartFakeScales, StopFakeScales
+
+"""
+The paths every live sample or command goes through, on the real classes:
+
+    receive       SerialInterface.Receive parsing a burst of live weight
+                  lines written to a pty, into the event bus like the app,
+                  with no request pending and with one pending
+    router        Router.Process dispatching a command to its handler
+    live_samples  MainWindow.LiveSamples with one line and with a bus tick's
+                  worth, LCD, live plot, history and histogram included
+    live_plotter  LivePlotter.update with 1k and 10k points on screen, one
+                  sample and a bus tick's worth through Extend
+    round_trip    a command written to the fake scale (benchmarks.fake_scale)
+                  over a pty until its response is resolved, TARE is only
+                  echoed, WEIGH streams SAMPLES lines and a value first
+
+Runs headless with the offscreen Qt platform, POSIX only for the ptys.
+
+    py -m benchmarks.bench_hot_paths
+"""
+
+LINES = 1000  # lines per Receive burst
+BURSTS = 50
+TICK_LINES = 50  # lines per bus tick at 2.5k samples/s
+POINTS = (1000, 10000)
+ROUND_TRIPS = 200
+SAMPLES = 20  # live weight lines the fake scale sends per weigh
+
+# the data and the metrics port of a benchmark run stay out of the user's
+os.environ.setdefault("WAC_DATA_DIR", tempfile.mkdtemp(prefix="wac-bench-"))
+os.environ.setdefault("WAC_METRICS_PORT", "0")
+
+
+def OpenPort(port: str):
+    from wac.serial_interface import SerialInterface
+
+    worker = SerialInterface()
+    worker.setPortName(port)
+    worker.running = worker.open(worker.ReadWrite)
+    if not worker.running:
+        raise RuntimeError(f"cannot open {port}")
+    return worker
+
+
+def Receive(pending: bool, lines: int = LINES, bursts: int = BURSTS) -> dict:
+    from wac.command_registry import COMMANDS
+    from wac.command_request import RequestScheduler
+    from wac.event_bus import SAMPLES as SAMPLE_TOPIC, EventBus
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    worker = OpenPort(os.ttyname(slave))
+    # the burst is buffered first and parsed by one timed call
+    worker.readyRead.disconnect(worker.Receive)
+    bus = EventBus()
+    worker.live_data.connect(bus.Publisher(SAMPLE_TOPIC))
+    if pending:
+        # a weigh waiting for its value, every line is checked for a response
+        worker.tracker.Add(RequestScheduler().Schedule(None, COMMANDS.ByType("WEIGH")))
+
+    burst = "".join(f"{500 + i % 5}\r\n" for i in range(lines)).encode()
+    elapsed = 0
+    for _ in range(bursts):
+        os.write(master, burst)
+        while worker.bytesAvailable() < len(burst):
+            worker.waitForReadyRead(100)
+        start = time.perf_counter_ns()
+        worker.Receive()
+        elapsed += time.perf_counter_ns() - start
+        bus.queues[SAMPLE_TOPIC.name] = []
+
+    worker.close()
+    bus.Stop()
+    os.close(master)
+    os.close(slave)
+    total = lines * bursts
+    return {
+        "lines_per_s": round(total / (elapsed / 1e9)),
+        "us_per_line": round(elapsed / total / 1e3, 3),
+    }
+
+
+def RouterProcess(repeat: int = 20000) -> dict:
+    from wac.command_registry import COMMANDS
+    from wac.command_request import RequestScheduler
+    from wac.router import Route, Router
+
+    class Bench(Router):
+        @Route("WEIGH", "REWEIGH")
+        def Weigh(self, cmd) -> None:
+            pass
+
+        @Route("COUNT", "RECOUNT")
+        def Count(self, cmd) -> None:
+            pass
+
+    router = Bench()
+    request = RequestScheduler().Schedule(None, COMMANDS.ByType("COUNT"))
+    return Measure(lambda: router.Process(request), repeat)
+
+
+def LiveSamples(repeat: int = 2000) -> dict:
+    from wac.widget_main_window import MainWindow
+
+    app = QtApp()
+    window = MainWindow()
+    window.show()
+    app.processEvents()
+    one, tick = ["512"], [str(500 + i % 5) for i in range(TICK_LINES)]
+    results = {
+        "one_line": Measure(lambda: window.LiveSamples(one), repeat),
+        f"{TICK_LINES}_lines": Measure(lambda: window.LiveSamples(tick), repeat // 10),
+    }
+
+    # what closeEvent does, without asking
+    window.profiler.Stop()
+    window.request.terminate_serial.emit()
+    window.thread.quit()
+    window.thread.wait(2000)
+    window.hotplug.Stop()
+    window.results.Shutdown()
+    window.exporter.Shutdown()
+    window.metrics.Stop()
+    window.prompt.serial_data_viewer.HistoryPlot.Close()
+    window.hide()
+    return results
+
+
+def LivePlotter(points: int, repeat: int = 2000) -> dict:
+    import numpy as np
+
+    from wac.widget_prompt import LivePlotter
+
+    app = QtApp()
+    plotter = LivePlotter()
+    plotter.data = np.zeros(points)
+    plotter.curve.setData(plotter.data)
+    plotter.show()
+    app.processEvents()
+    tick = [500 + i % 5 for i in range(TICK_LINES)]
+    results = {
+        "one_sample": Measure(lambda: plotter.update(512), repeat),
+        f"{TICK_LINES}_samples": Measure(lambda: plotter.Extend(tick), repeat),
+    }
+    plotter.close()
+    return results
+
+
+def RoundTrip(cmdType: str, port: str, repeat: int = ROUND_TRIPS) -> dict:
+    from wac.command_registry import COMMANDS
+    from wac.command_request import RequestScheduler
+
+    worker = OpenPort(port)
+    scheduler = RequestScheduler()
+    spec = COMMANDS.ByType(cmdType)
+    done = []
+    worker.serial_cmd_response.connect(done.append)
+
+    def Once():
+        request = scheduler.Schedule(None, spec)
+        worker.RunCommand(request)
+        while request not in done:
+            # readyRead, and so Receive, runs inside the wait
+            if not worker.waitForReadyRead(1000):
+                raise RuntimeError(f"no response to {cmdType}")
+        done.clear()
+
+    results = Measure(Once, repeat)
+    worker.close()
+    return results
+
+
+def run() -> dict:
+    app = QtApp()  # kept alive for the whole run
+    results = {
+        "receive_idle": Receive(pending=False),
+        "receive_pending": Receive(pending=True),
+        "router": RouterProcess(),
+    }
+    for points in POINTS:
+        results[f"live_plotter_{points}"] = LivePlotter(points)
+    results["live_samples"] = LiveSamples()
+
+    processes, ports = StartFakeScales(1, SAMPLES)
+    try:
+        results["round_trip_tare"] = RoundTrip("TARE", ports[0])
+        results["round_trip_weigh"] = RoundTrip("WEIGH", ports[0])
+    finally:
+        StopFakeScales(processes)
+    return results
+
+
+if __name__ == "__main__":
+    Report("hot_paths", run())
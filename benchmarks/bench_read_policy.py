@@ -0,0 +1,126 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tty
+
+from benchmarks.common import QtApp, Report
+
+"""
+Serial read policy: CPU time against latency of the EVENT and COALESCE read
+policies of SerialInterface, at several baud rates.
+
+A writer process streams live weight lines into a pty at the rate the baud
+rate allows (10 bits per byte), a millisecond's worth at a time, every line
+carries the time it was written (time.monotonic_ns, the same clock in both
+processes). SerialInterface reads the other side with its event loop
+running, like the worker thread does. Reported per baud rate and policy:
+the CPU the reading process used in percent of one core, Receive calls per
+second and the latency from write to live_data, median and p99.
+
+    py -m benchmarks.bench_read_policy
+"""
+
+BAUD_RATES = (9600, 115200, 921600)
+DURATION = 3.0  # s per run
+LINE = 22  # bytes per line, a 19 digit timestamp and \r\n
+PACE = 0.001  # s between writes
+
+
+def Pace(fd: int, baud: int, duration: float) -> None:
+    rate = baud / 10 / LINE  # lines per s
+    start = time.monotonic()
+    written = 0
+    while True:
+        elapsed = time.monotonic() - start
+        if elapsed >= duration:
+            return
+        due = int(elapsed * rate) - written
+        if due > 0:
+            stamp = time.monotonic_ns()
+            os.write(fd, f"{stamp:019d}\r\n".encode() * due)
+            written += due
+        time.sleep(PACE)
+
+
+def Read(policy: str, baud: int, duration: float = DURATION) -> dict:
+    from PyQt5.QtCore import QTimer
+
+    from wac.diagnostics import SLOT_STATS
+    from wac.serial_interface import SerialInterface
+
+    app = QtApp()
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    worker = SerialInterface()
+    worker.setPortName(os.ttyname(slave))
+    worker.running = worker.open(worker.ReadWrite)
+    worker.SetReadPolicy(policy)
+
+    latencies = []
+
+    def Line(line: str):
+        latencies.append(time.monotonic_ns() - int(line))
+
+    worker.live_data.connect(Line)
+    receive = SLOT_STATS["SerialInterface.Receive"]
+    calls = receive.calls
+    cpu = time.process_time()
+    writer = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_read_policy",
+            "--pace",
+            str(baud),
+            "--fd",
+            str(master),
+            "--seconds",
+            str(duration),
+        ],
+        pass_fds=(master,),
+    )
+    QTimer.singleShot(int((duration + 0.2) * 1000), app.quit)
+    app.exec_()
+    cpu = time.process_time() - cpu
+    calls = receive.calls - calls
+    writer.wait()
+
+    worker.close()
+    os.close(master)
+    os.close(slave)
+    latencies.sort()
+    if not latencies:
+        return {"error": "no lines received"}
+    return {
+        "lines": len(latencies),
+        "cpu_percent": round(100 * cpu / duration, 1),
+        "receive_per_s": round(calls / duration),
+        "latency_median_ms": round(statistics.median(latencies) / 1e6, 3),
+        "latency_p99_ms": round(latencies[int(len(latencies) * 0.99)] / 1e6, 3),
+    }
+
+
+def run(bauds: tuple = BAUD_RATES, duration: float = DURATION) -> dict:
+    from wac.serial_interface import READ_POLICIES
+
+    app = QtApp()  # kept alive for the whole run
+    return {
+        f"{policy}_{baud}": Read(policy, baud, duration)
+        for baud in bauds
+        for policy in READ_POLICIES
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pace", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--fd", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--seconds", type=float, default=DURATION)
+    args = parser.parse_args()
+    if args.pace:
+        Pace(args.fd, args.pace, args.seconds)
+    else:
+        Report("read_policy", run(duration=args.seconds))
@@ -0,0 +1,151 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.common import Measure, QtApp, Report
+
+"""
+Results store throughput: items logged one signal at a time (the Log Item
+button) and as one bulk import, through the writer thread. Reports items
+committed per second and how long the GUI thread spent handing them over,
+against a naive autocommit INSERT per item as the baseline.
+
+Then the history queries on a year of items, YEAR_ITEMS spread over 4
+scales and 200 products, without the LRU cache.
+
+    py -m benchmarks.bench_results_store
+"""
+
+ITEMS = 20000
+YEAR_ITEMS = 1000000
+
+
+def Items(n: int, start: float = None, span: float = 0.0) -> list:
+    from wac.results_store import ItemTracker
+
+    items = []
+    for i in range(n):
+        tracker = ItemTracker()
+        tracker.Weigh(random.randint(5, 50))
+        tracker.Count(random.randint(1, 500))
+        item = tracker.Item(
+            scale=f"scale{random.randint(1, 4)}",
+            product=f"SKU{random.randint(1, 200)}",
+        )
+        if start is not None:
+            item["timestamp"] = start + i * span / n
+        items.append(item)
+    return items
+
+
+def Store(items: list, bulk: bool) -> dict:
+    from PyQt5.QtCore import QTimer
+
+    from wac.results_store import ResultsStore
+
+    app = QtApp()
+    path = os.path.join(tempfile.mkdtemp(), "results.db")
+    store = ResultsStore(path)
+    written = [0]
+    start = time.perf_counter()
+
+    def Written(n):
+        written[0] += n
+        if written[0] >= len(items):
+            app.quit()
+
+    store.written.connect(Written)
+    if bulk:
+        store.RecordMany(items)
+    else:
+        for item in items:
+            store.Record(item)
+    handover = time.perf_counter() - start
+
+    giveUp = QTimer()
+    giveUp.setSingleShot(True)
+    giveUp.timeout.connect(app.quit)
+    giveUp.start(60000)
+    app.exec_()
+    giveUp.stop()
+    elapsed = time.perf_counter() - start
+    store.Shutdown()
+    return {
+        "items_per_s": round(written[0] / elapsed),
+        "gui_handover_ms": round(handover * 1000, 1),
+    }
+
+
+def Naive(items: list) -> dict:
+    from wac.results_store import INSERT, SCHEMA
+
+    path = os.path.join(tempfile.mkdtemp(), "results.db")
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute(SCHEMA)
+    start = time.perf_counter()
+    for item in items:
+        connection.execute(INSERT, item)
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return {"items_per_s": round(len(items) / elapsed)}
+
+
+def Queries(n: int = YEAR_ITEMS) -> dict:
+    from wac.results_query import Period, ResultsQuery
+    from wac.results_store import INSERT, ROLLUPS, Connect, Migrate
+
+    path = os.path.join(tempfile.mkdtemp(), "results.db")
+    connection = Connect(path)
+    Migrate(connection)
+    year = 365 * 86400
+    items = Items(n, time.time() - year, year)
+    with connection:
+        connection.execute("BEGIN")
+        connection.executemany(INSERT, items)
+        for rollup in ROLLUPS:
+            connection.execute(rollup, (0,))
+    connection.execute("ANALYZE")
+    connection.close()
+
+    query = ResultsQuery(path)
+    week, year = Period("week"), Period("year")
+    _, cursor = query.Items(*year, product="SKU5")
+    for _ in range(20):
+        _, cursor = query.Items(*year, product="SKU5", after=cursor)
+
+    def Uncached(fn):
+        def call():
+            query.Invalidate()
+            fn()
+
+        return Measure(call, repeat=50, warmup=2)
+
+    return {
+        "items": n,
+        "summary_year": Uncached(lambda: query.Summary(*year)),
+        "summary_year_scale": Uncached(lambda: query.Summary(*year, scale="scale1")),
+        "summary_today_product": Uncached(
+            lambda: query.Summary(*Period("today"), product="SKU5")
+        ),
+        "summary_week_outside": Uncached(
+            lambda: query.Summary(*week, outside=(10, 45))
+        ),
+        "page_1": Uncached(lambda: query.Items(*year, product="SKU5")),
+        "page_21": Uncached(lambda: query.Items(*year, product="SKU5", after=cursor)),
+    }
+
+
+def run(n: int = ITEMS) -> dict:
+    items = Items(n)
+    return {
+        "naive_autocommit": Naive(items[: n // 10]),
+        "writer_per_item": Store(items, bulk=False),
+        "writer_bulk": Store(items, bulk=True),
+        "queries": Queries(),
+    }
+
+
+if __name__ == "__main__":
+    Report("results_store", run())
@@ -0,0 +1,109 @@
+import os
+import time
+
+from benchmarks.common import QtApp, Report
+from benchmarks.fake_scale import StartFakeScales, StopFakeScales
+
+"""
+Multi-scale ingestion: thread mode (one QThread per scale in the GUI process)
+against process mode (one process per scale, samples in shared memory).
+Every scale weighs back to back for DURATION seconds, each weigh streams
+SAMPLES live weight lines. Reports samples ingested per second, the worst
+GUI event loop lag and the CPU time spent in the GUI process and in the
+scale processes.
+
+    py -m benchmarks.bench_scale_ingest
+"""
+
+DURATION = 3.0  # s per run
+SAMPLES = 500  # live weight lines per weigh
+SCALES = (1, 2, 4)
+
+
+def Ingest(mode: str, ports: list, duration: float = DURATION) -> dict:
+    from PyQt5.QtCore import QElapsedTimer, QTimer
+
+    from wac.diagnostics import LagMonitor, LagProbe
+    from wac.scale_manager import ScaleManager
+
+    app = QtApp()
+    monitor = LagMonitor()
+    probe = monitor.Watch(LagProbe("GUI"))
+    manager = ScaleManager(mode=mode)
+    for port in ports:
+        manager.Add(port)
+
+    connected = set()
+    phase = ["connecting"]  # connecting | running | done
+
+    def Status(name, state):
+        if state == "connected":
+            connected.add(name)
+        if len(connected) == len(ports) and phase[0] == "connecting":
+            phase[0] = "running"
+            QTimer.singleShot(0, Start)
+
+    def Response(name, request):
+        if phase[0] == "running" and request.cmdType == "WEIGH":
+            manager[name].Request("WEIGH")
+
+    def Start():
+        start["samples"] = sum(_.raw.Total() for _ in manager)
+        start["cpu"] = time.process_time()
+        clock.start()
+        probe.Start()
+        manager.Request("WEIGH")
+        QTimer.singleShot(int(duration * 1000), Stop)
+
+    def Stop():
+        phase[0] = "done"
+        start["elapsed"] = clock.elapsed() / 1000
+        start["cpu"] = time.process_time() - start["cpu"]
+        start["samples"] = sum(_.raw.Total() for _ in manager) - start["samples"]
+        probe.Stop()
+        app.quit()
+
+    start = {}
+    clock = QElapsedTimer()
+    manager.status.connect(Status)
+    manager.response.connect(Response)
+    manager.ConnectAll()
+    giveUp = QTimer()
+    giveUp.setSingleShot(True)
+    giveUp.timeout.connect(app.quit)
+    giveUp.start(int((duration + 10) * 1000))
+    app.exec_()
+    giveUp.stop()
+
+    manager.status.disconnect(Status)
+    manager.response.disconnect(Response)
+    children = os.times()
+    manager.Shutdown()
+    children = (os.times().children_user + os.times().children_system) - (
+        children.children_user + children.children_system
+    )
+    if "elapsed" not in start:
+        return {"error": "scales did not connect"}
+    return {
+        "scales": len(ports),
+        "samples_per_s": round(start["samples"] / start["elapsed"]),
+        "gui_worst_lag_ms": round(monitor.worst.get("GUI", 0.0), 2),
+        "gui_process_cpu_s": round(start["cpu"], 3),
+        "scale_processes_cpu_s": round(children, 3),
+    }
+
+
+def run(scales: tuple = SCALES, duration: float = DURATION) -> dict:
+    results = {}
+    for n in scales:
+        processes, ports = StartFakeScales(n, SAMPLES)
+        try:
+            for mode in ("thread", "process"):
+                results[f"{mode}_{n}"] = Ingest(mode, ports, duration)
+        finally:
+            StopFakeScales(processes)
+    return results
+
+
+if __name__ == "__main__":
+    Report("scale_ingest", run())
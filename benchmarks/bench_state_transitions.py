@@ -0,0 +1,84 @@
+from benchmarks.common import Measure, QtApp, Report
+
+"""
+State transition latency: the Entry* slots run on every Weigh/Re-Weigh/Count
+cycle. Compares restyling the connection button with a per-widget stylesheet
+(the old approach) against a dynamic property on the application stylesheet,
+both when the state changes and when a state is re-entered.
+
+    py -m benchmarks.bench_state_transitions
+"""
+
+LEGACY_CONNECT = """
+QPushButton {
+    background-color: green;
+    color: white;
+    font-size: 16px;
+}
+"""
+
+LEGACY_DISCONNECT = """
+QPushButton {
+    background-color: red;
+    color: white;
+    font-size: 16px;
+}
+"""
+
+
+def run(repeat: int = 1000) -> dict:
+    app = QtApp()
+    from wac.theme import ApplicationStyleSheet, SetStyleState
+    from wac.widget_serialconnection import SerialConnectionWidget
+    from wac.widget_weighandcount import WeighAndCountWidget
+
+    app.setStyleSheet(ApplicationStyleSheet())
+    connection = SerialConnectionWidget()
+    weighAndCount = WeighAndCountWidget()
+    connection.show()
+    weighAndCount.show()
+    button = connection.Connection_Button
+
+    def LegacyToggle():
+        button.setStyleSheet(LEGACY_CONNECT)
+        button.setStyleSheet(LEGACY_DISCONNECT)
+
+    def PropertyToggle():
+        SetStyleState(button, "connection", "connected")
+        SetStyleState(button, "connection", "disconnected")
+
+    def LegacyReEntry():
+        button.setStyleSheet(LEGACY_CONNECT)
+
+    def PropertyReEntry():
+        SetStyleState(button, "connection", "connected")
+
+    def ConnectionCycle():
+        connection.EntryConnected()
+        connection.EntryDisconnected()
+
+    def WeighAndCountCycle():
+        weighAndCount.EntryWeigh()
+        weighAndCount.EntryReWeigh()
+        weighAndCount.EntryCount()
+        weighAndCount.EntryReCount()
+        weighAndCount.ResetState()
+        weighAndCount.EntryStart()
+
+    results = {
+        "connection_stylesheet_toggle": Measure(LegacyToggle, repeat),
+        "connection_stylesheet_reentry": Measure(LegacyReEntry, repeat),
+    }
+    button.setStyleSheet("")
+    results = {
+        **results,
+        "connection_property_toggle": Measure(PropertyToggle, repeat),
+        "connection_property_reentry": Measure(PropertyReEntry, repeat),
+        "connection_state_cycle": Measure(ConnectionCycle, repeat),
+        "weighandcount_state_cycle": Measure(WeighAndCountCycle, repeat),
+    }
+    return results
+
+
+if __name__ == "__main__":
+    Report("state_transitions", run())
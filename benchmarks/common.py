@@ -0,0 +1,75 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+"""
+Helpers shared by the benchmark scripts: an offscreen QApplication, a timing
+loop and a JSON report writer. Reports go to benchmarks/results/ with the
+commit they were measured on, so runs on different builds can be compared,
+see benchmarks.run.
+"""
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def QtApp():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+def Measure(fn, repeat: int = 1000, warmup: int = 10) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "mean_us": statistics.fmean(samples) / 1e3,
+        "median_us": samples[len(samples) // 2] / 1e3,
+        "p99_us": samples[min(int(len(samples) * 0.99), len(samples) - 1)] / 1e3,
+        "min_us": samples[0] / 1e3,
+    }
+
+
+# the build being measured, "" outside a git checkout
+def Commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(RESULTS_DIR),
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def Report(name: str, results: dict, save: bool = True) -> dict:
+    report = {
+        "benchmark": name,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": Commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    for key, value in results.items():
+        print(f"[{name}] {key}: {value}")
+    if save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
@@ -0,0 +1,81 @@
+import argparse
+import os
+import random
+import select
+import subprocess
+import sys
+import tty
+
+"""
+Simulated scale firmware on a pseudo terminal (POSIX only), so benchmarks can
+drive the real SerialInterface without hardware. Prints the path of the
+serial side, then answers like the PIC18:
+    '-f' / '-g'   streams SAMPLES live weight lines, then '#val&' and the echo
+    '-n<w>'       sets the simulated piece weight, like a firmware that has
+                  SETPIECEWEIGHT (WAC_PRESET_PIECE_WEIGHT=1)
+    anything else is echoed
+
+    py -m benchmarks.fake_scale --samples 200
+"""
+
+SAMPLES = 20  # live weight lines per weigh or count
+WEIGHT = 74
+
+
+def Serve(master: int, samples: int = SAMPLES, idle: float = 30) -> None:
+    buffer, weight = b"", WEIGHT
+    while True:
+        readable, _, _ = select.select([master], [], [], idle)
+        if not readable:
+            return
+        try:
+            buffer += os.read(master, 4096)
+        except OSError:
+            return
+
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            cmd = line.strip().decode()
+            if cmd.startswith("-n"):
+                weight = int(cmd[2:] or 0)
+                out = "-n\r\n"
+            elif cmd in ("-f", "-g"):
+                total = weight if cmd == "-f" else 565
+                value = weight if cmd == "-f" else total // max(weight, 1)
+                out = "".join(
+                    f"{total + random.randint(-2, 2)}\r\n" for _ in range(samples)
+                )
+                out += f"#{value}&\r\n{cmd}\r\n"
+            else:
+                out = f"{cmd}\r\n"
+            os.write(master, out.encode())
+
+
+# start n simulators in subprocesses, returns (processes, port names)
+def StartFakeScales(n: int, samples: int = SAMPLES) -> tuple:
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_scale", "--samples", str(samples)],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(n)
+    ]
+    return processes, [_.stdout.readline().strip() for _ in processes]
+
+
+def StopFakeScales(processes: list) -> None:
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated scale on a pty")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    args = parser.parse_args()
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    print(os.ttyname(slave), flush=True)
+    Serve(master, args.samples)
@@ -0,0 +1,110 @@
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import Report
+
+"""
+The whole benchmark suite, every benchmark in a fresh process so one cannot
+warm up or slow down the next, under the offscreen Qt platform
+
+    py -m benchmarks.run                         # everything in SUITE
+    py -m benchmarks.run hot_paths archive       # some of it
+    py -m benchmarks.run --compare results/suite-A.json results/suite-B.json
+
+The results of a run go to benchmarks/results/suite-<stamp>.json together
+with the commit, --compare prints every number of two runs side by side with
+the change in percent. Whether higher is better depends on the number,
+lines_per_s should go up, anything in us or ms down.
+"""
+
+SUITE = (
+    "hot_paths",
+    "read_policy",
+    "state_transitions",
+    "results_store",
+    "archive",
+    "scale_ingest",
+)
+TIMEOUT = 1800  # s per benchmark
+MARK = "@@result "  # prefixes the child's results on its stdout
+
+
+def Child(name: str) -> None:
+    module = importlib.import_module(f"benchmarks.bench_{name}")
+    results = module.run()
+    print(MARK + json.dumps(results), flush=True)
+
+
+def RunOne(name: str) -> dict:
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    try:
+        process = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--child", name],
+            capture_output=True,
+            text=True,
+            env=env,
+            timeout=TIMEOUT,
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {TIMEOUT} s"}
+    for line in reversed(process.stdout.splitlines()):
+        if line.startswith(MARK):
+            return json.loads(line[len(MARK) :])
+    lines = process.stderr.strip().splitlines()
+    return {"error": lines[-1] if lines else f"exit code {process.returncode}"}
+
+
+# {"a": {"b": 1}} -> {"a.b": 1}, numbers only
+def Flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(Flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def Compare(before: str, after: str) -> None:
+    reports = []
+    for path in (before, after):
+        with open(path) as f:
+            reports.append(json.load(f))
+    old, new = (Flatten(_["results"]) for _ in reports)
+    print(f"{'':<50} {reports[0]['commit']:>14} {reports[1]['commit']:>14}")
+    for key in sorted(set(old) | set(new)):
+        a, b = old.get(key), new.get(key)
+        change = f"{100 * (b - a) / a:+.1f}%" if a and b is not None else ""
+        a = "-" if a is None else f"{a:.6g}"
+        b = "-" if b is None else f"{b:.6g}"
+        print(f"{key:<50} {a:>14} {b:>14} {change:>9}")
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("benchmarks", nargs="*", help=f"default: {' '.join(SUITE)}")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        Child(args.child)
+        return 0
+    if args.compare:
+        Compare(*args.compare)
+        return 0
+
+    results = {}
+    for name in args.benchmarks or SUITE:
+        print(f"[suite] {name} ...", flush=True)
+        results[name] = RunOne(name)
+    Report("suite", results)
+    return 1 if any("error" in _ for _ in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,17 @@
 from PyQt5.QtWidgets import QApplication
 
 from wac.widget_main_window import MainWindow
-from wac.theme import ApplicationTheme
+from wac.theme import ApplicationStyleSheet, ApplicationTheme
 
 
 if __name__ == "__main__":
     import sys
+
     app = QApplication(sys.argv)
-    app.setStyle('Fusion')
+    app.setStyle("Fusion")
     app.setPalette(ApplicationTheme())
-    
-    w = MainWindow()    
+    app.setStyleSheet(ApplicationStyleSheet())
+
+    w = MainWindow()
     w.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
@@ -0,0 +1,7 @@
+import sys
+
+from wac.headless import main
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,35 @@
+import argparse
+import sys
+
+from PyQt5.QtWidgets import QApplication
+
+from wac.scale_manager import PROCESS, THREAD, ScaleManager
+from wac.serial_interface import BAUD_RATE
+from wac.theme import ApplicationStyleSheet, ApplicationTheme
+from wac.widget_multiscale import MultiScaleDashboard
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard for several scales")
+    parser.add_argument("ports", nargs="*", help="e.g. COM5 COM6 COM7 COM8")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    parser.add_argument(
+        "--mode",
+        choices=[THREAD, PROCESS],
+        default=THREAD,
+        help="run each scale on a thread or in its own process",
+    )
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    app.setStyle("Fusion")
+    app.setPalette(ApplicationTheme())
+    app.setStyleSheet(ApplicationStyleSheet())
+
+    manager = ScaleManager(mode=args.mode)
+    for port in args.ports:
+        manager.Add(port, args.baud)
+
+    w = MultiScaleDashboard(manager)
+    w.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from PyQt5.QtCore import QCoreApplication
+
+from wac.hotplug import HotplugWatcher
+
+"""
+HotplugWatcher against a temporary directory tree instead of /dev, Linux only
+
+    py -m unittest discover tests
+"""
+
+SETTLE_MS = 100
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+def Spin(ms: int) -> None:
+    end = time.monotonic() + ms / 1000
+    while time.monotonic() < end:
+        app.processEvents()
+        time.sleep(0.005)
+
+
+class HotplugWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="wac-hotplug-")
+        self.byId = os.path.join(self.root, "serial", "by-id")
+        self.watcher = HotplugWatcher(roots=(self.root, self.byId), settle=SETTLE_MS)
+        self.added, self.removed = [], []
+        self.watcher.added.connect(self.added.append)
+        self.watcher.removed.connect(self.removed.append)
+        if not self.watcher.Start():
+            self.skipTest("no inotify")
+
+    def tearDown(self):
+        self.watcher.Stop()
+        shutil.rmtree(self.root)
+
+    def Touch(self, *parts) -> str:
+        path = os.path.join(*parts)
+        open(path, "w").close()
+        return path
+
+    def test_added_after_settle(self):
+        path = self.Touch(self.root, "ttyUSB0")
+        Spin(SETTLE_MS // 4)
+        self.assertEqual(self.added, [])  # held back while udev settles
+        Spin(SETTLE_MS * 2)
+        self.assertEqual(self.added, [path])
+
+    def test_removed(self):
+        path = self.Touch(self.root, "ttyUSB0")
+        Spin(SETTLE_MS * 2)
+        os.remove(path)
+        Spin(SETTLE_MS // 2)
+        self.assertEqual(self.removed, [path])
+
+    def test_gone_before_settled(self):
+        path = self.Touch(self.root, "ttyACM0")
+        Spin(SETTLE_MS // 4)
+        os.remove(path)
+        Spin(SETTLE_MS * 2)
+        self.assertEqual((self.added, self.removed), ([], []))
+
+    def test_other_names_ignored(self):
+        self.Touch(self.root, "ttyS0")
+        Spin(SETTLE_MS * 2)
+        self.assertEqual(self.added, [])
+
+    def test_root_created_later(self):
+        os.makedirs(self.byId)
+        Spin(SETTLE_MS // 2)
+        path = self.Touch(self.byId, "usb-Prolific_0-if00-port0")
+        Spin(SETTLE_MS * 2)
+        self.assertEqual(self.added, [path])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,239 @@
+import asyncio
+import threading
+
+from PyQt5.QtCore import QCoreApplication, Qt
+
+from wac.command_registry import COMMANDS, CommandRegistry
+from wac.command_request import CommandRequest
+from wac.scale_manager import THREAD, ScaleChannel, ScaleManager
+from wac.serial_interface import BAUD_RATE
+
+"""
+asyncio client for the scale
+
+    async with AsyncScale("COM5") as scale:
+        await scale.calibrate()
+        await scale.tare()
+        await scale.start_weigh()
+        weight = await scale.weigh()
+        async for batch in scale.samples():
+            ...
+
+Every scale still runs on its own ScaleChannel thread with the Qt serial
+worker, the commands come from the same registry as the buttons. Responses
+are handed to the asyncio loop with call_soon_threadsafe, so any number of
+scales can be awaited concurrently from one loop, and the Qt event loop of
+the main thread is not needed for it.
+
+From a Qt application, run the asyncio loop next to it with LoopThread:
+    loop = LoopThread()
+    future = loop.Submit(scale.weigh())   # concurrent.futures.Future
+
+A timed out or cancelled command is also dropped from the worker's request
+tracker, so its late response cannot complete a later command.
+
+Only a thread mode ScaleManager works, a process mode channel reports through
+a socket notifier on the Qt event loop of the main thread, which a plain
+asyncio script never runs, and has no cancel path into the child's tracker.
+connect() refuses one with ValueError.
+"""
+
+TIMEOUT = 5.0  # s to wait for the scale to answer a command
+SAMPLE_INTERVAL = 0.05  # s between sample batches
+
+_app = None
+_manager = None
+
+
+# scales share one manager unless they are given their own
+def DefaultManager() -> ScaleManager:
+    global _app, _manager
+    if QCoreApplication.instance() is None:
+        # the scale threads need an application object, not its event loop
+        _app = QCoreApplication([])
+    if _manager is None:
+        _manager = ScaleManager()
+    return _manager
+
+
+class AsyncScale:
+    def __init__(
+        self,
+        port_name: str,
+        baud_rate: int = BAUD_RATE,
+        timeout: float = TIMEOUT,
+        manager: ScaleManager = None,
+        commands: CommandRegistry = COMMANDS,
+        name: str = None,
+    ):
+        self.port_name = port_name
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self.manager = manager
+        self.commands = commands
+        self.name = name or port_name
+        self.channel: ScaleChannel = None
+        self.loop = None
+        self.connected = False
+        self.pending = {}  # request id -> future
+        self.lock = threading.Lock()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # --------------------------------------------------------------------------
+    # commands
+    async def connect(self) -> CommandRequest:
+        if self.channel is None:
+            self.loop = asyncio.get_running_loop()
+            if self.manager is None:
+                # not `or`, an empty manager has no scales and is falsy
+                self.manager = DefaultManager()
+            if self.manager.mode != THREAD:
+                raise ValueError(
+                    f"AsyncScale needs a {THREAD} mode ScaleManager, "
+                    f"not {self.manager.mode}"
+                )
+            self.channel = self.manager.Add(
+                self.port_name, self.baud_rate, name=self.name
+            )
+            # direct: run on the scale thread, hand over to the loop from there
+            self.channel.response.connect(self.Response, Qt.DirectConnection)
+            self.channel.status.connect(self.Status, Qt.DirectConnection)
+        request = await self.request("CONNECT")
+        self.connected = True
+        return request
+
+    async def disconnect(self) -> CommandRequest:
+        request = await self.request("DISCONNECT")
+        self.connected = False
+        return request
+
+    async def calibrate(self) -> CommandRequest:
+        return await self.request("CALIBRATE")
+
+    async def tare(self) -> CommandRequest:
+        return await self.request("TARE")
+
+    async def start_weigh(self) -> CommandRequest:
+        return await self.request("STARTWEIGH")
+
+    async def weigh(self) -> int:
+        return (await self.request("WEIGH")).returnValue
+
+    async def reweigh(self) -> int:
+        return (await self.request("REWEIGH")).returnValue
+
+    async def start_count(self) -> CommandRequest:
+        return await self.request("STARTCOUNT")
+
+    async def count(self) -> int:
+        return (await self.request("COUNT")).returnValue
+
+    async def recount(self) -> int:
+        return (await self.request("RECOUNT")).returnValue
+
+    async def finish(self) -> CommandRequest:
+        return await self.request("FINISH")
+
+    async def reset(self) -> CommandRequest:
+        return await self.request("RESET")
+
+    async def request(self, cmdType: str, timeout: float = None) -> CommandRequest:
+        if self.channel is None or (cmdType != "CONNECT" and not self.connected):
+            raise ConnectionError(f"{self.name} is not connected")
+
+        request = self.manager.scheduler.Schedule(None, self.commands.ByType(cmdType))
+        future = self.loop.create_future()
+        with self.lock:
+            self.pending[request.id] = (request, future)
+        self.channel.Send(request)
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.channel.cancel.emit(request)
+            raise
+        finally:
+            with self.lock:
+                self.pending.pop(request.id, None)
+
+    # --------------------------------------------------------------------------
+    # live data
+    async def samples(self, interval: float = SAMPLE_INTERVAL, filtered: bool = False):
+        ring = self.channel.filtered if filtered else self.channel.raw
+        last = ring.Total()
+        while True:
+            await asyncio.sleep(interval)
+            total = ring.Total()
+            if total > last:
+                # whatever the ring no longer holds is skipped
+                yield ring.Latest(total - last)
+                last = total
+            elif not self.connected:
+                return
+
+    async def close(self) -> None:
+        if self.channel is None:
+            return
+        if self.connected:
+            try:
+                await self.disconnect()
+            except (ConnectionError, asyncio.TimeoutError):
+                pass
+        self.manager.Remove(self.name)
+        self.channel = None
+
+    # --------------------------------------------------------------------------
+    # [scale thread] callbacks, only touch the loop through call_soon_threadsafe
+    def Response(self, name: str, request: CommandRequest) -> None:
+        with self.lock:
+            entry = self.pending.get(request.id)
+        if entry is not None and entry[0] is request:
+            self.loop.call_soon_threadsafe(self.Resolve, entry[1], request)
+
+    def Status(self, name: str, state: str) -> None:
+        if state != "disconnected":
+            return
+        with self.lock:
+            futures = [future for _, future in self.pending.values()]
+        error = ConnectionError(f"{self.name} disconnected")
+        self.loop.call_soon_threadsafe(setattr, self, "connected", False)
+        for future in futures:
+            self.loop.call_soon_threadsafe(self.Fail, future, error)
+
+    @staticmethod
+    def Resolve(future: asyncio.Future, request: CommandRequest) -> None:
+        if not future.done():
+            future.set_result(request)
+
+    @staticmethod
+    def Fail(future: asyncio.Future, error: Exception) -> None:
+        if not future.done():
+            future.set_exception(error)
+
+
+"""
+An asyncio loop on its own thread, for driving AsyncScales from a Qt GUI
+"""
+
+
+class LoopThread(threading.Thread):
+    def __init__(self):
+        super(LoopThread, self).__init__(name="asyncio", daemon=True)
+        self.loop = asyncio.new_event_loop()
+        self.start()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def Submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def Stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
@@ -0,0 +1,254 @@
+import argparse
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+from wac.history import DTYPE, MAX_LEVELS
+
+"""
+Compressed archive of a recorded sample session
+
+    ArchiveSession("~/.wac/history/20240101-120000.i32")   # -> ....wacz
+    reader = ArchiveReader("~/.wac/history/20240101-120000.wacz")
+    samples = reader.Read(1000000, 1002000)
+
+Consecutive samples differ by a few counts, so every block of BLOCK_SAMPLES
+is stored as the differences between neighbours (the first one against 0,
+every block decodes on its own), zigzag mapped so small negative steps are
+small numbers, packed as LEB128 varints, one byte for a step up to +-63,
+and compressed with zlib. Encode and Decode work on whole NumPy arrays, the
+only Python loop is over the bytes of the longest varint.
+
+    header   MAGIC, VERSION, samples per block
+    blocks   zlib(varint(zigzag(delta)))
+    index    one (first sample, offset, size, samples) entry per block
+    footer   offset of the index, number of blocks, MAGIC
+
+The index is read once when the archive is opened, Read(start, stop)
+decompresses only the blocks that overlap the range.
+"""
+
+MAGIC = b"WACZ"
+VERSION = 1
+SUFFIX = ".wacz"
+BLOCK_SAMPLES = 1 << 16
+LEVEL = 6  # zlib
+
+HEADER = struct.Struct("<4sBxxxI")
+FOOTER = struct.Struct("<QQ4s")
+INDEX = np.dtype(
+    [("start", "<u8"), ("offset", "<u8"), ("size", "<u4"), ("count", "<u4")]
+)
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+def ZigZag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def UnZigZag(values: np.ndarray) -> np.ndarray:
+    sign = -(values & np.uint64(1)).astype(np.int64)
+    return (values >> np.uint64(1)).astype(np.int64) ^ sign
+
+
+def VarintPack(values: np.ndarray) -> bytes:
+    top = int(values.max()) if len(values) else 0
+    if top < 0x80:
+        # every step fits in one byte, the usual case while weighing
+        return values.astype(np.uint8).tobytes()
+    # bytes per value, 7 bits each
+    lengths = np.ones(len(values), np.int64)
+    for bits in range(7, top.bit_length(), 7):
+        lengths += values >= np.uint64(1 << bits)
+    starts = np.cumsum(lengths) - lengths
+    packed = np.empty(int(lengths.sum()), np.uint8)
+    for k in range(int(lengths.max()) if len(values) else 0):
+        rest = lengths > k
+        chunk = (values[rest] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[rest] > k + 1).astype(np.uint64) << np.uint64(7)
+        packed[starts[rest] + k] = chunk | more
+    return packed.tobytes()
+
+
+def VarintUnpack(data: bytes) -> np.ndarray:
+    packed = np.frombuffer(data, np.uint8)
+    ends = np.flatnonzero(packed < 0x80)
+    if len(ends) == len(packed):
+        return packed.astype(np.uint64)
+    starts = np.empty_like(ends)
+    starts[:1] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+    values = np.zeros(len(ends), np.uint64)
+    for k in range(int(lengths.max()) if len(ends) else 0):
+        rest = lengths > k
+        chunk = (packed[starts[rest] + k] & 0x7F).astype(np.uint64)
+        values[rest] |= chunk << np.uint64(7 * k)
+    return values
+
+
+def Encode(samples, level: int = LEVEL) -> bytes:
+    samples = np.asarray(samples, dtype=np.int64)
+    deltas = np.diff(samples, prepend=0)
+    return zlib.compress(VarintPack(ZigZag(deltas)), level)
+
+
+def Decode(data: bytes, count: int = None) -> np.ndarray:
+    samples = np.cumsum(UnZigZag(VarintUnpack(zlib.decompress(data))))
+    if count is not None and len(samples) != count:
+        raise ValueError(f"block holds {len(samples)} samples, the index says {count}")
+    return samples.astype(DTYPE)
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class ArchiveWriter:
+    def __init__(self, path: str, block: int = BLOCK_SAMPLES, level: int = LEVEL):
+        self.path = path
+        self.block = block
+        self.level = level
+        self.buffer = np.empty(0, DTYPE)
+        self.index = []
+        self.samples = 0
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, block))
+
+    def Append(self, values) -> None:
+        values = np.concatenate((self.buffer, np.asarray(values, DTYPE)))
+        full = len(values) - len(values) % self.block
+        for start in range(0, full, self.block):
+            self.WriteBlock(values[start : start + self.block])
+        self.buffer = values[full:]
+
+    def WriteBlock(self, values: np.ndarray) -> None:
+        data = Encode(values, self.level)
+        self.index.append((self.samples, self.file.tell(), len(data), len(values)))
+        self.file.write(data)
+        self.samples += len(values)
+
+    def Close(self) -> None:
+        if self.file is None:
+            return
+        if len(self.buffer):
+            self.WriteBlock(self.buffer)
+            self.buffer = np.empty(0, DTYPE)
+        offset = self.file.tell()
+        self.file.write(np.array(self.index, INDEX).tobytes())
+        self.file.write(FOOTER.pack(offset, len(self.index), MAGIC))
+        self.file.close()
+        self.file = None
+
+
+class ArchiveReader:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "rb")
+        magic, version, self.block = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version > VERSION:
+            raise ValueError(f"{path} is not a sample archive")
+        self.file.seek(-FOOTER.size, os.SEEK_END)
+        offset, blocks, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is incomplete, the index is missing")
+        self.file.seek(offset)
+        self.index = np.frombuffer(self.file.read(blocks * INDEX.itemsize), INDEX)
+        self.samples = int(self.index["count"].sum())
+
+    def __len__(self) -> int:
+        return self.samples
+
+    def ReadBlock(self, block: int) -> np.ndarray:
+        entry = self.index[block]
+        self.file.seek(int(entry["offset"]))
+        return Decode(self.file.read(int(entry["size"])), int(entry["count"]))
+
+    # samples [start, stop), decodes only the blocks that overlap
+    def Read(self, start: int = 0, stop: int = None) -> np.ndarray:
+        stop = self.samples if stop is None else min(stop, self.samples)
+        start = max(start, 0)
+        if stop <= start:
+            return np.empty(0, DTYPE)
+        starts = self.index["start"]
+        first = int(np.searchsorted(starts, start, "right")) - 1
+        last = int(np.searchsorted(starts, stop, "left"))
+        values = np.concatenate([self.ReadBlock(_) for _ in range(first, last)])
+        offset = start - int(starts[first])
+        return values[offset : offset + stop - start]
+
+    def Close(self) -> None:
+        self.file.close()
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+def ArchivePath(sessionPath: str) -> str:
+    return os.path.splitext(sessionPath)[0] + SUFFIX
+
+
+"""
+Archive a raw session file a block at a time. With remove the archive is
+read back and compared first, then the raw file and its pyramid levels are
+deleted.
+"""
+
+
+def ArchiveSession(
+    sessionPath: str, path: str = None, remove: bool = False, block: int = BLOCK_SAMPLES
+) -> str:
+    path = path or ArchivePath(sessionPath)
+    writer = ArchiveWriter(path, block)
+    with open(sessionPath, "rb") as f:
+        while True:
+            values = np.fromfile(f, DTYPE, block)
+            if not len(values):
+                break
+            writer.Append(values)
+    writer.Close()
+
+    if remove:
+        reader = ArchiveReader(path)
+        with open(sessionPath, "rb") as f:
+            for number, entry in enumerate(reader.index):
+                raw = np.fromfile(f, DTYPE, int(entry["count"]))
+                if not np.array_equal(raw, reader.ReadBlock(number)):
+                    reader.Close()
+                    raise ValueError(f"{path} does not match {sessionPath}")
+        reader.Close()
+        for level in range(MAX_LEVELS):
+            levelPath = sessionPath if level == 0 else f"{sessionPath}.L{level}"
+            if os.path.exists(levelPath):
+                os.remove(levelPath)
+    return path
+
+
+def main(argv: list = None) -> int:
+    from wac.export import Sessions
+
+    parser = argparse.ArgumentParser(description="Archive recorded sample sessions")
+    parser.add_argument(
+        "sessions", nargs="*", help="default: every session but the newest"
+    )
+    parser.add_argument(
+        "--remove", action="store_true", help="delete the raw files once verified"
+    )
+    args = parser.parse_args(argv)
+
+    sessions = args.sessions or [_ for _ in Sessions() if _.endswith(".i32")][:-1]
+    for session in sessions:
+        size = os.path.getsize(session)
+        path = ArchiveSession(session, remove=args.remove)
+        ratio = size / max(os.path.getsize(path), 1)
+        print(f"[archive] {session} -> {path}, {ratio:.1f}x smaller")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import json
+import os
+import time
+
+from wac.paths import DataPath
+
+"""
+Product catalog: the piece weight of every product (SKU) counted before
+
+    catalog = ProductCatalog()
+    catalog.PieceWeight("SKU-1")        # 74, or None for a new product
+    catalog.Learn("SKU-1", 75)          # an accepted weigh refines it
+
+The whole catalog is read into a dict once at startup, every lookup after
+that is in memory. Learn folds each piece weight the operator accepts
+(Start Count after a weigh) into the product's mean, after REFINE_SAMPLES
+weighs the mean turns into a moving average so it follows slow drift, e.g.
+a new batch of parts. The file is rewritten on every Learn through a
+temporary file, a crash never leaves it half written.
+
+With a firmware that takes SETPIECEWEIGHT (WAC_PRESET_PIECE_WEIGHT=1, see
+command_registry) a product with a piece weight of at least 1 g skips the
+weigh phase, the piece weight is sent to the scale and counting starts
+straight away.
+"""
+
+CATALOG_FILE = "catalog.json"
+REFINE_SAMPLES = 20  # weighs averaged before the mean starts to move
+
+
+class Product:
+    __slots__ = ("sku", "pieceWeight", "samples", "updated")
+
+    def __init__(
+        self, sku: str, pieceWeight: float, samples: int = 1, updated: str = ""
+    ):
+        self.sku = sku
+        self.pieceWeight = pieceWeight  # g, refined mean
+        self.samples = samples
+        self.updated = updated
+
+    # the scale takes whole grams
+    def Grams(self) -> int:
+        return int(round(self.pieceWeight))
+
+    def __repr__(self):
+        return f"Product({self.sku!r}, {self.pieceWeight:.1f} g, {self.samples})"
+
+
+class ProductCatalog:
+    def __init__(self, path: str = None):
+        self.path = path or DataPath(CATALOG_FILE)
+        self.products = {}  # sku -> Product
+        self.Load()
+
+    def Load(self) -> None:
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        self.products = {
+            sku: Product(
+                sku,
+                entry["piece_weight"],
+                entry.get("samples", 1),
+                entry.get("updated", ""),
+            )
+            for sku, entry in entries.items()
+            if entry.get("piece_weight")
+        }
+        print(f"[catalog] {len(self.products)} products")
+
+    def Save(self) -> None:
+        entries = {
+            _.sku: {
+                "piece_weight": _.pieceWeight,
+                "samples": _.samples,
+                "updated": _.updated,
+            }
+            for _ in self.products.values()
+        }
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
+
+    def Get(self, sku: str) -> Product:
+        return self.products.get(sku)
+
+    # g, rounded for the scale, None for an unknown product
+    def PieceWeight(self, sku: str) -> int:
+        product = self.products.get(sku)
+        return product.Grams() if product is not None else None
+
+    def Skus(self) -> list:
+        return sorted(self.products)
+
+    # fold an accepted piece weight into the product, returns the product
+    def Learn(self, sku: str, pieceWeight: int) -> Product:
+        product = self.products.get(sku)
+        if product is None:
+            product = self.products[sku] = Product(sku, float(pieceWeight), 0)
+        samples = min(product.samples + 1, REFINE_SAMPLES)
+        product.pieceWeight += (pieceWeight - product.pieceWeight) / samples
+        product.samples += 1
+        product.updated = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.Save()
+        return product
+
+    def Remove(self, sku: str) -> bool:
+        if self.products.pop(sku, None) is None:
+            return False
+        self.Save()
+        return True
+
+    def __contains__(self, sku: str) -> bool:
+        return sku in self.products
+
+    def __len__(self) -> int:
+        return len(self.products)
@@ -1,9 +1,20 @@
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
 from PyQt5.QtWidgets import QPushButton
 
+from wac.command_registry import COMMANDS, CommandSpec
+from wac.diagnostics import TimedSlot
+
 DEBUGGING = False
 
 
+"""
+Command: the QObject handle a button holds on to. The definition itself
+(name, wire code, type, prompts) is the immutable CommandSpec from the
+registry, the handle only adds the signals the widgets need.
+Passing the fields instead of a spec creates an unregistered one.
+"""
+
+
 class Command(QObject):
     # signals
     cmd_signal = pyqtSignal(object)
@@ -14,6 +25,7 @@ class Command(QObject):
 
     def __init__(
         self,
+        spec: CommandSpec = None,
         name: str = "",
         cmd: str = "",
         cmdType: str = None,
@@ -25,14 +37,42 @@ class Command(QObject):
         **kwargs,
     ):
         super(Command, self).__init__(*args, **kwargs)
-        self.name = name
-        self.cmd = cmd
-        self.cmdType = cmdType
+        if spec is None:
+            spec = CommandSpec(
+                name=name,
+                code=cmd,
+                cmdType=cmdType,
+                promptStatus=promptStatus,
+                promptHowTo=promptHowTo,
+                promptProceed=promptProceed,
+            )
+        self.spec = spec
         self.cmdStyle = cmdStyle
-        self.promptStatus = promptStatus
-        self.promptHowTo = promptHowTo
-        self.promptProceed = promptProceed
-        self.returnValue = 0
+        self.argument = ""  # sent after the code, e.g. the piece weight
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    @property
+    def cmd(self) -> str:
+        return self.spec.code
+
+    @property
+    def cmdType(self) -> str:
+        return self.spec.cmdType
+
+    @property
+    def promptStatus(self) -> str:
+        return self.spec.promptStatus
+
+    @property
+    def promptHowTo(self) -> str:
+        return self.spec.promptHowTo
+
+    @property
+    def promptProceed(self) -> str:
+        return self.spec.promptProceed
 
     def EmitCommand(self):
         self.cmd_signal.emit(self)
@@ -58,6 +98,7 @@ class CommandButton(QPushButton):
         self.setText(self.cmd.name)
 
     @pyqtSlot()
+    @TimedSlot("CommandButton.ForwardSignal")
     def ForwardSignal(self):
         self.cmd.EmitCommand()
 
@@ -95,6 +136,7 @@ class MultiCommandButton(QPushButton):
         self.setText(self.cmd.name)
 
     @pyqtSlot()
+    @TimedSlot("MultiCommandButton.ForwardSignal")
     def ForwardSignal(self):
         self.cmd.EmitCommand()
 
@@ -102,11 +144,12 @@ class MultiCommandButton(QPushButton):
         self.cmd = next(self.cmdGen)
         self.ConfigureButton()
 
-    # create a circular generator
-    def CommandGenerator(self):
+    # create a circular generator, the first command yielded is cmdList[start]
+    def CommandGenerator(self, start: int = 0):
+        index = start
         while True:
-            for cmd in self.cmdList:
-                yield cmd
+            yield self.cmdList[index % len(self.cmdList)]
+            index += 1
 
     @pyqtSlot()
     def DisableButton(self):
@@ -116,10 +159,13 @@ class MultiCommandButton(QPushButton):
     def EnableButton(self):
         self.setEnabled(True)
 
+    # show cmdName, NextCommand carries on with the command after it
     def SetDefaultCmd(self, cmdName: str):
-        for cmd in self.cmdList:
+        for index, cmd in enumerate(self.cmdList):
             if cmd.name == cmdName:
                 self.cmd = cmd
+                self.cmdGen = self.CommandGenerator(index + 1)
+                return
 
     @pyqtSlot()
     def Debugging(self):
@@ -130,30 +176,9 @@ class MultiCommandButton(QPushButton):
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 def ProtocolCommands(parent=None) -> list:
-    cmd_startWeigh = Command(
-        name="Start Weigh",
-        cmd="-h",
-        cmdType="STARTWEIGH",
-        promptStatus="",
-        promptHowTo="To Weigh an item, place the item in the basket, then press 'Weigh'",
-        parent=parent,
-    )
-    cmd_startCount = Command(
-        name="Start Count",
-        cmd="-i",
-        cmdType="STARTCOUNT",
-        promptStatus="",
-        promptHowTo="To Count items, place the items in the basket, then press 'Count'.\n\n To Re-weigh the item, press 'Re-Weigh'.\n\n To finish weighing this item, press 'Finish",
-        parent=parent,
-    )
-    cmd_finish = Command(
-        name="Finish",
-        cmd="-j",
-        cmdType="FINISH",
-        promptStatus="Finalising measurement, returning to home. ",
-        promptHowTo="To Re-Count the items, press 'Re-Count', otherwise, press 'Finish' to finalise the measurement",
-        parent=parent,
-    )
+    cmd_startWeigh = Command(COMMANDS.ByType("STARTWEIGH"), parent=parent)
+    cmd_startCount = Command(COMMANDS.ByType("STARTCOUNT"), parent=parent)
+    cmd_finish = Command(COMMANDS.ByType("FINISH"), parent=parent)
     return [cmd_startWeigh, cmd_startCount, cmd_finish]
 
 
@@ -161,24 +186,8 @@ def ProtocolCommands(parent=None) -> list:
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 def WeighCommands(parent=None) -> list:
-    cmd_weigh = Command(
-        name="Weigh",
-        cmd="-f",
-        cmdType="WEIGH",
-        promptStatus="Weighing item, please wait",
-        promptHowTo="",
-        promptProceed="To Re-Weigh the item, press 'Re-Weigh'. To start counting items, press 'Start Count",
-        parent=parent,
-    )
-    cmd_re_weigh = Command(
-        name="Re-Weigh",
-        cmd="-f",
-        cmdType="REWEIGH",
-        promptStatus="Re-Weighing item, please wait",
-        promptHowTo="",
-        promptProceed="To Re-Weigh the item, press 'Re-Weigh'. To start counting items, press 'Start Count",
-        parent=parent,
-    )
+    cmd_weigh = Command(COMMANDS.ByType("WEIGH"), parent=parent)
+    cmd_re_weigh = Command(COMMANDS.ByType("REWEIGH"), parent=parent)
     return [cmd_weigh, cmd_re_weigh]
 
 
@@ -186,24 +195,8 @@ def WeighCommands(parent=None) -> list:
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 def ResetAndLogCommands(parent=None) -> list:
-    cmd_reset = Command(
-        name="Reset",
-        cmd="-l",
-        cmdType="RESET",
-        promptStatus="Resetting scales, please wait",
-        promptHowTo="",
-        promptProceed="To exit the current procedure, back to the home state, press 'Reset'",
-        parent=parent,
-    )
-    cmd_log = Command(
-        name="Log Item",
-        cmd="-m",
-        cmdType="LOGITEM",
-        promptStatus="Logging item, please wait",
-        promptHowTo="",
-        promptProceed="To log the item, press the 'Log Item' button after weighing the item initially",
-        parent=parent,
-    )
+    cmd_reset = Command(COMMANDS.ByType("RESET"), parent=parent)
+    cmd_log = Command(COMMANDS.ByType("LOGITEM"), parent=parent)
     return [cmd_reset, cmd_log]
 
 
@@ -211,47 +204,25 @@ def ResetAndLogCommands(parent=None) -> list:
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 def CountCommands(parent=None) -> list:
-    cmd_count = Command(
-        name="Count",
-        cmd="-g",
-        cmdType="COUNT",
-        promptStatus="Counting items, please wait",
-        promptHowTo="",
-        promptProceed="To Re-Count the items, press 'Re-Count'. To finalise the count, press 'Finish'",
-        parent=parent,
-    )
-    cmd_re_count = Command(
-        name="Re-Count",
-        cmd="-g",
-        cmdType="RECOUNT",
-        promptStatus="Re-Counting items, please wait",
-        promptHowTo="",
-        promptProceed="To Re-Count the items, press 'Re-Count'. To finalise the count, press 'Finish'",
-        parent=parent,
-    )
+    cmd_count = Command(COMMANDS.ByType("COUNT"), parent=parent)
+    cmd_re_count = Command(COMMANDS.ByType("RECOUNT"), parent=parent)
     return [cmd_count, cmd_re_count]
 
 
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+def ProductCommands(parent=None) -> list:
+    cmd_setPieceWeight = Command(COMMANDS.ByType("SETPIECEWEIGHT"), parent=parent)
+    return [cmd_setPieceWeight]
+
+
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 def CalibrationCommands(parent=None) -> list:
-    cmd_calibrate = Command(
-        name="Calibrate",
-        cmd="-d",
-        cmdType="CALIBRATE",
-        promptStatus="Calibrating scales, please wait",
-        promptHowTo="To calibrate the scales, make sure the basket is empty, then press the 'Calibrate' button located in the Calibration Box.",
-        parent=parent,
-    )
-    cmd_tare = Command(
-        name="Tare",
-        cmd="-e",
-        cmdType="TARE",
-        promptStatus="Taring scales, please wait",
-        promptHowTo="To zero the scales, make sure the basket is empty, then press the 'Tare' button located in the Calibration Box",
-        parent=parent,
-    )
+    cmd_calibrate = Command(COMMANDS.ByType("CALIBRATE"), parent=parent)
+    cmd_tare = Command(COMMANDS.ByType("TARE"), parent=parent)
     return [cmd_calibrate, cmd_tare]
 
 
@@ -259,22 +230,8 @@ def CalibrationCommands(parent=None) -> list:
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 def SerialDataViewerCommands(parent=None) -> list:
-    cmd_openViewer = Command(
-        name="Open Viewer",
-        cmd="-o",
-        cmdType="OPENVIEWER",
-        promptStatus="",
-        promptHowTo="",
-        parent=parent,
-    )
-    cmd_closeViewer = Command(
-        name="Close Viewer",
-        cmd="-v",
-        cmdType="CLOSEVIEWER",
-        promptStatus="",
-        promptHowTo="",
-        parent=parent,
-    )
+    cmd_openViewer = Command(COMMANDS.ByType("OPENVIEWER"), parent=parent)
+    cmd_closeViewer = Command(COMMANDS.ByType("CLOSEVIEWER"), parent=parent)
     return [cmd_openViewer, cmd_closeViewer]
 
 
@@ -284,20 +241,6 @@ def SerialDataViewerCommands(parent=None) -> list:
 
 
 def SerialCommands(parent=None) -> list:
-    cmd_connect = Command(
-        name="Disconnected",
-        cmd="-k",
-        cmdType="CONNECT",
-        promptStatus="Connecting to scales, please wait",
-        promptHowTo="To connect to the scales, ensure that the scales are plugged in, then press 'Connect'",
-        parent=parent,
-    )
-    cmd_disconnect = Command(
-        name="Connected",
-        cmd="-k",
-        cmdType="DISCONNECT",
-        promptStatus="Disconnecting from scales, please wait",
-        promptHowTo="To disconnect from the scales, press 'Disconnect' below, then unplug the cable from the computer.",
-        parent=parent,
-    )
+    cmd_connect = Command(COMMANDS.ByType("CONNECT"), parent=parent)
+    cmd_disconnect = Command(COMMANDS.ByType("DISCONNECT"), parent=parent)
     return [cmd_connect, cmd_disconnect]
@@ -0,0 +1,221 @@
+"""
+Command registry: every command the scale understands, defined once.
+
+CommandSpec is an immutable descriptor (name, wire code, command type,
+prompts and whether the scale answers with a '#value&' line). COMMANDS
+indexes them by command type and by wire code. Several commands share a wire
+code (WEIGH/REWEIGH, COUNT/RECOUNT, CONNECT/DISCONNECT), so ByCode returns a
+tuple. A request may carry an argument that follows the code on the wire,
+SETPIECEWEIGHT sends '-n74' and the scale echoes '-n'.
+
+SETPIECEWEIGHT is not part of the PIC18 firmware's original protocol, the
+scale needs a firmware that implements '-n<grams>'. It is only sent when
+WAC_PRESET_PIECE_WEIGHT=1 says the firmware has it (PRESET_PIECE_WEIGHT),
+otherwise every product is weighed before counting.
+
+Specs are plain Python objects, the serial worker can use them freely from
+its own thread. The QObject Command in command_button is only a thin handle
+that adds signals for the widgets.
+"""
+
+import os
+
+PRESET_PIECE_WEIGHT = os.environ.get("WAC_PRESET_PIECE_WEIGHT", "") not in ("", "0")
+
+
+class CommandSpec:
+    __slots__ = (
+        "name",
+        "code",
+        "cmdType",
+        "promptStatus",
+        "promptHowTo",
+        "promptProceed",
+        "returnsValue",
+    )
+
+    def __init__(
+        self,
+        name: str = "",
+        code: str = "",
+        cmdType: str = None,
+        promptStatus: str = "",
+        promptHowTo: str = "",
+        promptProceed: str = "",
+        returnsValue: bool = False,
+    ):
+        init = object.__setattr__
+        init(self, "name", name)
+        init(self, "code", code)
+        init(self, "cmdType", cmdType)
+        init(self, "promptStatus", promptStatus)
+        init(self, "promptHowTo", promptHowTo)
+        init(self, "promptProceed", promptProceed)
+        init(self, "returnsValue", returnsValue)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CommandSpec is immutable, cannot set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"CommandSpec is immutable, cannot delete {name}")
+
+    def __repr__(self):
+        return f"CommandSpec({self.cmdType}, {self.code!r})"
+
+
+class CommandRegistry:
+    def __init__(self, specs: list = ()):
+        self.byType = {}
+        self.byCode = {}
+        for spec in specs:
+            self.Register(spec)
+
+    def Register(self, spec: CommandSpec) -> CommandSpec:
+        if spec.cmdType in self.byType:
+            raise ValueError(f"command type {spec.cmdType} is already registered")
+        self.byType[spec.cmdType] = spec
+        self.byCode[spec.code] = self.byCode.get(spec.code, ()) + (spec,)
+        return spec
+
+    def ByType(self, cmdType: str) -> CommandSpec:
+        return self.byType[cmdType]
+
+    def ByCode(self, code: str) -> tuple:
+        return self.byCode.get(code, ())
+
+    def __contains__(self, cmdType: str) -> bool:
+        return cmdType in self.byType
+
+    def __iter__(self):
+        return iter(self.byType.values())
+
+    def __len__(self) -> int:
+        return len(self.byType)
+
+
+COMMANDS = CommandRegistry(
+    [
+        CommandSpec(
+            name="Start Weigh",
+            code="-h",
+            cmdType="STARTWEIGH",
+            promptStatus="",
+            promptHowTo="To Weigh an item, place the item in the basket, then press 'Weigh'",
+        ),
+        CommandSpec(
+            name="Start Count",
+            code="-i",
+            cmdType="STARTCOUNT",
+            promptStatus="",
+            promptHowTo="To Count items, place the items in the basket, then press 'Count'.\n\n To Re-weigh the item, press 'Re-Weigh'.\n\n To finish weighing this item, press 'Finish",
+        ),
+        CommandSpec(
+            name="Finish",
+            code="-j",
+            cmdType="FINISH",
+            promptStatus="Finalising measurement, returning to home. ",
+            promptHowTo="To Re-Count the items, press 'Re-Count', otherwise, press 'Finish' to finalise the measurement",
+        ),
+        CommandSpec(
+            name="Weigh",
+            code="-f",
+            cmdType="WEIGH",
+            promptStatus="Weighing item, please wait",
+            promptHowTo="",
+            promptProceed="To Re-Weigh the item, press 'Re-Weigh'. To start counting items, press 'Start Count",
+            returnsValue=True,
+        ),
+        CommandSpec(
+            name="Re-Weigh",
+            code="-f",
+            cmdType="REWEIGH",
+            promptStatus="Re-Weighing item, please wait",
+            promptHowTo="",
+            promptProceed="To Re-Weigh the item, press 'Re-Weigh'. To start counting items, press 'Start Count",
+            returnsValue=True,
+        ),
+        CommandSpec(
+            name="Set Piece Weight",
+            code="-n",
+            cmdType="SETPIECEWEIGHT",
+            promptStatus="Loading the product's piece weight, please wait",
+            promptHowTo="To count a known product, choose it from the product list, counting starts with its saved piece weight",
+        ),
+        CommandSpec(
+            name="Reset",
+            code="-l",
+            cmdType="RESET",
+            promptStatus="Resetting scales, please wait",
+            promptHowTo="",
+            promptProceed="To exit the current procedure, back to the home state, press 'Reset'",
+        ),
+        CommandSpec(
+            name="Log Item",
+            code="-m",
+            cmdType="LOGITEM",
+            promptStatus="Logging item, please wait",
+            promptHowTo="",
+            promptProceed="To log the item, press the 'Log Item' button after weighing the item initially",
+        ),
+        CommandSpec(
+            name="Count",
+            code="-g",
+            cmdType="COUNT",
+            promptStatus="Counting items, please wait",
+            promptHowTo="",
+            promptProceed="To Re-Count the items, press 'Re-Count'. To finalise the count, press 'Finish'",
+            returnsValue=True,
+        ),
+        CommandSpec(
+            name="Re-Count",
+            code="-g",
+            cmdType="RECOUNT",
+            promptStatus="Re-Counting items, please wait",
+            promptHowTo="",
+            promptProceed="To Re-Count the items, press 'Re-Count'. To finalise the count, press 'Finish'",
+            returnsValue=True,
+        ),
+        CommandSpec(
+            name="Calibrate",
+            code="-d",
+            cmdType="CALIBRATE",
+            promptStatus="Calibrating scales, please wait",
+            promptHowTo="To calibrate the scales, make sure the basket is empty, then press the 'Calibrate' button located in the Calibration Box.",
+        ),
+        CommandSpec(
+            name="Tare",
+            code="-e",
+            cmdType="TARE",
+            promptStatus="Taring scales, please wait",
+            promptHowTo="To zero the scales, make sure the basket is empty, then press the 'Tare' button located in the Calibration Box",
+        ),
+        CommandSpec(
+            name="Open Viewer",
+            code="-o",
+            cmdType="OPENVIEWER",
+            promptStatus="",
+            promptHowTo="",
+        ),
+        CommandSpec(
+            name="Close Viewer",
+            code="-v",
+            cmdType="CLOSEVIEWER",
+            promptStatus="",
+            promptHowTo="",
+        ),
+        CommandSpec(
+            name="Disconnected",
+            code="-k",
+            cmdType="CONNECT",
+            promptStatus="Connecting to scales, please wait",
+            promptHowTo="To connect to the scales, ensure that the scales are plugged in, then press 'Connect'",
+        ),
+        CommandSpec(
+            name="Connected",
+            code="-k",
+            cmdType="DISCONNECT",
+            promptStatus="Disconnecting from scales, please wait",
+            promptHowTo="To disconnect from the scales, press 'Disconnect' below, then unplug the cable from the computer.",
+        ),
+    ]
+)
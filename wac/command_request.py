@@ -0,0 +1,176 @@
+import itertools
+from collections import deque
+from time import perf_counter_ns
+
+from wac.command_registry import CommandSpec
+from wac.tracing import TRACER
+
+"""
+Request correlation
+
+Several commands share a wire code (WEIGH/REWEIGH '-f', COUNT/RECOUNT '-g',
+CONNECT/DISCONNECT '-k'), so a response line alone cannot say which command
+caused it. Every time a command is sent the host scheduler wraps it in a
+CommandRequest with a unique id, the result of that one request lives on it,
+never on the shared Command.
+
+The firmware answers in order, so the serial worker keeps the requests it has
+written in a RequestTracker and resolves each response to the oldest pending
+request it can belong to:
+    '-x'      echo of a command, resolves the oldest pending request with
+              that code; for commands that return a value it only marks the
+              request acknowledged
+    '#val&'   value, resolves the oldest pending request that returns a value
+If the value arrives before the echo, the echo that follows is swallowed so it
+cannot resolve a later request with the same code.
+"""
+
+
+class CommandRequest:
+    __slots__ = (
+        "id",
+        "command",
+        "spec",
+        "argument",
+        "returnValue",
+        "acked",
+        "createdAt",
+        "sentAt",
+        "completedAt",
+    )
+
+    def __init__(
+        self, id: int, command, spec: CommandSpec = None, argument: str = None
+    ):
+        self.id = id
+        self.command = command
+        self.spec = spec if spec is not None else command.spec
+        # copied when scheduled, the Command may be given a new one meanwhile
+        if argument is None:
+            argument = getattr(command, "argument", "")
+        self.argument = argument
+        self.returnValue = 0
+        self.acked = False
+        self.createdAt = perf_counter_ns()
+        self.sentAt = 0
+        self.completedAt = 0
+
+    # the same read-only surface as Command, routers and handlers take either
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    # what goes on the wire, the code followed by the argument if any
+    @property
+    def cmd(self) -> str:
+        return self.spec.code + self.argument
+
+    @property
+    def cmdType(self) -> str:
+        return self.spec.cmdType
+
+    @property
+    def promptStatus(self) -> str:
+        return self.spec.promptStatus
+
+    @property
+    def promptHowTo(self) -> str:
+        return self.spec.promptHowTo
+
+    @property
+    def promptProceed(self) -> str:
+        return self.spec.promptProceed
+
+    def EnableButton(self) -> None:
+        if self.command is not None:
+            self.command.EnableButton()
+
+    # ms between sending the request and its response
+    def Latency(self) -> float:
+        if not self.sentAt or not self.completedAt:
+            return 0.0
+        return (self.completedAt - self.sentAt) / 1e6
+
+    def __repr__(self):
+        return f"CommandRequest({self.id}, {self.cmdType})"
+
+
+class RequestScheduler:
+    def __init__(self):
+        self.ids = itertools.count(1)
+
+    # command may be None when only the spec is known, e.g. headless scales
+    def Schedule(
+        self, command, spec: CommandSpec = None, argument: str = None
+    ) -> CommandRequest:
+        if isinstance(command, CommandRequest):
+            return command
+        request = CommandRequest(next(self.ids), command, spec, argument)
+        if TRACER.enabled:
+            # the spans open since the click were waiting for this id
+            TRACER.Bind(request.id)
+        return request
+
+
+class RequestTracker:
+    def __init__(self):
+        self.pending = deque()
+        self.swallow = {}  # code -> echoes still expected after the value
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def Add(self, request: CommandRequest) -> None:
+        request.sentAt = perf_counter_ns()
+        self.pending.append(request)
+
+    def Clear(self) -> list:
+        requests = list(self.pending)
+        self.pending.clear()
+        self.swallow.clear()
+        return requests
+
+    # forget a request nobody waits for any more, e.g. after a timeout
+    def Cancel(self, request: CommandRequest) -> bool:
+        try:
+            self.pending.remove(request)
+        except ValueError:
+            return False
+        return True
+
+    def Complete(self, request: CommandRequest) -> CommandRequest:
+        self.pending.remove(request)
+        request.completedAt = perf_counter_ns()
+        return request
+
+    """
+    Resolve a '-x' echo, return the completed request or None
+    """
+
+    def Echo(self, code: str):
+        if self.swallow.get(code):
+            self.swallow[code] -= 1
+            return None
+
+        for request in self.pending:
+            if request.spec.code == code and not request.acked:
+                request.acked = True
+                if request.spec.returnsValue:
+                    return None
+                return self.Complete(request)
+        return None
+
+    """
+    Resolve a '#val&' value, return the completed request or None
+    """
+
+    def Value(self, value: int):
+        for request in self.pending:
+            if request.spec.returnsValue:
+                request.returnValue = value
+                if not request.acked:
+                    code = request.spec.code
+                    self.swallow[code] = self.swallow.get(code, 0) + 1
+                request.acked = True
+                return self.Complete(request)
+        return None
@@ -0,0 +1,157 @@
+import functools
+import threading
+from time import perf_counter_ns
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal, pyqtSlot
+
+from wac.tracing import TRACER, RequestKey
+
+"""
+Event loop lag monitoring
+
+LagProbe: a timer living in the thread it watches. Every tick it compares the
+actual time since the previous tick with the interval it asked for, the
+difference is how long that thread's event loop was blocked.
+
+TimedSlot: decorator for slots, records call count, total and worst duration
+per slot in SLOT_STATS and remembers the longest slot run on the current
+thread since the last probe tick. When a probe sees a stall it blames that
+slot. While tracing (tracing.py) every call is also a span, keyed by the
+request it was given.
+
+LagMonitor: collects the probes' measurements in the GUI thread and keeps the
+worst offenders.
+"""
+
+PROBE_INTERVAL = 50  # ms
+STALL_MS = 100  # lag above this is reported as a stall
+
+
+class SlotStats:
+    __slots__ = ("name", "calls", "total_ns", "max_ns")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def Mean(self) -> float:
+        return self.total_ns / self.calls if self.calls else 0.0
+
+
+SLOT_STATS = {}
+_local = threading.local()
+
+
+def TimedSlot(name: str = None):
+    def decorator(fn):
+        label = name or fn.__qualname__
+        stats = SLOT_STATS.setdefault(label, SlotStats(label))
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            span = TRACER.Begin(label, RequestKey(args[1:])) if TRACER.enabled else None
+            start = perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                if span is not None:
+                    TRACER.End(span)
+                stats.calls += 1
+                stats.total_ns += elapsed
+                if elapsed > stats.max_ns:
+                    stats.max_ns = elapsed
+                longest = getattr(_local, "longest", None)
+                if longest is None or elapsed > longest[1]:
+                    _local.longest = (label, elapsed)
+
+        return wrapper
+
+    return decorator
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class LagProbe(QObject):
+
+    # thread name, lag in ms, slot that ran longest since the last tick
+    lag = pyqtSignal(str, float, str)
+
+    def __init__(self, name: str = "GUI", interval: int = PROBE_INTERVAL, parent=None):
+        super(LagProbe, self).__init__(parent)
+        self.name = name
+        self.interval = interval
+        self.last = 0
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.Tick)
+
+    # call from the watched thread, e.g. connected to QThread.started
+    @pyqtSlot()
+    def Start(self):
+        self.last = perf_counter_ns()
+        _local.longest = None
+        self.timer.start()
+
+    @pyqtSlot()
+    def Stop(self):
+        self.timer.stop()
+
+    @pyqtSlot()
+    def Tick(self):
+        now = perf_counter_ns()
+        lag = max((now - self.last) / 1e6 - self.interval, 0.0)
+        self.last = now
+        longest = getattr(_local, "longest", None)
+        _local.longest = None
+        self.lag.emit(self.name, lag, longest[0] if longest else "")
+
+
+class LagMonitor(QObject):
+
+    stall = pyqtSignal(str, float, str)
+
+    def __init__(self, parent=None):
+        super(LagMonitor, self).__init__(parent)
+        self.probes = []
+        self.current = {}  # thread -> last lag
+        self.worst = {}  # thread -> worst lag
+        self.offenders = {}  # slot -> [stalls, worst lag]
+
+    def Watch(self, probe: LagProbe) -> LagProbe:
+        self.probes.append(probe)
+        probe.lag.connect(self.Record)
+        return probe
+
+    @pyqtSlot(str, float, str)
+    def Record(self, thread: str, lag: float, culprit: str):
+        self.current[thread] = lag
+        self.worst[thread] = max(lag, self.worst.get(thread, 0.0))
+        if lag < STALL_MS:
+            return
+
+        culprit = culprit or "<untimed>"
+        offender = self.offenders.setdefault(culprit, [0, 0.0])
+        offender[0] += 1
+        offender[1] = max(offender[1], lag)
+        print(f"[lag] {thread} stalled {lag:.0f} ms, longest slot: {culprit}")
+        self.stall.emit(thread, lag, culprit)
+
+    def WorstOffenders(self, n: int = 10) -> list:
+        ranked = sorted(self.offenders.items(), key=lambda _: _[1][1], reverse=True)
+        return [(name, stalls, worst) for name, (stalls, worst) in ranked[:n]]
+
+    def SlowestSlots(self, n: int = 10) -> list:
+        ranked = sorted(SLOT_STATS.values(), key=lambda _: _.max_ns, reverse=True)
+        return [_ for _ in ranked[:n] if _.calls]
+
+    def Reset(self):
+        self.current.clear()
+        self.worst.clear()
+        self.offenders.clear()
+        for stats in SLOT_STATS.values():
+            stats.calls, stats.total_ns, stats.max_ns = 0, 0, 0
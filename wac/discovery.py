@@ -0,0 +1,227 @@
+import json
+import time
+from time import perf_counter
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtSerialPort import QSerialPort, QSerialPortInfo
+
+from wac.command_registry import COMMANDS, CommandRegistry
+from wac.paths import DataPath
+from wac.serial_interface import BAUD_RATE
+
+"""
+Scale discovery
+
+A port only counts as a scale once it answers the handshake: the CONNECT
+code is written and its echo has to come back within HANDSHAKE_TIMEOUT.
+All candidate ports are probed at the same time, each probe is a
+QSerialPort driven by the event loop, so probing N ports takes one timeout,
+not N.
+
+The last port that answered, and the identity of the adapter behind it, are
+cached in DATA_DIR. Discover tries the cached device first, found by its
+serial number even if the OS gave it another port name, so a normal start
+is one round trip. Only when that fails are all ports probed.
+"""
+
+HANDSHAKE_TIMEOUT = 500  # ms
+CACHE_FILE = "discovery.json"
+KNOWN_MANUFACTURERS = ("Prolific",)  # probed first
+
+
+def PortIdentity(info: QSerialPortInfo) -> dict:
+    return {
+        "portName": info.portName(),
+        "manufacturer": info.manufacturer(),
+        "description": info.description(),
+        "serialNumber": info.serialNumber(),
+        "vendorId": info.vendorIdentifier() if info.hasVendorIdentifier() else None,
+        "productId": info.productIdentifier() if info.hasProductIdentifier() else None,
+    }
+
+
+class DiscoveryCache:
+    def __init__(self, path: str = None):
+        self.path = path or DataPath(CACHE_FILE)
+
+    def Load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def Save(self, identity: dict, baud_rate: int) -> None:
+        entry = {
+            "identity": identity,
+            "baudRate": baud_rate,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with open(self.path, "w") as f:
+            json.dump(entry, f, indent=2)
+
+    def Clear(self) -> None:
+        self.Save({}, BAUD_RATE)
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class PortProbe(QObject):
+
+    done = pyqtSignal(str, bool)  # port name, answered the handshake
+
+    def __init__(
+        self,
+        port_name: str,
+        baud_rate: int,
+        handshake: str,
+        timeout: int = HANDSHAKE_TIMEOUT,
+        parent=None,
+    ):
+        super(PortProbe, self).__init__(parent)
+        self.port_name = port_name
+        self.handshake = handshake
+        self.buffer = b""
+        self.finished = False
+
+        self.serial = QSerialPort(self)
+        self.serial.setPortName(port_name)
+        self.serial.setBaudRate(baud_rate)
+        self.serial.readyRead.connect(self.Receive)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(timeout)
+        self.timer.timeout.connect(lambda: self.Finish(False))
+
+    def Start(self) -> None:
+        if not self.serial.open(QSerialPort.ReadWrite):
+            # busy, missing or no permission, report it after the caller
+            # has connected to done
+            QTimer.singleShot(0, lambda: self.Finish(False))
+            return
+        self.serial.write(f"{self.handshake}\r\n".encode())
+        self.timer.start()
+
+    @pyqtSlot()
+    def Receive(self):
+        self.buffer += self.serial.readAll().data()
+        if self.handshake.encode() in self.buffer:
+            self.Finish(True)
+
+    def Finish(self, ok: bool) -> None:
+        if self.finished:
+            return
+        self.Abort()
+        self.done.emit(self.port_name, ok)
+
+    # stop without reporting, e.g. another port answered first
+    def Abort(self) -> None:
+        self.finished = True
+        self.timer.stop()
+        if self.serial.isOpen():
+            self.serial.close()
+
+
+class DiscoveryService(QObject):
+
+    found = pyqtSignal(str)  # port name of a scale that answered
+    failed = pyqtSignal()
+
+    def __init__(
+        self,
+        baud_rate: int = BAUD_RATE,
+        timeout: int = HANDSHAKE_TIMEOUT,
+        cache: DiscoveryCache = None,
+        commands: CommandRegistry = COMMANDS,
+        parent=None,
+    ):
+        super(DiscoveryService, self).__init__(parent)
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self.cache = cache or DiscoveryCache()
+        self.handshake = commands.ByType("CONNECT").code
+        self.probes = {}  # port name -> PortProbe
+        self.ports = {}  # port name -> QSerialPortInfo
+        self.remaining = []  # ports to probe if the cached one fails
+        self.started = 0.0
+
+    @pyqtSlot()
+    def Discover(self):
+        if self.probes:
+            return  # already running
+
+        self.started = perf_counter()
+        self.ports = {_.portName(): _ for _ in self.AvailablePorts()}
+        candidates = self.Candidates()
+        cached = self.CachedPort()
+        if cached is not None:
+            candidates.remove(cached)
+            self.remaining = candidates
+            self.Probe([cached])
+        else:
+            self.remaining = []
+            self.Probe(candidates)
+
+    def AvailablePorts(self) -> list:
+        return QSerialPortInfo.availablePorts()
+
+    # every port, the ones with known adapters first
+    def Candidates(self) -> list:
+        return sorted(
+            self.ports,
+            key=lambda name: self.ports[name].manufacturer() not in KNOWN_MANUFACTURERS,
+        )
+
+    # the cached adapter by serial number, else the cached port name
+    def CachedPort(self):
+        identity = self.cache.Load().get("identity") or {}
+        serialNumber = identity.get("serialNumber")
+        if serialNumber:
+            for name, info in self.ports.items():
+                if info.serialNumber() == serialNumber:
+                    return name
+        name = identity.get("portName")
+        return name if name in self.ports else None
+
+    def Probe(self, names: list) -> None:
+        if not names:
+            self.Failed()
+            return
+        for name in names:
+            probe = PortProbe(name, self.baud_rate, self.handshake, self.timeout, self)
+            probe.done.connect(self.Done)
+            self.probes[name] = probe
+        for probe in list(self.probes.values()):
+            probe.Start()
+
+    @pyqtSlot(str, bool)
+    def Done(self, port_name: str, ok: bool):
+        probe = self.probes.pop(port_name, None)
+        if probe is None:
+            return
+        probe.deleteLater()
+
+        if ok:
+            for other in self.probes.values():
+                other.Abort()
+                other.deleteLater()
+            self.probes.clear()
+            self.remaining = []
+            self.cache.Save(PortIdentity(self.ports[port_name]), self.baud_rate)
+            elapsed = (perf_counter() - self.started) * 1000
+            print(f"[discovery] scale on {port_name} after {elapsed:.0f} ms")
+            self.found.emit(port_name)
+
+        elif not self.probes:
+            remaining, self.remaining = self.remaining, []
+            if remaining:
+                self.Probe(remaining)
+            else:
+                self.Failed()
+
+    def Failed(self) -> None:
+        elapsed = (perf_counter() - self.started) * 1000
+        print(f"[discovery] no scale answered after {elapsed:.0f} ms")
+        self.failed.emit()
@@ -0,0 +1,181 @@
+import threading
+import traceback
+import weakref
+from collections import namedtuple
+from time import perf_counter, perf_counter_ns
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSlot
+
+from wac.command_request import CommandRequest
+from wac.diagnostics import TimedSlot
+from wac.tracing import TRACER
+
+"""
+EventBus: publish / subscribe between the serial worker and the widgets
+
+    bus.Subscribe(SAMPLES, self.LiveSamples)     # LiveSamples(batch: list)
+    bus.Publish(SAMPLES, line)                   # from any thread
+
+Publish only appends the payload to its topic's queue, it never calls a
+subscriber and never crosses a thread by itself. The bus lives in the GUI
+thread and drains every queue once per TICK ms: each subscriber of a topic
+gets one call with everything published to it since the last tick, in
+order. A burst of samples costs one call per subscriber instead of one
+queued signal per sample and subscriber.
+
+Topics are typed, a payload of the wrong type is refused at Publish. A topic
+with a limit keeps only its newest payloads when nobody drains it in time,
+the dropped ones are counted.
+
+Subscribers are kept in a tuple per topic that is replaced, never modified,
+so subscribing or unsubscribing at runtime, even from inside a delivery, is
+cheap and safe. A subscriber that raises is counted in its topic's failures
+and the others still get the batch.
+
+For a Qt signal emitted on another thread, Publisher gives a callable to
+connect with Qt.DirectConnection, so the payload goes into the queue on the
+emitting thread without a queued signal.
+
+While tracing, the requests of whoever published to a topic are kept until
+the tick that delivers it, the delivery span carries them to the GUI thread.
+"""
+
+TICK = 20  # ms between deliveries
+RATE_WINDOW = 1.0  # s
+
+Topic = namedtuple("Topic", ["name", "type", "limit"])
+
+SAMPLES = Topic("samples", str, 16384)  # raw live data lines, ~6 s at 2.5k/s
+ACKS = Topic("acks", CommandRequest, None)  # commands the scale acknowledged
+RESULTS = Topic("results", CommandRequest, None)  # commands that returned a value
+STATE = Topic("state", str, None)  # connected | reconnecting | disconnected
+PROMPTS = Topic("prompts", str, None)  # text for the prompt box
+TOPICS = (SAMPLES, ACKS, RESULTS, STATE, PROMPTS)
+
+BUSES = weakref.WeakSet()  # every live bus, for diagnostics
+
+
+class TopicStats:
+    __slots__ = (
+        "published",
+        "dropped",
+        "batches",
+        "delivered",
+        "failures",
+        "maxBatch",
+        "total_ns",
+        "rate",
+        "windowStart",
+        "windowCount",
+    )
+
+    def __init__(self):
+        self.published = 0
+        self.dropped = 0
+        self.batches = 0
+        self.delivered = 0  # payloads x subscribers
+        self.failures = 0
+        self.maxBatch = 0
+        self.total_ns = 0
+        self.rate = 0.0  # published per s over the last window
+        self.windowStart = perf_counter()
+        self.windowCount = 0
+
+    def MeanBatch(self) -> float:
+        return self.published / self.batches if self.batches else 0.0
+
+
+class EventBus(QObject):
+    def __init__(self, topics: tuple = TOPICS, tick: int = TICK, parent=None):
+        super(EventBus, self).__init__(parent)
+        self.setObjectName("EventBus")
+        self.topics = {_.name: _ for _ in topics}
+        self.queues = {_: [] for _ in self.topics}
+        self.subscribers = {_: () for _ in self.topics}
+        self.stats = {_: TopicStats() for _ in self.topics}
+        self.traceKeys = {_: [] for _ in self.topics}  # only while tracing
+        self.lock = threading.Lock()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(tick)
+        self.timer.timeout.connect(self.Dispatch)
+        self.timer.start()
+        BUSES.add(self)
+
+    def Subscribe(self, topic: Topic, callback) -> tuple:
+        with self.lock:
+            self.subscribers[topic.name] += (callback,)
+        return (topic, callback)
+
+    # takes what Subscribe returned
+    def Unsubscribe(self, subscription: tuple) -> bool:
+        topic, callback = subscription
+        with self.lock:
+            current = self.subscribers[topic.name]
+            remaining = tuple(_ for _ in current if _ != callback)
+            self.subscribers[topic.name] = remaining
+        return len(remaining) < len(current)
+
+    # [any thread]
+    def Publish(self, topic: Topic, payload) -> None:
+        if not isinstance(payload, topic.type):
+            raise TypeError(
+                f"{topic.name} takes {topic.type.__name__}, "
+                f"not {type(payload).__name__}"
+            )
+        stats = self.stats[topic.name]
+        with self.lock:
+            queue = self.queues[topic.name]
+            queue.append(payload)
+            stats.published += 1
+            if topic.limit is not None and len(queue) > topic.limit:
+                del queue[0]
+                stats.dropped += 1
+            if TRACER.enabled:
+                self.traceKeys[topic.name].extend(TRACER.Keys())
+
+    def Publisher(self, topic: Topic):
+        return lambda payload: self.Publish(topic, payload)
+
+    @pyqtSlot()
+    @TimedSlot("EventBus.Dispatch")
+    def Dispatch(self):
+        with self.lock:
+            batches, keys = {}, {}
+            for name, queue in self.queues.items():
+                if queue:
+                    batches[name] = queue
+                    self.queues[name] = []
+                    keys[name] = self.traceKeys[name]
+                    self.traceKeys[name] = []
+
+        now = perf_counter()
+        for name, batch in batches.items():
+            stats = self.stats[name]
+            span = None
+            if TRACER.enabled:
+                span = TRACER.Begin(f"EventBus.{name}", list(dict.fromkeys(keys[name])))
+            start = perf_counter_ns()
+            for callback in self.subscribers[name]:
+                try:
+                    callback(batch)
+                except Exception:
+                    stats.failures += 1
+                    traceback.print_exc()
+                stats.delivered += len(batch)
+            stats.total_ns += perf_counter_ns() - start
+            if span is not None:
+                TRACER.End(span)
+            stats.batches += 1
+            stats.windowCount += len(batch)
+            if len(batch) > stats.maxBatch:
+                stats.maxBatch = len(batch)
+
+        for stats in self.stats.values():
+            if now - stats.windowStart >= RATE_WINDOW:
+                stats.rate = stats.windowCount / (now - stats.windowStart)
+                stats.windowStart, stats.windowCount = now, 0
+
+    def Stop(self) -> None:
+        self.timer.stop()
+        self.Dispatch()
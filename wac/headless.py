@@ -0,0 +1,199 @@
+import argparse
+import csv
+import sys
+import time
+
+from PyQt5.QtCore import QCoreApplication, QObject, QTimer, pyqtSignal, pyqtSlot
+
+from wac.command_button import Command
+from wac.command_registry import COMMANDS
+from wac.command_request import CommandRequest, RequestScheduler
+from wac.serial_interface import BAUD_RATE, COM_PORT, SerialInterface
+
+"""
+Headless runner: drives the scale through the same Command definitions and
+SerialInterface the GUI uses, without creating a single widget. Only a
+QCoreApplication is needed, so it runs on stations without a monitor, on CI
+servers and in load tests.
+
+    py setup_headless.py --port COM5 --repeat 100 --log results.csv
+"""
+
+SEQUENCE = [
+    "CONNECT",
+    "CALIBRATE",
+    "TARE",
+    "STARTWEIGH",
+    "WEIGH",
+    "STARTCOUNT",
+    "COUNT",
+    "LOGITEM",
+    "FINISH",
+]
+TIMEOUT = 5000  # ms to wait for the scale to answer a command
+LOG_FIELDS = [
+    "time",
+    "run",
+    "step",
+    "id",
+    "cmdType",
+    "cmd",
+    "returnValue",
+    "latency_ms",
+]
+
+
+class HeadlessScale(QObject):
+
+    finished = pyqtSignal(int)  # exit code
+
+    def __init__(
+        self,
+        port_name: str = COM_PORT,
+        baud_rate: int = BAUD_RATE,
+        sequence: list = SEQUENCE,
+        repeat: int = 1,
+        timeout: int = TIMEOUT,
+        log=None,
+        parent=None,
+    ):
+        super(HeadlessScale, self).__init__(parent)
+        self.sequence = [cmdType.upper() for cmdType in sequence]
+        self.repeat = repeat
+        self.commands = {spec.cmdType: Command(spec, parent=self) for spec in COMMANDS}
+        self.scheduler = RequestScheduler()
+        self.current = None  # request of the running step
+        unknown = [_ for _ in self.sequence if _ not in self.commands]
+        if unknown:
+            raise ValueError(f"unknown command types: {', '.join(unknown)}")
+        if repeat < 1:
+            raise ValueError(f"repeat must be at least 1, not {repeat}")
+
+        self.log = csv.DictWriter(log or sys.stdout, fieldnames=LOG_FIELDS)
+        self.log.writeheader()
+
+        self.serial = SerialInterface(parent=self)
+        self.serial.SerialConfig(port_name, baud_rate)
+        self.serial.serial_cmd_response.connect(self.Response)
+        self.serial.serial_disconnected.connect(self.ConnectionFailed)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(timeout)
+        self.timer.timeout.connect(self.Timeout)
+
+        self.run, self.step, self.started = 0, -1, 0
+        self.completed = 0
+
+    @pyqtSlot()
+    def Start(self):
+        self.started = time.perf_counter()
+        self.NextStep()
+
+    def NextStep(self):
+        self.step += 1
+        if self.step == len(self.sequence):
+            self.run, self.step = self.run + 1, 0
+            if self.run == self.repeat:
+                self.Finish(0)
+                return
+
+        cmd = self.current = self.scheduler.Schedule(
+            self.commands[self.sequence[self.step]]
+        )
+        self.timer.start()
+        if cmd.cmdType == "CONNECT":
+            self.serial.Connect(cmd)
+        elif cmd.cmdType == "DISCONNECT":
+            self.serial.Disconnect(cmd)
+        else:
+            self.serial.RunCommand(cmd)
+
+    @pyqtSlot(object)
+    def Response(self, cmd: CommandRequest):
+        if cmd is not self.current:
+            return
+        self.current = None
+        self.timer.stop()
+        self.completed += 1
+        self.log.writerow(
+            {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "run": self.run,
+                "step": self.step,
+                "id": cmd.id,
+                "cmdType": cmd.cmdType,
+                "cmd": cmd.cmd,
+                "returnValue": cmd.returnValue,
+                "latency_ms": round((time.perf_counter_ns() - cmd.createdAt) / 1e6, 3),
+            }
+        )
+        # continue from the event loop, not from inside the serial handler
+        QTimer.singleShot(0, self.NextStep)
+
+    @pyqtSlot()
+    def ConnectionFailed(self):
+        if self.step >= 0 and self.sequence[self.step] == "CONNECT":
+            print(f"[headless] Could not open {self.serial.port_name}", file=sys.stderr)
+            self.Finish(1)
+
+    @pyqtSlot()
+    def Timeout(self):
+        cmdType = self.sequence[self.step]
+        print(f"[headless] No response to {cmdType}", file=sys.stderr)
+        self.Finish(1)
+
+    def Finish(self, code: int):
+        self.timer.stop()
+        elapsed = time.perf_counter() - self.started
+        rate = self.completed / elapsed if elapsed else 0
+        print(
+            f"[headless] {self.completed} commands in {elapsed:.3f} s ({rate:.1f}/s)",
+            file=sys.stderr,
+        )
+        self.serial.Terminate()
+        self.finished.emit(code)
+
+
+# argparse type for --repeat, a run count of 0 or less would never finish
+def Runs(text: str) -> int:
+    runs = int(text)
+    if runs < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {runs}")
+    return runs
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the scale without a GUI")
+    parser.add_argument("--port", default=COM_PORT)
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    parser.add_argument(
+        "--sequence",
+        default=",".join(SEQUENCE),
+        help="comma separated command types, e.g. CONNECT,TARE,WEIGH",
+    )
+    parser.add_argument("--repeat", type=Runs, default=1)
+    parser.add_argument("--timeout", type=int, default=TIMEOUT, help="ms")
+    parser.add_argument("--log", default=None, help="CSV file, default stdout")
+    args = parser.parse_args(argv)
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    log = open(args.log, "w", newline="") if args.log else None
+    scale = HeadlessScale(
+        port_name=args.port,
+        baud_rate=args.baud,
+        sequence=args.sequence.split(","),
+        repeat=args.repeat,
+        timeout=args.timeout,
+        log=log,
+    )
+    scale.finished.connect(app.exit)
+    QTimer.singleShot(0, scale.Start)
+    code = app.exec_()
+    if log:
+        log.close()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
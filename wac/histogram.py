@@ -0,0 +1,52 @@
+import csv
+
+import numpy as np
+
+"""
+FixedBinHistogram: incrementally updated counters over fixed, equal width bins.
+Every batch of values is added with a single numpy.bincount, the history is
+never revisited. Two extra bins collect values below and above the range.
+"""
+
+
+class FixedBinHistogram:
+    def __init__(self, low: float = 0, high: float = 1000, bins: int = 200):
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.width = (high - low) / bins
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins + 2, dtype=np.int64)
+
+    def Add(self, values) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        if not values.size:
+            return
+        index = np.floor((values - self.low) / self.width).astype(np.int64) + 1
+        np.clip(index, 0, self.bins + 1, out=index)
+        self.counts += np.bincount(index, minlength=self.bins + 2)
+
+    def Reset(self) -> None:
+        self.counts[:] = 0
+
+    # counts inside the range, one per bin
+    def Bins(self) -> np.ndarray:
+        return self.counts[1:-1]
+
+    def Underflow(self) -> int:
+        return int(self.counts[0])
+
+    def Overflow(self) -> int:
+        return int(self.counts[-1])
+
+    def Total(self) -> int:
+        return int(self.counts.sum())
+
+    def Export(self, path: str) -> None:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["low", "high", "count"])
+            writer.writerow(["-inf", self.low, self.Underflow()])
+            for low, high, count in zip(self.edges[:-1], self.edges[1:], self.Bins()):
+                writer.writerow([low, high, count])
+            writer.writerow([self.high, "inf", self.Overflow()])
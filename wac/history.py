@@ -0,0 +1,195 @@
+import os
+import time
+
+import numpy as np
+
+from wac.paths import DataPath
+
+"""
+MinMaxPyramid: on-disk sample history with a min/max decimation pyramid
+
+Level 0 is the raw sample file. Level k holds one (min, max) pair for every
+FACTOR**k raw samples and lives next to it as '<path>.L<k>'. Levels are built
+incrementally as samples are appended, so a query for any span of history
+reads at most a few thousand pairs from the coarsest level that still has
+enough resolution, regardless of how long the recording is.
+
+Samples that do not yet fill a whole block at some level are kept in memory
+(the 'tails', at most FACTOR - 1 entries per level) and are folded into the
+last point of a query, so the right hand edge of the plot is always current.
+"""
+
+DTYPE = np.int32
+FACTOR = 8
+MAX_LEVELS = 12
+CHUNK = 256  # samples buffered in memory before they are appended to disk
+MAX_POINTS = 2000
+
+
+def SessionPath(name: str = None) -> str:
+    name = name or time.strftime("%Y%m%d-%H%M%S")
+    return DataPath("history", f"{name}.i32")
+
+
+class MinMaxPyramid:
+    def __init__(self, path: str = None, factor: int = FACTOR):
+        self.path = path or SessionPath()
+        self.factor = factor
+        self.buffer = []
+        # per level: number of entries on disk and the open file
+        self.counts = []
+        self.files = []
+        # per level: (lo, hi) entries not yet folded into the level above
+        self.tails = []
+        self.Open()
+
+    def LevelPath(self, level: int) -> str:
+        return self.path if level == 0 else f"{self.path}.L{level}"
+
+    def Open(self) -> None:
+        level = 0
+        while level < MAX_LEVELS and os.path.exists(self.LevelPath(level)):
+            self.AddLevel(level)
+            level += 1
+        if not self.files:
+            self.AddLevel(0)
+
+        # rebuild the in-memory tails from whatever the level above has not
+        # consumed yet
+        for level in range(len(self.files)):
+            consumed = (
+                self.counts[level + 1] * self.factor
+                if level + 1 < len(self.files)
+                else self.counts[level] - self.counts[level] % self.factor
+            )
+            lo, hi = self.ReadLevel(level, consumed, self.counts[level])
+            self.tails[level] = (lo, hi)
+
+    def AddLevel(self, level: int) -> None:
+        path = self.LevelPath(level)
+        self.files.append(open(path, "ab"))
+        width = 1 if level == 0 else 2
+        entries = os.path.getsize(path) // (np.dtype(DTYPE).itemsize * width)
+        self.counts.append(entries)
+        self.tails.append((np.empty(0, DTYPE), np.empty(0, DTYPE)))
+
+    def Close(self) -> None:
+        self.Flush()
+        for f in self.files:
+            f.close()
+        self.files = []
+
+    """
+    Buffer a single sample, appending to disk every CHUNK samples
+    """
+
+    def Push(self, value: int) -> None:
+        self.buffer.append(value)
+        if len(self.buffer) >= CHUNK:
+            self.Flush()
+
+    # a batch of samples, e.g. one event bus tick
+    def Extend(self, values) -> None:
+        self.buffer.extend(values)
+        if len(self.buffer) >= CHUNK:
+            self.Flush()
+
+    def Flush(self) -> None:
+        if self.buffer:
+            self.Append(())
+
+    def Append(self, values) -> None:
+        if self.buffer:
+            values, self.buffer = self.buffer + list(values), []
+        values = np.asarray(values, dtype=DTYPE)
+        self.WriteLevel(0, values)
+        lo, hi, level = values, values, 0
+
+        while len(lo) and level < MAX_LEVELS - 1:
+            tailLo, tailHi = self.tails[level]
+            lo, hi = np.concatenate((tailLo, lo)), np.concatenate((tailHi, hi))
+            full = len(lo) - len(lo) % self.factor
+            self.tails[level] = (lo[full:], hi[full:])
+            if not full:
+                break
+
+            lo = lo[:full].reshape(-1, self.factor).min(axis=1)
+            hi = hi[:full].reshape(-1, self.factor).max(axis=1)
+            level += 1
+            if level == len(self.files):
+                self.AddLevel(level)
+            self.WriteLevel(level, np.column_stack((lo, hi)))
+
+        for f in self.files:
+            f.flush()
+
+    def WriteLevel(self, level: int, entries: np.ndarray) -> None:
+        self.files[level].write(np.ascontiguousarray(entries, DTYPE).tobytes())
+        self.counts[level] += len(entries)
+
+    def ReadLevel(self, level: int, start: int, stop: int):
+        width = 1 if level == 0 else 2
+        start, stop = max(start, 0), min(stop, self.counts[level])
+        if stop <= start:
+            return np.empty(0, DTYPE), np.empty(0, DTYPE)
+
+        data = np.fromfile(
+            self.LevelPath(level),
+            dtype=DTYPE,
+            count=(stop - start) * width,
+            offset=start * width * np.dtype(DTYPE).itemsize,
+        )
+        if level == 0:
+            return data, data
+        data = data.reshape(-1, 2)
+        return data[:, 0], data[:, 1]
+
+    def __len__(self) -> int:
+        return self.counts[0] + len(self.buffer)
+
+    """
+    Return (x, lo, hi) covering raw samples [start, stop) with at most about
+    maxPoints entries, read from the coarsest adequate level.
+    x is the raw sample index at the start of each entry.
+    """
+
+    def Query(self, start: int = 0, stop: int = None, maxPoints: int = MAX_POINTS):
+        self.Flush()
+        total = self.counts[0]
+        stop = total if stop is None else min(int(stop), total)
+        start = max(int(start), 0)
+        if stop <= start:
+            empty = np.empty(0, DTYPE)
+            return np.empty(0, np.int64), empty, empty
+
+        level = 0
+        while (
+            level + 1 < len(self.files)
+            and (stop - start) / self.factor**level > maxPoints
+        ):
+            level += 1
+
+        span = self.factor**level
+        first, last = start // span, -(-stop // span)
+        lo, hi = self.ReadLevel(level, first, last)
+        x = (first + np.arange(len(lo), dtype=np.int64)) * span
+
+        # fold the not yet decimated tails of the lower levels into a single
+        # partial entry at the right hand edge
+        covered = self.counts[level] * span
+        if level and last > self.counts[level] and covered < total:
+            tailLo = [t[0] for t in self.tails[:level] if len(t[0])]
+            tailHi = [t[1] for t in self.tails[:level] if len(t[1])]
+            if tailLo:
+                lo = np.append(lo, min(t.min() for t in tailLo))
+                hi = np.append(hi, max(t.max() for t in tailHi))
+                x = np.append(x, covered)
+        return x, lo, hi
+
+    """
+    Interleave min and max into a single polyline, ready for plotting
+    """
+
+    def Envelope(self, start: int = 0, stop: int = None, maxPoints: int = MAX_POINTS):
+        x, lo, hi = self.Query(start, stop, maxPoints)
+        return np.repeat(x, 2), np.column_stack((lo, hi)).ravel()
@@ -0,0 +1,197 @@
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import struct
+
+from PyQt5.QtCore import QObject, QSocketNotifier, QTimer, pyqtSignal, pyqtSlot
+
+"""
+Serial hotplug detection (Linux)
+
+HotplugWatcher puts inotify watches on the device directories and wakes up
+through a QSocketNotifier only when the kernel reports a change, there is no
+polling while idle. Device nodes matching PATTERNS that appear or disappear
+under ROOTS are reported as added / removed. Additions are held back for
+SETTLE_MS so udev can finish setting permissions before anybody opens the
+port.
+
+sysfs does not produce inotify events for new devices, so /dev (and the
+udev by-id links) are watched instead. The roots and patterns are
+arguments, tests point them at a temporary directory tree.
+
+On other platforms, or without inotify, Start returns False and nothing is
+watched.
+"""
+
+ROOTS = ("/dev", "/dev/serial/by-id")
+PATTERNS = ("ttyUSB*", "ttyACM*", "usb-*")
+SETTLE_MS = 200
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF
+
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, len, then the name
+
+
+class Inotify:
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def Add(self, path: str, mask: int = WATCH_MASK) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch {path}")
+        return wd
+
+    # every pending event as (wd, mask, name)
+    def Read(self) -> list:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def Close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class HotplugWatcher(QObject):
+
+    added = pyqtSignal(str)  # device path
+    removed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        roots: tuple = ROOTS,
+        patterns: tuple = PATTERNS,
+        settle: int = SETTLE_MS,
+        parent=None,
+    ):
+        super(HotplugWatcher, self).__init__(parent)
+        self.roots = tuple(os.path.normpath(_) for _ in roots)
+        self.patterns = patterns
+        self.inotify = None
+        self.notifier = None
+        self.watches = {}  # wd -> directory
+        self.settling = set()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(settle)
+        self.timer.timeout.connect(self.Settled)
+
+    def Start(self) -> bool:
+        if self.inotify is not None:
+            return True
+        try:
+            self.inotify = Inotify()
+        except (OSError, AttributeError, TypeError):
+            # not Linux, or no inotify
+            self.inotify = None
+            return False
+
+        self.WatchRoots(report=False)
+        self.notifier = QSocketNotifier(self.inotify.fd, QSocketNotifier.Read, self)
+        self.notifier.activated.connect(self.Read)
+        return True
+
+    def Stop(self) -> None:
+        if self.inotify is None:
+            return
+        self.notifier.setEnabled(False)
+        self.notifier.deleteLater()
+        self.inotify.Close()
+        self.inotify, self.notifier = None, None
+        self.watches.clear()
+        self.timer.stop()
+        self.settling.clear()
+
+    # a root that does not exist yet is watched through its nearest existing
+    # parent and picked up when it is created, e.g. /dev/serial/by-id after
+    # the first adapter is plugged in
+    def WatchRoots(self, report: bool = True) -> None:
+        for root in self.roots:
+            directory = root
+            while (
+                not os.path.isdir(directory) and os.path.dirname(directory) != directory
+            ):
+                directory = os.path.dirname(directory)
+            if self.Watch(directory) and directory == root and report:
+                # created after we last looked, report what is already there
+                for name in os.listdir(root):
+                    if self.Matches(name):
+                        self.Settle(os.path.join(root, name))
+
+    def Watch(self, directory: str) -> bool:
+        if directory in self.watches.values() or not os.path.isdir(directory):
+            return False
+        try:
+            self.watches[self.inotify.Add(directory)] = directory
+        except OSError as e:
+            print(f"[hotplug] {e.strerror}: {directory}")
+            return False
+        return True
+
+    def Settle(self, path: str) -> None:
+        self.settling.add(path)
+        self.timer.start()
+
+    def Matches(self, name: str) -> bool:
+        return any(fnmatch.fnmatch(name, _) for _ in self.patterns)
+
+    @pyqtSlot(int)
+    def Read(self, fd: int = -1):
+        for wd, mask, name in self.inotify.Read():
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF):
+                self.watches.pop(wd, None)
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.WatchRoots()
+                continue
+            if directory not in self.roots or not self.Matches(name):
+                continue
+
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self.Settle(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                if path in self.settling:
+                    self.settling.discard(path)
+                else:
+                    self.removed.emit(path)
+
+    @pyqtSlot()
+    def Settled(self):
+        settled, self.settling = self.settling, set()
+        for path in sorted(settled):
+            if os.path.exists(path):
+                self.added.emit(path)
@@ -0,0 +1,321 @@
+import bisect
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from wac.diagnostics import SLOT_STATS
+
+"""
+Metrics in Prometheus text format, for scraping every station's health
+
+    SAMPLES.Inc(samples)                     # any thread, no lock
+    COMMAND_LATENCY.Observe(0.012)           # s
+    REGISTRY.Collect("wac_pending_requests", "...", lambda: len(tracker))
+    MetricsServer().Start()                  # GET http://127.0.0.1:9731/metrics
+
+Counters and histograms are sharded per thread: the first update on a
+thread gives it its own cell, after that the thread only ever adds to its
+own cell, so the worker and the GUI never contend and never take a lock.
+Nothing is added up or formatted until a scrape asks for it, on the
+server's thread, which reads every cell. A gauge is set with a plain
+assignment, a collector is a callable read at scrape time, e.g. the length
+of a queue.
+
+The server listens on 127.0.0.1 at METRICS_PORT, WAC_METRICS_PORT=0 turns it
+off. WAC_METRICS_SOCKET=/path serves the same page over a Unix socket, e.g.
+for curl --unix-socket or a local agent.
+"""
+
+METRICS_PORT = int(os.environ.get("WAC_METRICS_PORT", "9731"))
+METRICS_SOCKET = os.environ.get("WAC_METRICS_SOCKET")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# backslash, double quote and newline are escaped in a label value
+def Escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def Labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, Escape(value)) for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelNames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelNames = tuple(labelNames)
+        self.children = {}  # label values -> child
+
+    def Labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            # setdefault is atomic, two threads end up with the same child
+            child = self.children.setdefault(values, self.Child())
+        return child
+
+    def Render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        if self.labelNames:
+            for values, child in list(self.children.items()):
+                lines.extend(child.Samples(self.name, Labels(self.labelNames, values)))
+        else:
+            lines.extend(self.Samples(self.name, ""))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelNames: tuple = ()):
+        super(Counter, self).__init__(name, help, labelNames)
+        self.cells = []  # one [value] per thread that counted
+        self.local = threading.local()
+
+    def Child(self):
+        return Counter(self.name, self.help)
+
+    def Inc(self, amount: float = 1) -> None:
+        try:
+            self.local.cell[0] += amount
+        except AttributeError:
+            cell = self.local.cell = [amount]
+            self.cells.append(cell)
+
+    def Value(self) -> float:
+        return sum(_[0] for _ in list(self.cells))
+
+    def Samples(self, name: str, labels: str) -> list:
+        return [f"{name}{labels} {self.Value()}"]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelNames: tuple = ()):
+        super(Gauge, self).__init__(name, help, labelNames)
+        self.value = 0
+
+    def Child(self):
+        return Gauge(self.name, self.help)
+
+    # one writer per gauge, a plain assignment
+    def Set(self, value: float) -> None:
+        self.value = value
+
+    def Samples(self, name: str, labels: str) -> list:
+        return [f"{name}{labels} {self.value}"]
+
+
+class Collector(Metric):
+
+    # read returns a number, or with labelNames {label value(s): number}
+    def __init__(
+        self, name: str, help: str, read, labelNames: tuple = (), kind: str = "gauge"
+    ):
+        super(Collector, self).__init__(name, help, labelNames)
+        self.read = read
+        self.kind = kind
+
+    def Render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        value = self.read()
+        if not self.labelNames:
+            return lines + [f"{self.name} {value}"]
+        for values, number in value.items():
+            values = values if isinstance(values, tuple) else (values,)
+            lines.append(f"{self.name}{Labels(self.labelNames, values)} {number}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        buckets: tuple = LATENCY_BUCKETS,
+        labelNames: tuple = (),
+    ):
+        super(Histogram, self).__init__(name, help, labelNames)
+        self.buckets = tuple(buckets)
+        self.cells = []  # per thread: a count per bucket, +Inf, then the sum
+        self.local = threading.local()
+
+    def Child(self):
+        return Histogram(self.name, self.help, self.buckets)
+
+    def Observe(self, value: float) -> None:
+        try:
+            cell = self.local.cell
+        except AttributeError:
+            cell = self.local.cell = [0] * (len(self.buckets) + 2)
+            self.cells.append(cell)
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def Samples(self, name: str, labels: str) -> list:
+        totals = [0] * (len(self.buckets) + 2)
+        for cell in list(self.cells):
+            for i, value in enumerate(cell):
+                totals[i] += value
+        inner = labels[1:-1] + "," if labels else ""
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ("+Inf",), totals):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{inner}le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{labels} {totals[-1]}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+
+    def Register(self, metric: Metric) -> Metric:
+        return self.metrics.setdefault(metric.name, metric)
+
+    def Counter(self, name: str, help: str, labelNames: tuple = ()) -> Counter:
+        return self.Register(Counter(name, help, labelNames))
+
+    def Gauge(self, name: str, help: str, labelNames: tuple = ()) -> Gauge:
+        return self.Register(Gauge(name, help, labelNames))
+
+    def Collect(
+        self, name: str, help: str, read, labelNames: tuple = (), kind: str = "gauge"
+    ) -> Collector:
+        collector = Collector(name, help, read, labelNames, kind)
+        # a window opened again replaces the callable of the old one
+        self.metrics[name] = collector
+        return collector
+
+    def Histogram(
+        self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.Register(Histogram(name, help, buckets))
+
+    # [scrape thread] the only place values are added up and formatted
+    def Render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            try:
+                lines.extend(metric.Render())
+            except Exception as e:
+                lines.append(f"# {metric.name} failed: {e!r}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+LINES = REGISTRY.Counter("wac_lines_total", "Lines received from the scale")
+SAMPLES = REGISTRY.Counter(
+    "wac_samples_total", "Live weight samples received from the scale"
+)
+BYTES_RECEIVED = REGISTRY.Counter(
+    "wac_serial_received_bytes_total", "Bytes read from the serial port"
+)
+BYTES_SENT = REGISTRY.Counter(
+    "wac_serial_sent_bytes_total", "Bytes written to the serial port"
+)
+COMMANDS_SENT = REGISTRY.Counter("wac_commands_sent_total", "Commands written")
+PARSE_ERRORS = REGISTRY.Counter(
+    "wac_parse_errors_total", "Lines that could not be parsed", ("source",)
+)
+COMMAND_LATENCY = REGISTRY.Histogram(
+    "wac_command_latency_seconds", "From writing a command to its response"
+)
+CONNECTED = REGISTRY.Gauge("wac_connected", "1 while the serial port is open")
+REGISTRY.Collect(
+    "wac_slot_calls_total",
+    "Calls of every timed slot",
+    lambda: {name: _.calls for name, _ in list(SLOT_STATS.items())},
+    ("slot",),
+    "counter",
+)
+REGISTRY.Collect(
+    "wac_slot_seconds_total",
+    "Time spent in every timed slot",
+    lambda: {name: _.total_ns / 1e9 for name, _ in list(SLOT_STATS.items())},
+    ("slot",),
+    "counter",
+)
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.Render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # scrapes are not worth a line on stdout
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class MetricsServer:
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        port: int = METRICS_PORT,
+        socketPath: str = METRICS_SOCKET,
+    ):
+        self.handler = type("Handler", (MetricsHandler,), {"registry": registry})
+        self.port = port
+        self.socketPath = socketPath
+        self.servers = []
+
+    def Start(self) -> None:
+        if self.port:
+            self.Serve(ThreadingHTTPServer, ("127.0.0.1", self.port))
+        if self.socketPath:
+            if os.path.exists(self.socketPath):
+                os.remove(self.socketPath)
+            self.Serve(UnixHTTPServer, self.socketPath)
+
+    def Serve(self, server, address) -> None:
+        try:
+            server = server(address, self.handler)
+        except OSError as e:
+            print(f"[metrics] cannot listen on {address}: {e}")
+            return
+        server.daemon_threads = True
+        thread = threading.Thread(
+            target=server.serve_forever, name="MetricsServer", daemon=True
+        )
+        thread.start()
+        self.servers.append(server)
+        print(f"[metrics] serving on {address}")
+
+    def Stop(self) -> None:
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.servers = []
+        if self.socketPath and os.path.exists(self.socketPath):
+            os.remove(self.socketPath)
@@ -0,0 +1,14 @@
+import os
+
+"""
+Location of everything the application writes to disk: recorded sample
+history, logged results and caches. Override with the WAC_DATA_DIR environment
+variable, e.g. to keep a station's data on a separate drive.
+"""
+DATA_DIR = os.environ.get("WAC_DATA_DIR", os.path.join(os.path.expanduser("~"), ".wac"))
+
+
+def DataPath(*parts: str) -> str:
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
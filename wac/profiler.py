@@ -0,0 +1,287 @@
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from wac.diagnostics import SLOT_STATS
+from wac.paths import DataPath
+
+"""
+Profiling on demand, for the GUI and the serial worker thread
+
+    profiler = Profiler()
+    profiler.Watch("GUI")                    # the thread the profiler lives in
+    profiler.Watch("Worker", self.thread)    # any other QThread
+    profiler.SetMode(CPROFILE)               # or SAMPLING, OFF writes the report
+
+Nothing is profiled until a mode is set, from the diagnostics panel or with
+WAC_PROFILE=cprofile|sampling at startup, so an idle profiler costs nothing
+but the TimedSlot counters that are always on.
+
+CPROFILE: cProfile only sees the thread that enabled it, so every watched
+thread gets a ThreadProfiler living in it that enables and disables its own
+profile when the start and stop signals arrive. Each thread's profile is
+written to profiles/<stamp>-<thread>.prof in the data directory, open it
+with snakeviz or pstats.
+
+SAMPLING: a plain thread looks at the stacks of the watched threads every
+SAMPLE_INTERVAL through sys._current_frames(), the profiled threads run
+untouched. Stacks are written in the folded format of flamegraph.pl and
+speedscope, profiles/<stamp>-sampling.folded.
+
+Switching off, or leaving the application while a capture runs, prints the
+report: the top functions of every capture and the TimedSlot counters, it is
+also written next to the captures as <stamp>-report.txt.
+"""
+
+OFF = "off"
+CPROFILE = "cprofile"
+SAMPLING = "sampling"
+MODES = (OFF, CPROFILE, SAMPLING)
+
+PROFILE_MODE = os.environ.get("WAC_PROFILE", OFF).lower()
+SAMPLE_INTERVAL = 0.005  # s
+REPORT_LINES = 25
+
+
+def ProfilePath(stamp: str, name: str) -> str:
+    return DataPath("profiles", f"{stamp}-{name}")
+
+
+def SlotReport(n: int = REPORT_LINES) -> str:
+    ranked = sorted(SLOT_STATS.values(), key=lambda _: _.total_ns, reverse=True)
+    lines = [f"{'slot':<40} {'calls':>9} {'total ms':>10} {'mean us':>9} {'max ms':>8}"]
+    lines.extend(
+        f"{_.name:<40} {_.calls:>9} {_.total_ns / 1e6:>10.1f} "
+        f"{_.Mean() / 1e3:>9.1f} {_.max_ns / 1e6:>8.2f}"
+        for _ in ranked[:n]
+        if _.calls
+    )
+    return "\n".join(lines)
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class StackSampler:
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.threads = {}  # thread ident -> name
+        self.stacks = Counter()  # folded stack -> samples
+        self.labels = {}  # code -> "function (file:line)"
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    # [any thread]
+    def Watch(self, ident: int, name: str) -> None:
+        self.threads[ident] = name
+
+    def Start(self) -> None:
+        self.thread = threading.Thread(
+            target=self.Run, name="StackSampler", daemon=True
+        )
+        self.thread.start()
+
+    def Run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, name in list(self.threads.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[self.Fold(name, frame)] += 1
+            self.samples += 1
+
+    def Label(self, code) -> str:
+        label = self.labels.get(code)
+        if label is None:
+            fileName = os.path.basename(code.co_filename)
+            label = f"{code.co_name} ({fileName}:{code.co_firstlineno})"
+            self.labels[code] = label
+        return label
+
+    def Fold(self, name: str, frame) -> str:
+        stack = []
+        while frame is not None:
+            stack.append(self.Label(frame.f_code))
+            frame = frame.f_back
+        stack.append(name)
+        return ";".join(reversed(stack))
+
+    # writes the folded stacks, returns the report
+    def Stop(self, stamp: str) -> str:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        path = ProfilePath(stamp, "sampling.folded")
+        with open(path, "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+        own = Counter()  # samples with the function on top of the stack
+        for stack, count in self.stacks.items():
+            thread, top = stack.partition(";")[0], stack.rsplit(";", 1)[-1]
+            own[f"{thread}: {top}"] += count
+        total = sum(own.values()) or 1
+        lines = [f"sampling, {self.samples} samples, {path}"]
+        lines.extend(
+            f"{100 * count / total:6.1f}%  {function}"
+            for function, count in own.most_common(REPORT_LINES)
+        )
+        return "\n".join(lines)
+
+
+class ThreadProfiler(QObject):
+
+    stopped = pyqtSignal()
+
+    def __init__(self, name: str, owner: "Profiler"):
+        super(ThreadProfiler, self).__init__()
+        self.name = name
+        self.owner = owner
+        self.profile = None
+        self.stamp = ""
+        self.report = ""  # of the last capture, until the owner takes it
+
+    # [watched thread]
+    @pyqtSlot(str, str)
+    def Start(self, mode: str, stamp: str):
+        self.stamp = stamp
+        if mode == CPROFILE:
+            self.profile = cProfile.Profile()
+            try:
+                self.profile.enable()
+            except ValueError as e:
+                # Python 3.12+ allows one active profile per process
+                print(f"[profile] {self.name} not profiled: {e}")
+                self.profile = None
+        elif mode == SAMPLING and self.owner.sampler is not None:
+            self.owner.sampler.Watch(threading.get_ident(), self.name)
+
+    # [watched thread]
+    @pyqtSlot()
+    def Stop(self):
+        self.Finish()
+        self.stopped.emit()
+
+    # [watched thread] or at exit, once the thread is gone
+    def Finish(self) -> None:
+        profile, self.profile = self.profile, None
+        if profile is None:
+            return
+        profile.disable()
+        path = ProfilePath(self.stamp, f"{self.name}.prof")
+        profile.dump_stats(path)
+        text = io.StringIO()
+        try:
+            stats = pstats.Stats(profile, stream=text)
+        except TypeError:
+            # nothing but the event loop ran in Python
+            self.report = f"cProfile {self.name}, no Python calls"
+            return
+        stats.sort_stats("cumulative").print_stats(REPORT_LINES)
+        self.report = f"cProfile {self.name}, {path}\n{text.getvalue().strip()}"
+
+
+class Profiler(QObject):
+
+    start = pyqtSignal(str, str)  # mode, stamp
+    stop = pyqtSignal()
+    mode_changed = pyqtSignal(str)
+
+    def __init__(self, mode: str = PROFILE_MODE, parent=None):
+        super(Profiler, self).__init__(parent)
+        self.mode = OFF
+        self.initial = mode if mode in MODES else OFF
+        self.stamp = ""
+        self.sampler = None
+        self.sections = []  # of the capture being stopped
+        self.waiting = 0  # watched threads that have not stopped yet
+        self.watched = []
+        atexit.register(self.Exit)
+
+    # profile a thread, the thread the profiler lives in when thread is None
+    def Watch(self, name: str, thread: QThread = None) -> ThreadProfiler:
+        watched = ThreadProfiler(name, self)
+        if thread is not None:
+            watched.moveToThread(thread)
+            thread.finished.connect(watched.deleteLater)
+        self.start.connect(watched.Start)
+        self.stop.connect(watched.Stop)
+        watched.stopped.connect(self.Stopped)
+        self.watched.append(watched)
+        return watched
+
+    # starts the mode given at construction, once the threads are watched
+    def Begin(self) -> None:
+        self.SetMode(self.initial)
+
+    @pyqtSlot(str)
+    def SetMode(self, mode: str):
+        if mode == self.mode or self.waiting:
+            self.mode_changed.emit(self.mode)
+            return
+        self.Stop()
+        if mode in (CPROFILE, SAMPLING):
+            self.stamp = time.strftime("%Y%m%d-%H%M%S")
+            if mode == SAMPLING:
+                self.sampler = StackSampler()
+                self.sampler.Start()
+            self.mode = mode
+            self.start.emit(mode, self.stamp)
+            print(f"[profile] {mode} capture started")
+        self.mode_changed.emit(self.mode)
+
+    # every watched thread stops its own profile, the report is written
+    # once the last one has
+    @pyqtSlot()
+    def Stop(self):
+        if self.mode == OFF:
+            return
+        self.mode = OFF
+        self.sections = []
+        if self.sampler is not None:
+            self.sections.append(self.sampler.Stop(self.stamp))
+            self.sampler = None
+        self.waiting = len(self.watched)
+        # the GUI thread's profile answers before emit returns
+        self.stop.emit()
+        if not self.watched:
+            self.Report()
+
+    @pyqtSlot()
+    def Stopped(self):
+        self.waiting -= 1
+        if not self.waiting:
+            self.Report()
+
+    def Report(self) -> None:
+        sections = [_.report for _ in self.watched if _.report] + self.sections
+        for watched in self.watched:
+            watched.report = ""
+        report = "\n\n".join(sections + [SlotReport()])
+        with open(ProfilePath(self.stamp, "report.txt"), "w") as f:
+            f.write(report + "\n")
+        print(f"[profile]\n{report}")
+
+    # leaving while a capture runs or stops, the event loops and maybe the
+    # Qt objects are gone, finish every thread's profile from here
+    def Exit(self) -> None:
+        if self.mode == OFF and not self.waiting:
+            return
+        if self.mode != OFF:
+            self.mode = OFF
+            self.sections = []
+            if self.sampler is not None:
+                self.sections.append(self.sampler.Stop(self.stamp))
+                self.sampler = None
+        for watched in self.watched:
+            watched.Finish()
+        self.waiting = 0
+        self.Report()
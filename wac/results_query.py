@@ -0,0 +1,266 @@
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from wac.paths import DataPath
+from wac.results_store import DAY, DB_FILE, FIELDS
+
+"""
+Queries over the logged items
+
+    query = ResultsQuery()
+    since, until = Period("today")
+    rows, cursor = query.Items(since, until, product="SKU-1")
+    more, cursor = query.Items(since, until, product="SKU-1", after=cursor)
+    summary = query.Summary(*Period("week"), outside=(10, 12))
+
+Items lists newest first, a page at a time. Pages are keyset paginated: the
+cursor is the (timestamp, id) of the last row shown and the next page starts
+right below it, so page 1000 costs the same as page 1 and rows logged in
+the meantime do not shift the pages. Every filter is served by one of the
+covering indexes, time alone, scale + time or product + time.
+
+Summary adds up whole UTC days from the daily rollup and only reads the
+items of the partial days at both ends, a year takes a few hundred rollup
+rows instead of every item. An outside=(low, high) piece weight range,
+e.g. a product's tolerance, is counted from the items. Results are kept in
+a small LRU cache, Invalidate empties it whenever new items are written.
+
+Reads go through a separate read-only connection, WAL lets them run while
+the writer thread commits.
+"""
+
+PAGE_SIZE = 100
+CACHE_SIZE = 32
+PERIODS = ("today", "week", "month", "year", "all")
+
+COLUMNS = ("id",) + FIELDS
+AGGREGATES = (
+    "COUNT(*), SUM(count), SUM(total_weight), COUNT(piece_weight), "
+    "SUM(piece_weight), MIN(piece_weight), MAX(piece_weight)"
+)
+ROLLUP_AGGREGATES = (
+    "SUM(items), SUM(count_sum), SUM(total_sum), SUM(piece_n), "
+    "SUM(piece_sum), MIN(piece_min), MAX(piece_max)"
+)
+
+
+# (since, until) in unix time for a named period in local time, until None
+# means open ended
+def Period(name: str, now: float = None) -> tuple:
+    now = datetime.fromtimestamp(now if now is not None else time.time())
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if name == "today":
+        start = today
+    elif name == "week":
+        start = today - timedelta(days=today.weekday())
+    elif name == "month":
+        start = today.replace(day=1)
+    elif name == "year":
+        start = today.replace(month=1, day=1)
+    elif name == "all":
+        return (None, None)
+    else:
+        raise ValueError(f"unknown period {name!r}")
+    return (start.timestamp(), None)
+
+
+def Where(
+    since: float = None,
+    until: float = None,
+    scale: str = None,
+    product: str = None,
+    column: str = "timestamp",
+) -> tuple:
+    clauses, args = [], []
+    if scale is not None:
+        clauses.append("scale = ?")
+        args.append(scale)
+    if product is not None:
+        clauses.append("product = ?")
+        args.append(product)
+    if since is not None:
+        clauses.append(f"{column} >= ?")
+        args.append(since)
+    if until is not None:
+        clauses.append(f"{column} < ?")
+        args.append(until)
+    return clauses, args
+
+
+class ResultsQuery:
+    def __init__(self, path: str = None, cacheSize: int = CACHE_SIZE):
+        self.path = path or DataPath(DB_FILE)
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+        self.connection = None
+        self.hits = 0
+        self.misses = 0
+
+    def Connection(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+        return self.connection
+
+    def Execute(self, sql: str, args: list) -> list:
+        try:
+            return self.Connection().execute(sql, args).fetchall()
+        except sqlite3.OperationalError:
+            # nothing logged yet, the writer has not created the file
+            self.Close()
+            return []
+
+    """
+    One page of items, newest first, as dicts. Returns the rows and the
+    cursor for the next page, None on the last page.
+    """
+
+    def Items(
+        self,
+        since: float = None,
+        until: float = None,
+        scale: str = None,
+        product: str = None,
+        outside: tuple = None,
+        after: tuple = None,
+        limit: int = PAGE_SIZE,
+    ) -> tuple:
+        clauses, args = Where(since, until, scale, product)
+        if outside is not None:
+            clauses.append("piece_weight NOT BETWEEN ? AND ?")
+            args.extend(outside)
+        if after is not None:
+            # rows below the cursor, written as one range on timestamp
+            clauses.append("timestamp <= ? AND NOT (timestamp = ? AND id >= ?)")
+            args.extend((after[0], after[0], after[1]))
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM items"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        rows = [dict(zip(COLUMNS, _)) for _ in self.Execute(sql, args + [limit])]
+
+        cursor = None
+        if len(rows) == limit:
+            cursor = (rows[-1]["timestamp"], rows[-1]["id"])
+        return rows, cursor
+
+    """
+    Totals over a range: items, pieces counted, total weight, mean, min and
+    max piece weight, and with outside the items whose piece weight was
+    outside that range.
+    """
+
+    def Summary(
+        self,
+        since: float = None,
+        until: float = None,
+        scale: str = None,
+        product: str = None,
+        outside: tuple = None,
+    ) -> dict:
+        key = ("summary", since, until, scale, product, outside)
+        return self.Cached(key, lambda: self.Aggregate(*key[1:]))
+
+    def Aggregate(self, since, until, scale, product, outside) -> dict:
+        # whole days inside the range come from the rollup, the rest from items
+        firstDay = None if since is None else -(-int(since) // DAY)
+        lastDay = None if until is None else int(until) // DAY
+        if scale is not None and product is not None:
+            # no rollup for both, the product index narrows it down enough
+            parts = [self.ItemTotals(since, until, scale, product)]
+        elif firstDay is not None and lastDay is not None and firstDay >= lastDay:
+            parts = [self.ItemTotals(since, until, scale, product)]
+        else:
+            parts = [self.RollupTotals(firstDay, lastDay, scale, product)]
+            if since is not None:
+                parts.append(self.ItemTotals(since, firstDay * DAY, scale, product))
+            if until is not None:
+                parts.append(self.ItemTotals(lastDay * DAY, until, scale, product))
+        summary = Combine([_ for _ in parts if _ is not None])
+
+        if outside is not None:
+            clauses, args = Where(since, until, scale, product)
+            clauses.append("piece_weight NOT BETWEEN ? AND ?")
+            args.extend(outside)
+            sql = "SELECT COUNT(*) FROM items WHERE " + " AND ".join(clauses)
+            rows = self.Execute(sql, args)
+            summary["outside"] = rows[0][0] if rows else 0
+        return summary
+
+    def ItemTotals(self, since, until, scale, product) -> tuple:
+        clauses, args = Where(since, until, scale, product)
+        sql = f"SELECT {AGGREGATES} FROM items"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        rows = self.Execute(sql, args)
+        return rows[0] if rows else None
+
+    def RollupTotals(self, firstDay, lastDay, scale, product) -> tuple:
+        table = "daily_product" if product is not None else "daily_scale"
+        clauses, args = Where(firstDay, lastDay, scale, product, column="day")
+        sql = f"SELECT {ROLLUP_AGGREGATES} FROM {table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        rows = self.Execute(sql, args)
+        return rows[0] if rows else None
+
+    def Scales(self) -> list:
+        sql = "SELECT DISTINCT scale FROM items ORDER BY scale"
+        return self.Cached(("scales",), lambda: [_[0] for _ in self.Execute(sql, [])])
+
+    def Products(self) -> list:
+        sql = "SELECT DISTINCT product FROM items WHERE product IS NOT NULL"
+        return self.Cached(
+            ("products",), lambda: sorted(_[0] for _ in self.Execute(sql, []))
+        )
+
+    # --------------------------------------------------------------------------
+    # LRU cache
+    def Cached(self, key: tuple, compute):
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        self.misses += 1
+        value = compute()
+        self.cache[key] = value
+        if len(self.cache) > self.cacheSize:
+            self.cache.popitem(last=False)
+        return value
+
+    # new items were written, every cached answer may be stale
+    def Invalidate(self, *args) -> None:
+        self.cache.clear()
+
+    def Close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+# add up (items, count, total, piece n, piece sum, piece min, piece max) rows
+def Combine(parts: list) -> dict:
+    items = counted = total = pieceN = pieceSum = 0
+    pieceMin = pieceMax = None
+    for part in parts:
+        items += part[0] or 0
+        counted += part[1] or 0
+        total += part[2] or 0
+        pieceN += part[3] or 0
+        pieceSum += part[4] or 0
+        if part[5] is not None:
+            pieceMin = part[5] if pieceMin is None else min(pieceMin, part[5])
+        if part[6] is not None:
+            pieceMax = part[6] if pieceMax is None else max(pieceMax, part[6])
+    return {
+        "items": items,
+        "count": counted,
+        "total_weight": total,
+        "piece_weight_mean": pieceSum / pieceN if pieceN else None,
+        "piece_weight_min": pieceMin,
+        "piece_weight_max": pieceMax,
+    }
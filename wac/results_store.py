@@ -0,0 +1,340 @@
+import sqlite3
+import time
+
+from PyQt5.QtCore import QObject, QThread, QTimer, Qt, pyqtSignal, pyqtSlot
+
+from wac.paths import DataPath
+
+"""
+Results store: every logged weigh and count item, in SQLite
+
+    ResultsStore (GUI thread) --Record(item)--> ResultsWriter (writer thread)
+
+The GUI only emits the item, the writer thread owns the connection. Items
+are collected and written every FLUSH_INTERVAL ms, or as soon as BATCH_SIZE
+are waiting, with one executemany in one transaction, the INSERT is prepared
+once and reused for every row. The database runs in WAL mode with
+synchronous=NORMAL, a commit does not wait for a checkpoint and readers on
+other connections never block the writer. A batch that cannot be written,
+e.g. database is locked, goes back in front of the waiting items and is
+retried on the next flush, after MAX_RETRIES failed attempts in a row it is
+given up and failed is emitted.
+
+ItemTracker follows the weigh and count workflow and builds the item that
+LOGITEM records: the last piece weight and count, how often each was
+measured and how far the measurements spread.
+
+The schema version is kept in PRAGMA user_version, Migrate brings older
+files up to date when the writer opens them. Version 2 adds the covering
+indexes and the per day rollup that results_query.py reads, the writer keeps
+the rollup current in the same transaction as the items.
+"""
+
+DB_FILE = "results.db"
+BATCH_SIZE = 500  # items per transaction
+FLUSH_INTERVAL = 250  # ms an item may wait before it is written
+MAX_RETRIES = 5  # failed flushes in a row before a batch is given up
+BUSY_TIMEOUT = 2000  # ms a locked database is waited for
+SCHEMA_VERSION = 2
+DAY = 86400  # s, rollup days are UTC days
+
+FIELDS = (
+    "timestamp",  # unix time, s
+    "scale",
+    "product",
+    "piece_weight",  # g
+    "count",
+    "total_weight",  # g
+    "weighs",  # weighs and re-weighs of the item
+    "weigh_spread",  # g, max - min piece weight
+    "counts",
+    "count_spread",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    scale TEXT NOT NULL,
+    product TEXT,
+    piece_weight INTEGER,
+    count INTEGER,
+    total_weight INTEGER,
+    weighs INTEGER NOT NULL DEFAULT 0,
+    weigh_spread INTEGER,
+    counts INTEGER NOT NULL DEFAULT 0,
+    count_spread INTEGER
+)
+"""
+
+# time, scale and product first, each followed by everything the summaries
+# read, so neither listing a page nor summing a range touches the table
+INDEXES = """
+CREATE INDEX IF NOT EXISTS items_time
+    ON items (timestamp, scale, product, piece_weight, count, total_weight);
+CREATE INDEX IF NOT EXISTS items_scale
+    ON items (scale, timestamp, product, piece_weight, count, total_weight);
+CREATE INDEX IF NOT EXISTS items_product
+    ON items (product, timestamp, scale, piece_weight, count, total_weight);
+"""
+
+# one row per UTC day and scale, and one per UTC day and product ('' for
+# none), a year is a few hundred rows whatever the filter
+DAILY = """
+CREATE TABLE IF NOT EXISTS daily_scale (
+    day INTEGER NOT NULL,
+    scale TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    count_sum INTEGER,
+    total_sum INTEGER,
+    piece_n INTEGER NOT NULL,
+    piece_sum INTEGER,
+    piece_min INTEGER,
+    piece_max INTEGER,
+    PRIMARY KEY (scale, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS daily_scale_day ON daily_scale (day);
+CREATE TABLE IF NOT EXISTS daily_product (
+    day INTEGER NOT NULL,
+    product TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    count_sum INTEGER,
+    total_sum INTEGER,
+    piece_n INTEGER NOT NULL,
+    piece_sum INTEGER,
+    piece_min INTEGER,
+    piece_max INTEGER,
+    PRIMARY KEY (product, day)
+) WITHOUT ROWID;
+"""
+
+# fold the items with an id above ? into a rollup table
+ROLLUP = """
+INSERT INTO daily_{key}
+SELECT CAST(timestamp / {day} AS INTEGER), {column},
+    COUNT(*), SUM(count), SUM(total_weight), COUNT(piece_weight), SUM(piece_weight),
+    MIN(piece_weight), MAX(piece_weight)
+FROM items WHERE id > ?
+GROUP BY 1, 2
+ON CONFLICT ({key}, day) DO UPDATE SET
+    items = items + excluded.items,
+    count_sum = COALESCE(count_sum, 0) + COALESCE(excluded.count_sum, 0),
+    total_sum = COALESCE(total_sum, 0) + COALESCE(excluded.total_sum, 0),
+    piece_n = piece_n + excluded.piece_n,
+    piece_sum = COALESCE(piece_sum, 0) + COALESCE(excluded.piece_sum, 0),
+    piece_min = MIN(
+        COALESCE(piece_min, excluded.piece_min),
+        COALESCE(excluded.piece_min, piece_min)
+    ),
+    piece_max = MAX(
+        COALESCE(piece_max, excluded.piece_max),
+        COALESCE(excluded.piece_max, piece_max)
+    )
+"""
+ROLLUPS = (
+    ROLLUP.format(key="scale", column="scale", day=DAY),
+    ROLLUP.format(key="product", column="COALESCE(product, '')", day=DAY),
+)
+
+INSERT = "INSERT INTO items ({}) VALUES ({})".format(
+    ", ".join(FIELDS), ", ".join(":" + _ for _ in FIELDS)
+)
+
+
+def Connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT}")
+    return connection
+
+
+def Migrate(connection: sqlite3.Connection) -> None:
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version < 1:
+        connection.execute(SCHEMA)
+    if version < 2:
+        with connection:
+            connection.execute("BEGIN")
+            for statement in (INDEXES + DAILY).split(";"):
+                if statement.strip():
+                    connection.execute(statement)
+            for rollup in ROLLUPS:
+                connection.execute(rollup, (0,))
+    connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+
+class ItemTracker:
+    def __init__(self):
+        self.Reset()
+
+    def Reset(self) -> None:
+        self.weights = []
+        self.counts = []
+        self.preset = None  # piece weight from the catalog, not weighed
+
+    def Preset(self, value: int) -> None:
+        self.preset = value
+
+    def Weigh(self, value: int) -> None:
+        self.weights.append(value)
+
+    def Count(self, value: int) -> None:
+        self.counts.append(value)
+
+    # the item as a row for the store, None before anything was weighed; an
+    # item counted with a catalog piece weight has weighs 0
+    def Item(self, scale: str, product: str = None) -> dict:
+        if not self.weights and not self.counts:
+            return None
+        weights, counts = self.weights, self.counts
+        pieceWeight = weights[-1] if weights else self.preset
+        count = counts[-1] if counts else None
+        known = pieceWeight is not None and counts
+        return {
+            "timestamp": time.time(),
+            "scale": scale,
+            "product": product,
+            "piece_weight": pieceWeight,
+            "count": count,
+            "total_weight": pieceWeight * count if known else None,
+            "weighs": len(weights),
+            "weigh_spread": max(weights) - min(weights) if weights else None,
+            "counts": len(counts),
+            "count_spread": max(counts) - min(counts) if counts else None,
+        }
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class ResultsWriter(QObject):
+
+    written = pyqtSignal(int)  # items committed
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(
+        self,
+        path: str,
+        batch: int = BATCH_SIZE,
+        interval: int = FLUSH_INTERVAL,
+        parent=None,
+    ):
+        super(ResultsWriter, self).__init__(parent)
+        self.path = path
+        self.batch = batch
+        self.interval = interval
+        self.connection = None
+        self.pending = []
+        self.total = 0
+        self.retries = 0  # failed flushes in a row
+
+    # [writer thread] from here on everything runs on the writer thread
+    @pyqtSlot()
+    def Open(self):
+        self.connection = Connect(self.path)
+        Migrate(self.connection)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.interval)
+        self.timer.timeout.connect(self.Flush)
+
+    @pyqtSlot(object)
+    def Record(self, item: dict):
+        self.pending.append(item)
+        self.Pending()
+
+    @pyqtSlot(object)
+    def RecordMany(self, items: list):
+        self.pending.extend(items)
+        self.Pending()
+
+    def Pending(self) -> None:
+        if len(self.pending) >= self.batch:
+            self.Flush()
+        elif not self.timer.isActive():
+            self.timer.start()
+
+    @pyqtSlot()
+    def Flush(self):
+        self.timer.stop()
+        if not self.pending or self.connection is None:
+            return
+        items, self.pending = self.pending, []
+        try:
+            with self.connection:
+                self.connection.execute("BEGIN")
+                last = self.connection.execute("SELECT MAX(id) FROM items").fetchone()
+                self.connection.executemany(INSERT, items)
+                for rollup in ROLLUPS:
+                    self.connection.execute(rollup, (last[0] or 0,))
+        except sqlite3.Error as e:
+            self.retries += 1
+            if self.retries > MAX_RETRIES:
+                print(f"[results] {len(items)} items given up: {e}")
+                self.retries = 0
+                self.failed.emit(str(e))
+                return
+            print(f"[results] {len(items)} items not written, retrying: {e}")
+            self.pending = items + self.pending
+            self.timer.start()
+            return
+        self.retries = 0
+        self.total += len(items)
+        self.written.emit(len(items))
+
+    @pyqtSlot()
+    def Close(self):
+        # there is no next tick, the last items get every retry left now
+        while self.pending and self.connection is not None:
+            self.Flush()
+        if self.connection is not None:
+            self.connection.execute("PRAGMA optimize")
+            self.connection.close()
+            self.connection = None
+        self.finished.emit()
+
+
+class ResultsStore(QObject):
+
+    # GUI thread ---> writer thread
+    record = pyqtSignal(object)
+    record_many = pyqtSignal(object)
+    flush = pyqtSignal()
+    close = pyqtSignal()
+
+    written = pyqtSignal(int)
+
+    def __init__(self, path: str = None, parent=None):
+        super(ResultsStore, self).__init__(parent)
+        self.path = path or DataPath(DB_FILE)
+
+        self.thread = QThread()
+        self.thread.setObjectName("ResultsWriter")
+        self.writer = ResultsWriter(self.path)
+        self.writer.moveToThread(self.thread)
+        self.thread.started.connect(self.writer.Open)
+        self.writer.finished.connect(self.thread.quit, Qt.DirectConnection)
+        self.writer.written.connect(self.written)
+
+        self.record.connect(self.writer.Record)
+        self.record_many.connect(self.writer.RecordMany)
+        self.flush.connect(self.writer.Flush)
+        self.close.connect(self.writer.Close)
+        self.thread.start()
+
+    # [GUI thread] returns at once, the item is written on the writer thread
+    def Record(self, item: dict) -> None:
+        self.record.emit(item)
+
+    # bulk imports, one signal for the whole list
+    def RecordMany(self, items: list) -> None:
+        self.record_many.emit(list(items))
+
+    # write everything still waiting and stop the writer thread
+    def Shutdown(self, wait: int = 5000) -> None:
+        if not self.thread.isRunning():
+            return
+        self.close.emit()
+        self.thread.wait(wait)
@@ -0,0 +1,86 @@
+import numpy as np
+
+"""
+RingBuffer: fixed capacity numpy ring holding the newest samples of one scale.
+A single writer (the scale's ingest thread) appends, any number of readers
+copy out the newest values at their own pace, nothing is locked.
+
+The write count is stored in front of the samples in the same buffer
+    int64 count | capacity x dtype samples
+so a ring can also be laid over memory that is shared with another process.
+
+Readers re-read the count after copying and drop the values the writer may
+have overwritten in the meantime, so a snapshot never mixes old and new laps.
+"""
+
+CAPACITY = 4096  # samples
+DTYPE = np.int32
+HEADER = np.dtype(np.int64).itemsize
+
+
+class RingBuffer:
+    def __init__(self, capacity: int = CAPACITY, dtype=DTYPE, buffer=None):
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        if buffer is None:
+            buffer = bytearray(RingBuffer.Size(capacity, dtype))
+        self.count = np.ndarray((1,), dtype=np.int64, buffer=buffer)
+        self.data = np.ndarray(
+            (capacity,), dtype=self.dtype, buffer=buffer, offset=HEADER
+        )
+
+    # bytes needed for a ring of this capacity and dtype
+    @staticmethod
+    def Size(capacity: int = CAPACITY, dtype=DTYPE) -> int:
+        return HEADER + capacity * np.dtype(dtype).itemsize
+
+    def __len__(self) -> int:
+        return min(int(self.count[0]), self.capacity)
+
+    # samples written since the ring was created, including overwritten ones
+    def Total(self) -> int:
+        return int(self.count[0])
+
+    def Push(self, value) -> None:
+        total = int(self.count[0])
+        self.data[total % self.capacity] = value
+        self.count[0] = total + 1
+
+    def Extend(self, values) -> None:
+        values = np.asarray(values, dtype=self.dtype)
+        total = int(self.count[0]) + len(values)
+        if len(values) > self.capacity:
+            values = values[-self.capacity :]
+        size = len(values)
+        start = (total - size) % self.capacity
+        first = min(size, self.capacity - start)
+        self.data[start : start + first] = values[:first]
+        self.data[: size - first] = values[first:]
+        self.count[0] = total
+
+    # the newest n samples, oldest first
+    def Latest(self, n: int = None) -> np.ndarray:
+        total = int(self.count[0])
+        n = min(total, self.capacity) if n is None else min(n, total, self.capacity)
+        if not n:
+            return np.empty(0, dtype=self.dtype)
+
+        start = (total - n) % self.capacity
+        if start + n <= self.capacity:
+            values = self.data[start : start + n].copy()
+        else:
+            values = np.concatenate(
+                (self.data[start:], self.data[: start + n - self.capacity])
+            )
+
+        torn = int(self.count[0]) - self.capacity - (total - n)
+        return values[torn:] if torn > 0 else values
+
+    def Last(self, default=None):
+        total = int(self.count[0])
+        if not total:
+            return default
+        return self.data[(total - 1) % self.capacity].item()
+
+    def Clear(self) -> None:
+        self.count[0] = 0
@@ -1,48 +1,122 @@
+import weakref
+from time import perf_counter_ns
+
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
 from wac.command_button import Command
+from wac.diagnostics import TimedSlot
+from wac.tracing import TRACER
 
 """
 
 example route:
-route = {
-    "PROTOCOL": self.Protocol,
-    "WEIGH": self.Weigh,
-    "REWEIGH": self.ReWeigh,
-    "COUNT": self.Count,
-    "RECOUNT": self.ReCount,
-}
+class Response(Router):
+    @Route("WEIGH")
+    def Weigh(self, cmd: Command) -> None:
+        ...
+
+    @Route("COUNT", "RECOUNT")
+    def Count(self, cmd: Command) -> None:
+        ...
+
+Handlers are registered with the Route decorator. The dispatch table is built
+once per class, each instance binds it once, so Process is a single dict
+lookup. Commands without a route go to Unrouted, which counts them and emits
+'unrouted' instead of raising.
 
 To use this as a middleperson, connect the forward signal and the process signal
 [signals]
     [command] ---> x
     [process] ---> Process
     connect a signal to Process, to route the signal
-        a route dict must be assigned or passed in
-    
+        a route dict can still be passed in, it is merged over the class routes
+
     [forward] ---> Forward
     connect a signal to Forward, to automatically forward a signal
+
+    [unrouted] <--- Process
+    emitted with the command when no handler is registered for it
 [slots]
 """
 
+ROUTERS = weakref.WeakSet()  # every live router, for diagnostics
+
+
+def Route(*keys: str):
+    def decorator(fn):
+        fn.routes = getattr(fn, "routes", ()) + keys
+        return fn
+
+    return decorator
+
+
+class RouteStats:
+    __slots__ = ("calls", "total_ns", "max_ns", "failures")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.failures = 0
+
+    def Mean(self) -> float:
+        return self.total_ns / self.calls if self.calls else 0.0
+
 
 class Router(QObject):
 
     command = pyqtSignal(object)
     forward = pyqtSignal(object)
     process = pyqtSignal(object)
+    unrouted = pyqtSignal(object)
 
-    def __init__(self, route: dict = {}, routeBy: str = "cmdType", *args, **kwargs):
+    def __init__(self, route: dict = None, routeBy: str = "cmdType", *args, **kwargs):
         super(Router, self).__init__(*args, **kwargs)
-        self.route = route
         self.routeBy = routeBy
+        self.stats = {}
+        self.unroutedCount = 0
+        self.table = {}
+        self.setRoute(
+            {key: fn.__get__(self) for key, fn in self.DispatchTable().items()}
+        )
+        if route:
+            self.setRoute(route)
         self.process.connect(self.Process)
         self.setName()
+        ROUTERS.add(self)
 
     def __name__(self):
         return "Router"
 
+    """
+    Build the {key: function} table from the Route decorated methods of the
+    class and its bases, once per class
+    """
+
+    @classmethod
+    def DispatchTable(cls) -> dict:
+        if "_dispatch" not in cls.__dict__:
+            table = {}
+            for klass in reversed(cls.__mro__):
+                for name, attr in vars(klass).items():
+                    for key in getattr(attr, "routes", ()):
+                        table[key] = name
+            cls._dispatch = {key: getattr(cls, name) for key, name in table.items()}
+        return cls._dispatch
+
+    # add or replace routes with bound callables, e.g. {"WEIGH": self.Weigh}
     def setRoute(self, route: dict = {}) -> None:
-        self.route = route
+        for key, fn in route.items():
+            stats = self.stats.setdefault(key, RouteStats())
+            self.table[key] = (fn, stats)
+
+    @property
+    def route(self) -> dict:
+        return {key: fn for key, (fn, _) in self.table.items()}
+
+    @route.setter
+    def route(self, route: dict) -> None:
+        self.table = {}
+        self.setRoute(route)
 
     def setName(self, name: str = None) -> None:
         if name:
@@ -58,23 +132,47 @@ class Router(QObject):
     """
     [Slot] Processes commands passed via signals.
     Routes the signal, with the command object to the correct handler.
-    1) check if a route has been passed in as asn arg
-    2) if note use the native route assigned to the class
-    
+    Commands without a handler are passed to Unrouted.
+
     Paramters
     ---------
     cmd
     """
 
     @pyqtSlot(object)
+    @TimedSlot("Router.Process")
     def Process(self, cmd: Command):
-        # print(f"[{self.objectName()}] Processing")
-        cmdAttr = cmd.__getattribute__(self.routeBy)
-        fn = self.route[cmdAttr]
-        fn(cmd)
+        key = getattr(cmd, self.routeBy, None)
+        entry = self.table.get(key)
+        if entry is None:
+            self.Unrouted(key, cmd)
+            return
+
+        fn, stats = entry
+        # e.g. MainWindow_Request.WEIGH, which router handled it
+        span = TRACER.Begin(f"{self.objectName()}.{key}") if TRACER.enabled else None
+        start = perf_counter_ns()
+        try:
+            fn(cmd)
+        except Exception:
+            stats.failures += 1
+            raise
+        finally:
+            elapsed = perf_counter_ns() - start
+            if span is not None:
+                TRACER.End(span)
+            stats.calls += 1
+            stats.total_ns += elapsed
+            if elapsed > stats.max_ns:
+                stats.max_ns = elapsed
+
+    def Unrouted(self, key, cmd: Command) -> None:
+        self.unroutedCount += 1
+        print(f"[{self.objectName()}] no route for {self.routeBy}={key!r}")
+        self.unrouted.emit(cmd)
 
     """
-    Use this to forward signals automatically 
+    Use this to forward signals automatically
     """
 
     @pyqtSlot(object)
@@ -0,0 +1,293 @@
+import numpy as np
+from PyQt5.QtCore import QObject, QThread, Qt, pyqtSignal, pyqtSlot
+
+from wac.command_registry import COMMANDS, CommandRegistry
+from wac.command_request import CommandRequest, RequestScheduler
+from wac.diagnostics import LagMonitor, LagProbe, TimedSlot
+from wac.ring_buffer import RingBuffer
+from wac.serial_interface import BAUD_RATE, SerialInterface
+
+"""
+Scale manager: one ingest pipeline per scale, each on its own QThread
+
+    SerialInterface --live_data--> ScaleChannel.Ingest --> parse --> filter
+                                                       --> raw / filtered RingBuffer
+
+Samples are never signalled across threads. The dashboard reads the newest
+values of every channel's ring buffers once per frame, so the GUI thread's
+work grows with the number of scales, not with their sample rate, and the
+per sample work runs on the scale's own thread.
+Only status changes and command responses cross threads as signals.
+"""
+
+ALPHA = 0.2  # smoothing factor of the live weight filter
+
+# how the manager runs a scale, see wac/scale_process.py for process mode
+THREAD = "thread"
+PROCESS = "process"
+
+
+class ExponentialFilter:
+    def __init__(self, alpha: float = ALPHA):
+        self.alpha = alpha
+        self.value = None
+
+    def Update(self, sample: float) -> float:
+        if self.value is None:
+            self.value = float(sample)
+        else:
+            self.value += self.alpha * (sample - self.value)
+        return self.value
+
+    def Reset(self) -> None:
+        self.value = None
+
+
+"""
+Live weight lines are bare integers, echoes ('-x') and values ('#val&') are
+left to the SerialInterface. Returns None for anything else.
+"""
+
+
+def ParseSample(line: str):
+    line = line.strip()
+    if not line or line[0] in "-#":
+        return None
+    try:
+        return int(line)
+    except ValueError:
+        return None
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class ScaleChannel(QObject):
+
+    status = pyqtSignal(str, str)  # name, connected | reconnecting | disconnected
+    response = pyqtSignal(str, object)  # name, CommandRequest
+
+    # GUI thread ---> scale thread
+    connect_scale = pyqtSignal(object)
+    disconnect_scale = pyqtSignal(object)
+    command = pyqtSignal(object)
+    cancel = pyqtSignal(object)
+    terminate = pyqtSignal()
+
+    def __init__(
+        self,
+        name: str,
+        port_name: str,
+        baud_rate: int = BAUD_RATE,
+        commands: CommandRegistry = COMMANDS,
+        scheduler: RequestScheduler = None,
+        raw: RingBuffer = None,
+        filtered: RingBuffer = None,
+        parent=None,
+    ):
+        super(ScaleChannel, self).__init__(parent)
+        self.setObjectName(name)
+        self.name = name
+        self.port_name = port_name
+        self.commands = commands
+        self.scheduler = scheduler or RequestScheduler()
+        self.state = "disconnected"
+        self.parseErrors = 0
+
+        self.raw = raw if raw is not None else RingBuffer()
+        self.filtered = (
+            filtered if filtered is not None else RingBuffer(dtype=np.float64)
+        )
+        self.filter = ExponentialFilter()
+
+        # a child, so it follows the channel into its thread
+        self.serial = SerialInterface(commands=commands, parent=self)
+        self.serial.SerialConfig(port_name, baud_rate)
+        self.serial.live_data.connect(self.Ingest)
+        self.serial.serial_connected.connect(self.Connected)
+        self.serial.serial_disconnected.connect(self.Disconnected)
+        self.serial.serial_cmd_response.connect(self.Response)
+        self.serial.supervisor.lost.connect(self.Reconnecting)
+        self.serial.supervisor.restored.connect(self.Connected)
+
+        self.connect_scale.connect(self.serial.Connect)
+        self.disconnect_scale.connect(self.serial.Disconnect)
+        self.command.connect(self.serial.RunCommand)
+        self.cancel.connect(self.serial.Cancel)
+        self.terminate.connect(self.serial.Terminate)
+
+    # [scale thread] parse, filter and store one line of live data
+    @pyqtSlot(str)
+    @TimedSlot("ScaleChannel.Ingest")
+    def Ingest(self, line: str):
+        sample = ParseSample(line)
+        if sample is None:
+            if line.strip()[:1] not in ("", "-", "#"):
+                self.parseErrors += 1
+            return
+        self.raw.Push(sample)
+        self.filtered.Push(self.filter.Update(sample))
+
+    @pyqtSlot()
+    def Connected(self):
+        self.state = "connected"
+        self.status.emit(self.name, self.state)
+
+    # pending commands are kept and sent again once the port is back
+    @pyqtSlot()
+    def Reconnecting(self):
+        self.state = "reconnecting"
+        self.status.emit(self.name, self.state)
+
+    @pyqtSlot()
+    def Disconnected(self):
+        self.state = "disconnected"
+        self.filter.Reset()
+        self.status.emit(self.name, self.state)
+
+    @pyqtSlot(object)
+    def Response(self, request: CommandRequest):
+        self.response.emit(self.name, request)
+
+    # [GUI thread] queue a command for this scale, returns its request
+    def Request(self, cmdType: str) -> CommandRequest:
+        return self.Send(self.scheduler.Schedule(None, self.commands.ByType(cmdType)))
+
+    def Send(self, request: CommandRequest) -> CommandRequest:
+        if request.cmdType == "CONNECT":
+            self.connect_scale.emit(request)
+        elif request.cmdType == "DISCONNECT":
+            self.disconnect_scale.emit(request)
+        else:
+            self.command.emit(request)
+        return request
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class ScaleManager(QObject):
+
+    scale_added = pyqtSignal(object)  # ScaleChannel
+    scale_removed = pyqtSignal(str)
+    status = pyqtSignal(str, str)
+    response = pyqtSignal(str, object)
+
+    def __init__(
+        self,
+        commands: CommandRegistry = COMMANDS,
+        monitor: LagMonitor = None,
+        mode: str = THREAD,
+        parent=None,
+    ):
+        super(ScaleManager, self).__init__(parent)
+        self.commands = commands
+        self.monitor = monitor
+        self.mode = mode
+        self.scheduler = RequestScheduler()  # ids are unique across scales
+        self.channels = {}
+        self.threads = {}
+        self.stopping = {}  # thread -> channel, removed but still running
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    def __iter__(self):
+        return iter(list(self.channels.values()))
+
+    def __getitem__(self, name: str) -> ScaleChannel:
+        return self.channels[name]
+
+    def Add(
+        self,
+        port_name: str,
+        baud_rate: int = BAUD_RATE,
+        name: str = None,
+        mode: str = None,
+    ) -> ScaleChannel:
+        name = name or port_name
+        if name in self.channels:
+            raise ValueError(f"scale {name!r} already added")
+
+        mode = mode or self.mode
+        if mode == PROCESS:
+            return self.AddProcess(port_name, baud_rate, name)
+        if mode != THREAD:
+            raise ValueError(f"unknown scale mode {mode!r}")
+
+        channel = ScaleChannel(
+            name, port_name, baud_rate, self.commands, self.scheduler
+        )
+        thread = QThread()
+        thread.setObjectName(f"Scale {name}")
+        channel.moveToThread(thread)
+        # QThread.quit is thread safe, call it directly so Remove can wait on it
+        channel.serial.finished.connect(thread.quit, Qt.DirectConnection)
+
+        if self.monitor is not None:
+            probe = self.monitor.Watch(LagProbe(f"Scale {name}"))
+            probe.moveToThread(thread)
+            thread.started.connect(probe.Start)
+            channel.serial.finished.connect(probe.Stop)
+
+        channel.status.connect(self.status)
+        channel.response.connect(self.response)
+
+        self.channels[name] = channel
+        self.threads[name] = thread
+        thread.start()
+        self.scale_added.emit(channel)
+        return channel
+
+    def AddProcess(self, port_name: str, baud_rate: int, name: str):
+        # only imported when used, thread mode never loads multiprocessing
+        from wac.scale_process import ProcessScaleChannel
+
+        channel = ProcessScaleChannel(
+            name, port_name, baud_rate, self.commands, self.scheduler, parent=self
+        )
+        channel.status.connect(self.status)
+        channel.response.connect(self.response)
+
+        self.channels[name] = channel
+        self.scale_added.emit(channel)
+        return channel
+
+    def Remove(self, name: str, wait: int = 1000) -> None:
+        channel = self.channels.pop(name)
+        thread = self.threads.pop(name, None)
+        if thread is None:
+            channel.Terminate(wait)
+        else:
+            # the worker quits the thread once it has closed the port
+            channel.terminate.emit()
+            if not thread.wait(wait):
+                # still busy, e.g. in a blocking write, a QThread destroyed
+                # while running aborts, keep both until it has finished
+                self.stopping[thread] = channel
+                thread.finished.connect(self.ThreadFinished)
+        self.scale_removed.emit(name)
+
+    @pyqtSlot()
+    def ThreadFinished(self):
+        self.stopping.pop(self.sender(), None)
+
+    def Request(self, cmdType: str) -> list:
+        return [channel.Request(cmdType) for channel in self]
+
+    @pyqtSlot()
+    def ConnectAll(self):
+        self.Request("CONNECT")
+
+    @pyqtSlot()
+    def DisconnectAll(self):
+        self.Request("DISCONNECT")
+
+    @pyqtSlot()
+    def Shutdown(self):
+        for name in list(self.channels):
+            self.Remove(name)
+        # the application is leaving, no thread may outlive the manager
+        for thread in list(self.stopping):
+            thread.wait()
+        self.stopping.clear()
@@ -0,0 +1,222 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from time import perf_counter_ns
+
+from PyQt5.QtCore import (
+    QCoreApplication,
+    QObject,
+    QSocketNotifier,
+    QTimer,
+    pyqtSignal,
+    pyqtSlot,
+)
+
+import numpy as np
+
+from wac.command_registry import COMMANDS, CommandRegistry
+from wac.command_request import CommandRequest, RequestScheduler
+from wac.ring_buffer import CAPACITY, RingBuffer
+from wac.serial_interface import BAUD_RATE
+
+"""
+Process mode for the scale manager: the transport, parser and filter of a
+scale run in their own process, so several busy scales are not serialised by
+the GUI process's GIL.
+
+    GUI process                              scale process
+    ProcessScaleChannel  --("request", id, cmdType)-->  ScaleChannel
+                         <--("status", state)---------
+                         <--("response", id, value)---
+    raw / filtered RingBuffer (read-only)  <==shared memory==  raw / filtered RingBuffer
+
+Samples only travel through the shared memory rings, the pipe carries small
+control messages. The GUI process owns the shared memory block and maps it
+read-only. ProcessScaleChannel has the same surface as ScaleChannel, the
+dashboard cannot tell them apart.
+
+Processes are started with 'spawn' so a child never inherits the GUI
+process's Qt state. On POSIX both ends wake up on the pipe's file descriptor,
+elsewhere they poll it every CONTROL_POLL ms.
+"""
+
+CONTEXT = multiprocessing.get_context("spawn")
+CONTROL_POLL = 20  # ms between reads of the control pipe
+JOIN_TIMEOUT = 2.0  # s
+
+
+# both rings of one scale in one block, raw samples first
+def MemorySize(capacity: int = CAPACITY) -> int:
+    return RingBuffer.Size(capacity, np.int32) + RingBuffer.Size(capacity, np.float64)
+
+
+def Rings(buffer, capacity: int = CAPACITY) -> tuple:
+    size = RingBuffer.Size(capacity, np.int32)
+    raw = RingBuffer(capacity, np.int32, buffer[:size])
+    filtered = RingBuffer(capacity, np.float64, buffer[size : MemorySize(capacity)])
+    return raw, filtered
+
+
+"""
+[scale process] entry point, runs a ScaleChannel on the process's main thread
+until the GUI process asks it to terminate or goes away
+"""
+
+
+# call slot whenever the pipe has something to read
+def WatchPipe(conn, slot, parent=None) -> QObject:
+    if os.name == "posix":
+        notifier = QSocketNotifier(conn.fileno(), QSocketNotifier.Read, parent)
+        notifier.activated.connect(slot)
+        return notifier
+
+    timer = QTimer(parent)
+    timer.setInterval(CONTROL_POLL)
+    timer.timeout.connect(slot)
+    timer.start()
+    return timer
+
+
+def Unwatch(watcher: QObject) -> None:
+    if isinstance(watcher, QSocketNotifier):
+        watcher.setEnabled(False)
+    else:
+        watcher.stop()
+
+
+def RunScale(
+    name: str, port_name: str, baud_rate: int, memoryName: str, capacity: int, conn
+):
+    from wac.scale_manager import ScaleChannel
+
+    app = QCoreApplication([])
+    # spawned children share the GUI process's resource tracker, attaching
+    # registers the same name again, which is a no-op
+    memory = shared_memory.SharedMemory(name=memoryName)
+    raw, filtered = Rings(memory.buf, capacity)
+    channel = ScaleChannel(name, port_name, baud_rate, raw=raw, filtered=filtered)
+
+    channel.status.connect(lambda _, state: conn.send(("status", state)))
+    channel.response.connect(
+        lambda _, request: conn.send(("response", request.id, request.returnValue))
+    )
+    channel.serial.finished.connect(app.quit)
+
+    def Poll(*args):
+        try:
+            while conn.poll():
+                message = conn.recv()
+                if message[0] == "request":
+                    _, id, cmdType = message
+                    channel.Send(CommandRequest(id, None, COMMANDS.ByType(cmdType)))
+                elif message[0] == "terminate":
+                    channel.serial.Terminate()
+                    return
+        except (EOFError, OSError):
+            # the GUI process is gone
+            channel.serial.Terminate()
+
+    watcher = WatchPipe(conn, Poll)
+    app.exec_()
+
+    Unwatch(watcher)
+    del channel, raw, filtered
+    memory.close()
+    conn.close()
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class ProcessScaleChannel(QObject):
+
+    status = pyqtSignal(str, str)  # name, connected | disconnected
+    response = pyqtSignal(str, object)  # name, CommandRequest
+
+    def __init__(
+        self,
+        name: str,
+        port_name: str,
+        baud_rate: int = BAUD_RATE,
+        commands: CommandRegistry = COMMANDS,
+        scheduler: RequestScheduler = None,
+        capacity: int = CAPACITY,
+        parent=None,
+    ):
+        super(ProcessScaleChannel, self).__init__(parent)
+        self.setObjectName(name)
+        self.name = name
+        self.port_name = port_name
+        self.commands = commands
+        self.scheduler = scheduler or RequestScheduler()
+        self.state = "disconnected"
+        self.parseErrors = 0  # counted in the scale process, not reported
+        self.pending = {}  # id -> CommandRequest
+
+        self.memory = shared_memory.SharedMemory(create=True, size=MemorySize(capacity))
+        self.memory.buf[: MemorySize(capacity)] = bytes(MemorySize(capacity))
+        self.raw, self.filtered = Rings(self.memory.buf.toreadonly(), capacity)
+
+        self.conn, child = CONTEXT.Pipe()
+        self.process = CONTEXT.Process(
+            target=RunScale,
+            args=(name, port_name, baud_rate, self.memory.name, capacity, child),
+            name=f"scale-{name}",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+        self.watcher = WatchPipe(self.conn, self.Poll, self)
+
+    # [GUI thread] queue a command for this scale, returns its request
+    def Request(self, cmdType: str) -> CommandRequest:
+        return self.Send(self.scheduler.Schedule(None, self.commands.ByType(cmdType)))
+
+    def Send(self, request: CommandRequest) -> CommandRequest:
+        request.sentAt = perf_counter_ns()
+        self.pending[request.id] = request
+        try:
+            self.conn.send(("request", request.id, request.cmdType))
+        except (BrokenPipeError, OSError):
+            self.pending.pop(request.id)
+        return request
+
+    def Poll(self, *args):
+        try:
+            while self.conn.poll():
+                message = self.conn.recv()
+                if message[0] == "status":
+                    self.state = message[1]
+                    self.status.emit(self.name, self.state)
+                elif message[0] == "response":
+                    _, id, value = message
+                    request = self.pending.pop(id, None)
+                    if request is None:
+                        continue
+                    request.returnValue = value
+                    request.completedAt = perf_counter_ns()
+                    self.response.emit(self.name, request)
+        except (EOFError, OSError):
+            # the scale process exited
+            Unwatch(self.watcher)
+            if self.state != "disconnected":
+                self.state = "disconnected"
+                self.status.emit(self.name, self.state)
+
+    def Terminate(self, wait: int = 1000) -> None:
+        Unwatch(self.watcher)
+        try:
+            self.conn.send(("terminate",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(wait / 1000 if wait else JOIN_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(JOIN_TIMEOUT)
+        self.conn.close()
+
+        # the ring arrays export the buffer, drop them before closing it
+        self.raw = self.filtered = None
+        self.memory.close()
+        self.memory.unlink()
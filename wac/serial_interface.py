@@ -1,7 +1,21 @@
 from PyQt5 import QtSerialPort
 from PyQt5.QtCore import QTime, pyqtSignal, pyqtSlot, QTimer
 
-from wac.command_button import Command
+from wac.command_registry import COMMANDS, CommandRegistry
+from wac.command_request import CommandRequest, RequestTracker
+from wac.diagnostics import TimedSlot
+from wac.metrics import (
+    BYTES_RECEIVED,
+    BYTES_SENT,
+    COMMAND_LATENCY,
+    COMMANDS_SENT,
+    CONNECTED,
+    LINES,
+    PARSE_ERRORS,
+    SAMPLES,
+)
+from wac.supervisor import ConnectionSupervisor
+from wac.tracing import TRACER, Span
 
 
 """
@@ -12,6 +26,23 @@ DELAY = 1
 COM_PORT = "COM5"
 BAUD_RATE = 9600
 
+"""
+Read policy, when Receive drains the port
+    EVENT      on every readyRead, the lowest latency, one wakeup per chunk
+               the driver hands over
+    COALESCE   once COALESCE_BYTES are waiting or COALESCE_MS after the first
+               byte, whichever comes first, fewer and bigger drains for a
+               fast stream at the cost of up to COALESCE_MS of latency
+SetReadPolicy switches at runtime and answers with read_policy_changed, an
+unknown policy is reported and the current one kept,
+py -m benchmarks.bench_read_policy compares them.
+"""
+EVENT = "event"
+COALESCE = "coalesce"
+READ_POLICIES = (EVENT, COALESCE)
+COALESCE_BYTES = 256
+COALESCE_MS = 20
+
 
 class SerialInterface(QtSerialPort.QSerialPort):
 
@@ -31,6 +62,7 @@ class SerialInterface(QtSerialPort.QSerialPort):
     serial_protocol = pyqtSignal()
 
     live_data = pyqtSignal(str)
+    read_policy_changed = pyqtSignal(str)  # the policy in effect
 
     prompt = pyqtSignal(str, str)
 
@@ -38,18 +70,26 @@ class SerialInterface(QtSerialPort.QSerialPort):
     autoconnect_fail = pyqtSignal()
     autoconnect = pyqtSignal(bool)
 
-    def __init__(self, commandDict: dict = {}, parent=None):
+    def __init__(self, commands: CommandRegistry = COMMANDS, parent=None):
         super(SerialInterface, self).__init__(parent)
         self.port_name = COM_PORT
         self.baud_rate = 9600
         self.running = False
         self.isLiveWeight = False
-        self.commandDict = commandDict
+        self.commands = commands
+        self.tracker = RequestTracker()
 
+        # the coalescing delay, see READ_POLICIES
+        self.readPolicy = EVENT
+        self.readThreshold = COALESCE_BYTES
         self.timer = QTimer(self)
-        self.timer.setInterval(20)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(COALESCE_MS)
+        self.timer.timeout.connect(self.Receive)
         self.SerialStatus()
         self.readyRead.connect(self.Receive)
+        # reopens the port after a glitch, see supervisor.py
+        self.supervisor = ConnectionSupervisor(self, parent=self)
 
     # receive config info
     @pyqtSlot(str, int)
@@ -57,6 +97,45 @@ class SerialInterface(QtSerialPort.QSerialPort):
         self.baud_rate = baud_rate
         self.port_name = port_name
 
+    # [Slot] how readyRead is turned into Receive calls, see READ_POLICIES
+    @pyqtSlot(str)
+    @pyqtSlot(str, int, int)
+    def SetReadPolicy(
+        self, policy: str, threshold: int = COALESCE_BYTES, delay: int = COALESCE_MS
+    ):
+        # a slot must not raise, PyQt 5.15 aborts on an unhandled exception
+        if policy not in READ_POLICIES or threshold < 1 or delay < 0:
+            print(f"[serial] invalid read policy {policy!r} {threshold} {delay}")
+            self.read_policy_changed.emit(self.readPolicy)
+            return
+        self.readThreshold = threshold
+        self.timer.setInterval(delay)
+        if policy == self.readPolicy:
+            self.read_policy_changed.emit(policy)
+            return
+        self.readyRead.disconnect(
+            self.Receive if self.readPolicy == EVENT else self.Coalesce
+        )
+        if policy == EVENT:
+            self.readyRead.connect(self.Receive)
+        else:
+            self.readyRead.connect(self.Coalesce)
+        self.readPolicy = policy
+        # whatever is waiting is read now under the new policy
+        self.timer.stop()
+        self.Receive()
+        print(f"[serial] read policy {policy}")
+        self.read_policy_changed.emit(policy)
+
+    # [Slot] COALESCE: drain once enough is waiting or the delay has passed
+    @pyqtSlot()
+    def Coalesce(self):
+        if self.bytesAvailable() >= self.readThreshold:
+            self.timer.stop()
+            self.Receive()
+        elif not self.timer.isActive():
+            self.timer.start()
+
     @pyqtSlot(str)
     def AutoConnect(self, port_name):
         self.port_name = port_name
@@ -71,7 +150,7 @@ class SerialInterface(QtSerialPort.QSerialPort):
 
     # this connect method should be ssubscribed to the emitting of the combobox for
     @pyqtSlot(object)
-    def Connect(self, cmd):
+    def Connect(self, cmd: CommandRequest):
         # set port name and baud rate
         self.setPortName(self.port_name)
         self.setBaudRate(self.baud_rate)
@@ -93,12 +172,13 @@ class SerialInterface(QtSerialPort.QSerialPort):
 
     # [Slot] Disconnect the serial connection
     @pyqtSlot(object)
-    def Disconnect(self, cmd):
+    def Disconnect(self, cmd: CommandRequest):
 
         if self.running:
             self.close()
             self.timer.stop()
             self.running = False
+        self.tracker.Clear()
 
         self.serial_cmd_response.emit(cmd)
         self.serial_disconnected.emit()
@@ -123,34 +203,60 @@ class SerialInterface(QtSerialPort.QSerialPort):
     [Slot] Receive serial input 
     """
 
+    @pyqtSlot()
+    @TimedSlot("SerialInterface.Receive")
     def Receive(self):
         """
         when using readLine, reads a line of ascii characters up to a max size,
         the characters are stored in 'data', it also returns the number of bytes read
         a terminating '\\0' is always added. a newline characters is also added
         """
+        lines = samples = received = 0
         while self.canReadLine():
             # print("receiving")
-            raw_input = self.readLine().data().decode()
+            data = self.readLine().data()
+            lines += 1
+            received += len(data)
+            try:
+                raw_input = data.decode()
+            except UnicodeDecodeError:
+                PARSE_ERRORS.Labels("decode").Inc()
+                continue
 
             self.serial_receive.emit(raw_input)
             self.live_data.emit(raw_input)
 
             # print(list(raw_input))
-            if self.currentCmd:
-                if "-" in raw_input:
-                    start = raw_input.index("-")
-                    command = "".join(raw_input[start : start + 2])
-                    if self.currentCmd.cmd == command:
-                        self.serial_cmd_response.emit(self.currentCmd)
-                        self.currentCmd = None
-
-                elif "#" in raw_input:
+            if raw_input.strip().isdigit():
+                # a live weight sample, never a response
+                samples += 1
+                continue
+            if not self.tracker:
+                continue
+            if "-" in raw_input:
+                start = raw_input.index("-")
+                request = self.tracker.Echo(raw_input[start : start + 2])
+
+            elif "#" in raw_input:
+                try:
                     start, end = raw_input.index("#"), raw_input.index("&")
-                    val = int(raw_input[start + 1 : end])
-                    self.currentCmd.returnValue = val
-                    self.serial_cmd_response.emit(self.currentCmd)
-                    self.currentCmd = None
+                    value = int(raw_input[start + 1 : end])
+                except ValueError:
+                    PARSE_ERRORS.Labels("value").Inc()
+                    continue
+                request = self.tracker.Value(value)
+
+            else:
+                continue
+
+            if request is not None:
+                if TRACER.enabled:
+                    TRACER.Bind(request.id)
+                COMMAND_LATENCY.Observe(request.Latency() / 1e3)
+                self.serial_cmd_response.emit(request)
+        LINES.Inc(lines)
+        SAMPLES.Inc(samples)
+        BYTES_RECEIVED.Inc(received)
 
     def ReceiveLiveWeight(self):
         while self.canReadLine():
@@ -173,15 +279,57 @@ class SerialInterface(QtSerialPort.QSerialPort):
     """
 
     @pyqtSlot(object)
-    def RunCommand(self, cmd):
+    @TimedSlot("SerialInterface.RunCommand")
+    def RunCommand(self, cmd: CommandRequest):
         # command = f"{cmd.cmd}\r"
         command = f"{cmd.cmd}\r\n"
-        self.currentCmd = cmd
         if self.running:
-            self.write(command.encode())
+            self.tracker.Add(cmd)
+            with Span("SerialInterface.write"):
+                BYTES_SENT.Inc(max(self.write(command.encode()), 0))
+            COMMANDS_SENT.Inc()
+        elif self.supervisor.reconnecting:
+            # sent once the port is back
+            self.tracker.Add(cmd)
+
+    # [Slot] stop waiting for the response to a request
+    @pyqtSlot(object)
+    def Cancel(self, cmd: CommandRequest):
+        self.tracker.Cancel(cmd)
+
+    # --------------------------------------------------------------------------
+    # called by the supervisor
+    # the port failed, close it but keep the pending requests
+    def Lost(self):
+        self.running = False
+        self.timer.stop()
+        if self.isOpen():
+            self.close()
+        self.SerialStatus()
+
+    def Reopen(self) -> bool:
+        self.setPortName(self.port_name)
+        self.setBaudRate(self.baud_rate)
+        self.running = self.open(self.ReadWrite)
+        if self.running:
+            self.clear()
+            self.SerialStatus()
+        return self.running
+
+    # send everything that did not complete before the outage, in order
+    def Replay(self):
+        for request in self.tracker.Clear():
+            request.acked = False
+            self.RunCommand(request)
+
+    def GiveUp(self):
+        self.tracker.Clear()
+        self.serial_disconnected.emit()
+        self.SerialStatus()
 
     # emit the current serial status
     def SerialStatus(self):
+        CONNECTED.Set(int(self.running))
         self.serial_status.emit(self.running)
 
         # Workers run method
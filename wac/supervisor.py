@@ -0,0 +1,145 @@
+import random
+import time
+from time import perf_counter
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtSerialPort import QSerialPort
+
+"""
+Connection supervisor
+
+A pulled cable or a USB adapter that resets shows up as an errorOccurred of
+the serial port, ResourceError on most platforms. The supervisor closes the
+port, keeps the requests that were still pending, and reopens the same port
+with exponential backoff: BASE_DELAY, twice that, ... up to MAX_DELAY, each
+delay scaled by a random factor within JITTER so several scales on one hub do
+not retry in lockstep.
+
+Once the port opens again the pending requests are sent again in their
+original order, together with whatever was queued during the outage. A
+request counts as pending until it completes, a WEIGH whose echo arrived but
+whose value was lost is sent again as well. Nobody else is told about the
+outage except through lost / restored, the state machine stays where it is.
+After MAX_ATTEMPTS failed attempts the supervisor gives up, the pending
+requests are dropped and the interface reports itself disconnected.
+Hotplug events can cut the wait short, see Removed and RetryNow.
+
+Every outage is printed and kept in outages, (start time, seconds, attempts).
+"""
+
+BASE_DELAY = 500  # ms before the first attempt
+MAX_DELAY = 10000  # ms
+JITTER = 0.25  # +/- fraction of each delay
+MAX_ATTEMPTS = 12
+
+FATAL_ERRORS = (
+    QSerialPort.ResourceError,
+    QSerialPort.DeviceNotFoundError,
+    QSerialPort.ReadError,
+    QSerialPort.WriteError,
+)
+
+
+class ConnectionSupervisor(QObject):
+
+    lost = pyqtSignal(str)  # error
+    restored = pyqtSignal(float, int)  # outage in s, attempts
+    gave_up = pyqtSignal(float, int)
+
+    def __init__(
+        self,
+        serial,
+        base: int = BASE_DELAY,
+        maximum: int = MAX_DELAY,
+        jitter: float = JITTER,
+        attempts: int = MAX_ATTEMPTS,
+        parent=None,
+    ):
+        super(ConnectionSupervisor, self).__init__(parent)
+        self.serial = serial
+        self.base = base
+        self.maximum = maximum
+        self.jitter = jitter
+        self.maxAttempts = attempts
+        self.reconnecting = False
+        self.attempts = 0
+        self.started = 0.0
+        self.startTime = ""
+        self.outages = []  # (start time, seconds, attempts)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.Retry)
+
+        serial.errorOccurred.connect(self.Error)
+        serial.serial_disconnected.connect(self.Stop)
+
+    # ms to wait before the next attempt
+    def Delay(self) -> int:
+        delay = min(self.maximum, self.base * 2**self.attempts)
+        return int(delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    @pyqtSlot(QSerialPort.SerialPortError)
+    def Error(self, error):
+        if error not in FATAL_ERRORS or not self.serial.running:
+            return
+        text = self.serial.errorString()
+        self.serial.clearError()
+        self.Begin(text)
+
+    # hotplug saw the device node go away, in case the port did not notice
+    @pyqtSlot()
+    def Removed(self):
+        if self.serial.running:
+            self.Begin("device removed")
+
+    # hotplug saw a device come back, no need to wait for the next attempt
+    @pyqtSlot()
+    def RetryNow(self):
+        if self.reconnecting:
+            self.timer.stop()
+            self.Retry()
+
+    def Begin(self, text: str) -> None:
+        self.serial.Lost()
+
+        self.reconnecting = True
+        self.attempts = 0
+        self.started = perf_counter()
+        self.startTime = time.strftime("%Y-%m-%dT%H:%M:%S")
+        print(f"[supervisor] {self.serial.port_name} lost: {text}")
+        self.lost.emit(text)
+        self.timer.start(self.Delay())
+
+    @pyqtSlot()
+    def Retry(self):
+        if not self.reconnecting:
+            return
+        self.attempts += 1
+        if self.serial.Reopen():
+            self.Finish()
+            self.restored.emit(self.outages[-1][1], self.attempts)
+            self.serial.Replay()
+        elif self.attempts >= self.maxAttempts:
+            self.Finish()
+            self.gave_up.emit(self.outages[-1][1], self.attempts)
+            self.serial.GiveUp()
+        else:
+            self.timer.start(self.Delay())
+
+    def Finish(self) -> None:
+        self.timer.stop()
+        self.reconnecting = False
+        outage = perf_counter() - self.started
+        self.outages.append((self.startTime, outage, self.attempts))
+        result = "back" if self.serial.running else "given up"
+        print(
+            f"[supervisor] {self.serial.port_name} {result} after {outage:.1f} s,"
+            f" {self.attempts} attempts"
+        )
+
+    # the user disconnected, stop retrying
+    @pyqtSlot()
+    def Stop(self):
+        if self.reconnecting:
+            self.Finish()
@@ -1,4 +1,5 @@
 from PyQt5.QtGui import QColor, QPalette
+from PyQt5.QtWidgets import QWidget
 
 
 """ Provides the Dark Theme """
@@ -45,6 +46,53 @@ def ApplicationTheme() -> QPalette:
     return palette
 
 
+"""
+Application wide stylesheet, set once on the QApplication.
+State dependent looks are selected with dynamic properties (see SetStyleState),
+so a state change only re-polishes the widget instead of parsing a new
+stylesheet.
+"""
+
+APPLICATION_QSS = """
+QPushButton[connection="connected"] {
+    background-color: green;
+    color: white;
+    font-size: 16px;
+}
+
+QPushButton[connection="disconnected"] {
+    background-color: red;
+    color: white;
+    font-size: 16px;
+}
+
+QLabel#ScaleStatus[connection="connected"] {
+    color: green;
+}
+
+QLabel#ScaleStatus[connection="reconnecting"] {
+    color: orange;
+}
+
+QLabel#ScaleStatus[connection="disconnected"] {
+    color: red;
+}
+"""
+
+
+def ApplicationStyleSheet() -> str:
+    return APPLICATION_QSS
+
+
+def SetStyleState(widget: QWidget, name: str, value: str) -> None:
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+
+
 """ Provides the Dark Theme """
 
 
@@ -0,0 +1,222 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from time import perf_counter_ns
+
+from wac.paths import DataPath
+
+"""
+Trace spans of every command, from the button to the firmware's response
+
+    TRACER.Start()
+    with Span("SerialInterface.write"):      # any block worth a span
+        ...
+    path = TRACER.Stop()                     # Chrome trace event JSON
+
+Every TimedSlot is also a span while tracing, so the hops a command takes
+(CommandButton.ForwardSignal, the routers, MainWindow.Request.Process,
+SerialInterface.RunCommand and Receive, the event bus tick and
+MainWindow.Response.Process) need no code of their own. A span is keyed by
+the request it works on, the id of a CommandRequest argument. Spans opened
+before the request exists, the button and the widget's router, share the key
+list of the outermost one and get the id when RequestScheduler.Schedule
+binds it. Receive binds the id of the request a response resolves, the
+event bus carries the keys of whoever published to the tick that delivers
+it, so the trace follows one request across the worker and the GUI thread.
+
+Open the file in chrome://tracing or ui.perfetto.dev, spans of one request
+are joined by flow arrows. While not tracing every hook costs one attribute
+check. Spans are kept per thread, the newest MAX_SPANS of each, and only
+turned into events by Export.
+"""
+
+TRACE_ENABLED = os.environ.get("WAC_TRACE", "") not in ("", "0")
+MAX_SPANS = 200000  # per thread
+
+
+class SpanRecord:
+    __slots__ = ("name", "start", "end", "keys")
+
+    def __init__(self, name: str, start: int, keys: list):
+        self.name = name
+        self.start = start
+        self.end = 0
+        self.keys = keys  # request ids, shared with the enclosing spans
+
+
+class ThreadSpans:
+    def __init__(self, ident: int):
+        self.ident = ident
+        self.stack = []  # open spans
+        self.spans = deque(maxlen=MAX_SPANS)  # closed spans
+
+
+def RequestKey(args: tuple) -> int:
+    for arg in args:
+        key = getattr(arg, "id", None)
+        if isinstance(key, int):
+            return key
+    return None
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.started = 0
+        self.threads = []  # ThreadSpans of every thread that traced
+        self.names = {}  # thread ident -> name
+        self.local = threading.local()
+        self.exitRegistered = False
+
+    def Start(self) -> None:
+        self.started = perf_counter_ns()
+        self.enabled = True
+        if not self.exitRegistered:
+            atexit.register(self.Exit)
+            self.exitRegistered = True
+        print("[trace] started")
+
+    # returns the path of the trace written
+    def Stop(self, path: str = None) -> str:
+        self.enabled = False
+        return self.Export(path)
+
+    def Exit(self) -> None:
+        if self.enabled:
+            self.Stop()
+
+    # [any thread] e.g. "GUI", "Worker", default the Python thread name
+    def NameThread(self, name: str) -> None:
+        self.names[threading.get_ident()] = name
+
+    def Thread(self) -> ThreadSpans:
+        try:
+            return self.local.spans
+        except AttributeError:
+            spans = self.local.spans = ThreadSpans(threading.get_ident())
+            self.threads.append(spans)
+            return spans
+
+    # key: a request id, a list of them, or None to share the enclosing span's
+    def Begin(self, name: str, key=None) -> SpanRecord:
+        thread = self.Thread()
+        if isinstance(key, list):
+            keys = key
+        elif key is not None:
+            keys = [key]
+        else:
+            keys = thread.stack[-1].keys if thread.stack else []
+        span = SpanRecord(name, perf_counter_ns(), keys)
+        thread.stack.append(span)
+        return span
+
+    def End(self, span: SpanRecord) -> None:
+        span.end = perf_counter_ns()
+        thread = self.Thread()
+        if thread.stack and thread.stack[-1] is span:
+            thread.stack.pop()
+        elif span in thread.stack:
+            thread.stack.remove(span)
+        thread.spans.append(span)
+
+    # the request the open spans of this thread turned out to work on
+    def Bind(self, key: int) -> None:
+        stack = self.Thread().stack
+        if stack and key not in stack[-1].keys:
+            stack[-1].keys.append(key)
+
+    # the requests of the innermost open span, e.g. to carry them over a queue
+    def Keys(self) -> list:
+        stack = self.Thread().stack
+        return stack[-1].keys if stack else []
+
+    def Events(self) -> list:
+        pid = os.getpid()
+        events, flows = [], {}
+        for thread in list(self.threads):
+            name = self.names.get(thread.ident, f"Thread {thread.ident}")
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": thread.ident,
+                    "args": {"name": name},
+                }
+            )
+            for span in list(thread.spans):
+                if span.start < self.started:
+                    continue
+                event = {
+                    "name": span.name,
+                    "cat": "wac",
+                    "ph": "X",
+                    "ts": (span.start - self.started) / 1e3,
+                    "dur": (span.end - span.start) / 1e3,
+                    "pid": pid,
+                    "tid": thread.ident,
+                }
+                if span.keys:
+                    event["args"] = {"requests": list(span.keys)}
+                events.append(event)
+                for key in span.keys:
+                    flows.setdefault(key, []).append(event)
+
+        # one arrow per request through its outermost spans, in time order
+        for key, spans in flows.items():
+            spans.sort(key=lambda _: _["ts"])
+            outer, end = [], -1.0
+            for span in spans:
+                if span["ts"] >= end:
+                    outer.append(span)
+                    end = span["ts"] + span["dur"]
+            if len(outer) < 2:
+                continue
+            for i, span in enumerate(outer):
+                phase = "s" if i == 0 else "f" if i == len(outer) - 1 else "t"
+                flow = {
+                    "name": "request",
+                    "cat": "wac",
+                    "ph": phase,
+                    "id": key,
+                    "ts": span["ts"],
+                    "pid": pid,
+                    "tid": span["tid"],
+                }
+                if phase == "f":
+                    flow["bp"] = "e"
+                events.append(flow)
+        return events
+
+    def Export(self, path: str = None) -> str:
+        path = path or DataPath("traces", time.strftime("%Y%m%d-%H%M%S") + ".json")
+        events = self.Events()
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"[trace] {len(events)} events, {path}")
+        return path
+
+
+TRACER = Tracer()
+
+
+class Span:
+    __slots__ = ("name", "key", "span")
+
+    def __init__(self, name: str, key=None):
+        self.name = name
+        self.key = key
+        self.span = None
+
+    def __enter__(self):
+        if TRACER.enabled:
+            self.span = TRACER.Begin(self.name, self.key)
+        return self
+
+    def __exit__(self, *exc):
+        if self.span is not None:
+            TRACER.End(self.span)
+        return False
@@ -121,7 +121,6 @@ class LivePlotter(QWidget):
 
     @pyqtSlot(int)
     def update(self, rawInt):
-        print(rawInt)
         self.data[:-1] = self.data[1:]
         self.data[-1] = rawInt
         self.curve.setData(self.data)
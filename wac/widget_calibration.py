@@ -7,7 +7,7 @@ from wac.command_button import (
     CalibrationCommands,
     CommandButton,
 )
-from wac.router import Router
+from wac.router import Route, Router
 
 PADDING = 10
 SPACING = 10
@@ -19,14 +19,13 @@ MARGIN = 10
 class Request(Router):
     def __init__(self, *args, **kwargs):
         super(Request, self).__init__(*args, **kwargs)
-        self.route = {
-            "CALIBRATE": self.Calibrate,
-            "TARE": self.Tare,
-        }
+        self.setObjectName("Calibration_Request")
 
+    @Route("CALIBRATE")
     def Calibrate(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
+    @Route("TARE")
     def Tare(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
@@ -40,14 +39,13 @@ class Response(Router):
 
     def __init__(self, *args, **kwargs):
         super(Response, self).__init__(*args, **kwargs)
-        self.route = {
-            "CALIBRATE": self.Calibrate,
-            "TARE": self.Tare,
-        }
+        self.setObjectName("Calibration_Response")
 
+    @Route("CALIBRATE")
     def Calibrate(self, cmd: Command) -> None:
         self.calibration_complete.emit()
 
+    @Route("TARE")
     def Tare(self, cmd: Command) -> None:
         self.calibration_complete.emit()
 
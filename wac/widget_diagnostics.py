@@ -0,0 +1,177 @@
+from PyQt5.QtWidgets import (
+    QComboBox,
+    QHBoxLayout,
+    QWidget,
+    QVBoxLayout,
+    QTextEdit,
+    QLabel,
+    QPushButton,
+)
+from PyQt5.QtCore import QTimer, pyqtSignal, pyqtSlot, Qt
+
+from wac.diagnostics import LagMonitor
+from wac.event_bus import BUSES
+from wac.profiler import MODES, Profiler
+from wac.router import ROUTERS
+from wac.serial_interface import READ_POLICIES
+from wac.tracing import TRACER
+
+PADDING = 10
+MARGIN = 10
+
+"""
+DiagnosticsPanel: event loop lag per thread, the slots blamed for stalls, the
+slowest timed slots, per-route counters of every Router and per-topic
+counters of every EventBus. Refreshed once a second while visible. The
+profile box starts and stops a cProfile or sampling capture, see profiler.py,
+the trace button records request spans, see tracing.py. The read box
+switches the serial worker's read policy, see serial_interface.py.
+"""
+
+
+class DiagnosticsPanel(QWidget):
+
+    REFRESH = 1000  # ms
+
+    read_policy = pyqtSignal(str)
+
+    def __init__(
+        self, monitor: LagMonitor = None, profiler: Profiler = None, parent=None
+    ):
+        super(DiagnosticsPanel, self).__init__(parent)
+        self.monitor = monitor
+        self.profiler = profiler
+        self.setupUi()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.REFRESH)
+        self.timer.timeout.connect(self.Refresh)
+        self.timer.start()
+
+    def setupUi(self):
+        self.Label_Lag = QLabel(text="Event Loop Lag")
+        self.Label_Lag.setAlignment(Qt.AlignCenter)
+        self.TextEdit_Lag = QTextEdit(readOnly=True)
+
+        self.Label_Offenders = QLabel(text="Worst Offenders")
+        self.Label_Offenders.setAlignment(Qt.AlignCenter)
+        self.TextEdit_Offenders = QTextEdit(readOnly=True)
+
+        self.Label_Slots = QLabel(text="Slowest Slots")
+        self.Label_Slots.setAlignment(Qt.AlignCenter)
+        self.TextEdit_Slots = QTextEdit(readOnly=True)
+
+        self.Label_Routes = QLabel(text="Routes")
+        self.Label_Routes.setAlignment(Qt.AlignCenter)
+        self.TextEdit_Routes = QTextEdit(readOnly=True)
+
+        self.Label_Topics = QLabel(text="Event Bus Topics")
+        self.Label_Topics.setAlignment(Qt.AlignCenter)
+        self.TextEdit_Topics = QTextEdit(readOnly=True)
+
+        self.PButton_Reset = QPushButton(self, text="Reset")
+        self.PButton_Reset.clicked.connect(self.Reset)
+
+        self.Label_Profile = QLabel(text="Profile")
+        self.ComboBox_Profile = QComboBox(self)
+        self.ComboBox_Profile.addItems(MODES)
+        self.ComboBox_Profile.setEnabled(self.profiler is not None)
+        if self.profiler is not None:
+            self.ComboBox_Profile.textActivated.connect(self.profiler.SetMode)
+            self.profiler.mode_changed.connect(self.ComboBox_Profile.setCurrentText)
+        self.PButton_Trace = QPushButton(
+            self, text="Trace", checkable=True, checked=TRACER.enabled
+        )
+        self.PButton_Trace.toggled.connect(self.Trace)
+        self.Label_Trace = QLabel(text="")
+        self.hbox_profile = QHBoxLayout()
+        self.hbox_profile.addWidget(self.Label_Profile)
+        self.hbox_profile.addWidget(self.ComboBox_Profile)
+        self.hbox_profile.addWidget(self.PButton_Trace)
+
+        self.Label_ReadPolicy = QLabel(text="Serial Read")
+        self.ComboBox_ReadPolicy = QComboBox(self)
+        self.ComboBox_ReadPolicy.addItems(READ_POLICIES)
+        self.ComboBox_ReadPolicy.textActivated.connect(self.read_policy)
+        self.hbox_profile.addWidget(self.Label_ReadPolicy)
+        self.hbox_profile.addWidget(self.ComboBox_ReadPolicy)
+
+        self.vbox = QVBoxLayout()
+        self.vbox.setContentsMargins(MARGIN, MARGIN, MARGIN, MARGIN)
+        self.vbox.setSpacing(PADDING)
+        self.vbox.addWidget(self.Label_Lag)
+        self.vbox.addWidget(self.TextEdit_Lag)
+        self.vbox.addWidget(self.Label_Offenders)
+        self.vbox.addWidget(self.TextEdit_Offenders)
+        self.vbox.addWidget(self.Label_Slots)
+        self.vbox.addWidget(self.TextEdit_Slots)
+        self.vbox.addWidget(self.Label_Routes)
+        self.vbox.addWidget(self.TextEdit_Routes)
+        self.vbox.addWidget(self.Label_Topics)
+        self.vbox.addWidget(self.TextEdit_Topics)
+        self.vbox.addLayout(self.hbox_profile)
+        self.vbox.addWidget(self.Label_Trace)
+        self.vbox.addWidget(self.PButton_Reset)
+
+        self.setWindowTitle("Diagnostics")
+        self.setLayout(self.vbox)
+
+    @pyqtSlot()
+    def Refresh(self):
+        if not self.isVisible() or self.monitor is None:
+            return
+
+        lines = [
+            f"{thread}: {lag:.1f} ms (worst {self.monitor.worst[thread]:.1f} ms)"
+            for thread, lag in self.monitor.current.items()
+        ]
+        self.TextEdit_Lag.setPlainText("\n".join(lines))
+
+        lines = [
+            f"{name}: {stalls} stalls, worst {worst:.0f} ms"
+            for name, stalls, worst in self.monitor.WorstOffenders()
+        ]
+        self.TextEdit_Offenders.setPlainText("\n".join(lines))
+
+        lines = [
+            f"{_.name}: max {_.max_ns / 1e6:.2f} ms, "
+            f"mean {_.Mean() / 1e6:.3f} ms, {_.calls} calls"
+            for _ in self.monitor.SlowestSlots()
+        ]
+        self.TextEdit_Slots.setPlainText("\n".join(lines))
+
+        lines = []
+        for router in sorted(ROUTERS, key=lambda _: _.objectName()):
+            lines.append(f"{router.objectName()}: {router.unroutedCount} unrouted")
+            lines.extend(
+                f"    {key}: {stats.calls} calls, "
+                f"mean {stats.Mean() / 1e3:.1f} us, {stats.failures} failures"
+                for key, stats in router.stats.items()
+                if stats.calls or stats.failures
+            )
+        self.TextEdit_Routes.setPlainText("\n".join(lines))
+
+        lines = []
+        for bus in BUSES:
+            for name, stats in bus.stats.items():
+                lines.append(
+                    f"{name}: {len(bus.subscribers[name])} subscribers, "
+                    f"{stats.rate:.0f}/s, {stats.published} published, "
+                    f"batch mean {stats.MeanBatch():.1f} max {stats.maxBatch}, "
+                    f"{stats.dropped} dropped, {stats.failures} failures"
+                )
+        self.TextEdit_Topics.setPlainText("\n".join(lines))
+
+    @pyqtSlot(bool)
+    def Trace(self, on: bool):
+        if on:
+            TRACER.Start()
+            self.Label_Trace.setText("Tracing...")
+        elif TRACER.enabled:
+            self.Label_Trace.setText(TRACER.Stop())
+
+    @pyqtSlot()
+    def Reset(self):
+        if self.monitor is not None:
+            self.monitor.Reset()
+        self.Refresh()
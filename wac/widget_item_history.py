@@ -0,0 +1,258 @@
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QComboBox,
+    QCheckBox,
+    QSpinBox,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QProgressBar,
+)
+from PyQt5.QtCore import QDateTime, pyqtSlot, Qt
+
+from wac.diagnostics import TimedSlot
+from wac.export import FORMATS, Exporter, ItemSource
+from wac.results_query import Period, ResultsQuery
+
+PADDING = 10
+SPACING = 10
+MARGIN = 10
+
+"""
+ItemHistoryPanel: the logged items, filtered by period, scale and product,
+optionally only those whose piece weight was outside a range. Shows a
+summary of the whole selection and the items a page at a time, Older and
+Newer walk the pages with the query's keyset cursors. Export writes the
+whole selection to the exports folder on the exporter's thread.
+"""
+
+PERIODS = {
+    "Today": "today",
+    "This Week": "week",
+    "This Month": "month",
+    "This Year": "year",
+    "All": "all",
+}
+HEADERS = ("Time", "Scale", "Product", "Piece Weight", "Count", "Total Weight")
+ANY = "All"
+
+
+class ItemHistoryPanel(QWidget):
+    def __init__(
+        self, query: ResultsQuery = None, exporter: Exporter = None, parent=None
+    ):
+        super(ItemHistoryPanel, self).__init__(parent)
+        self.query = query or ResultsQuery()
+        self.exporter = exporter or Exporter(parent=self)
+        self.exporting = False  # the running export is this panel's
+        self.cursors = [None]  # cursor of every page shown so far
+        self.next = None
+        self.setupUi()
+
+    def setupUi(self):
+        self.setWindowTitle("Item History")
+
+        self.ComboBox_Period = QComboBox(self)
+        self.ComboBox_Period.addItems(PERIODS)
+        self.ComboBox_Scale = QComboBox(self)
+        self.ComboBox_Product = QComboBox(self)
+        self.CheckBox_Outside = QCheckBox(self, text="Piece weight outside")
+        self.SpinBox_Low = QSpinBox(self, maximum=100000, suffix=" g")
+        self.SpinBox_High = QSpinBox(self, maximum=100000, suffix=" g", value=1000)
+
+        self.ComboBox_Period.activated.connect(self.Search)
+        self.ComboBox_Scale.activated.connect(self.Search)
+        self.ComboBox_Product.activated.connect(self.Search)
+        self.CheckBox_Outside.toggled.connect(self.Search)
+        self.SpinBox_Low.editingFinished.connect(self.Search)
+        self.SpinBox_High.editingFinished.connect(self.Search)
+
+        self.hbox = QHBoxLayout()
+        self.hbox.setSpacing(SPACING)
+        self.hbox.addWidget(self.ComboBox_Period)
+        self.hbox.addWidget(self.ComboBox_Scale)
+        self.hbox.addWidget(self.ComboBox_Product)
+        self.hbox.addWidget(self.CheckBox_Outside)
+        self.hbox.addWidget(self.SpinBox_Low)
+        self.hbox.addWidget(self.SpinBox_High)
+
+        self.Label_Summary = QLabel(self)
+        self.Label_Summary.setAlignment(Qt.AlignCenter)
+
+        self.Table_Items = QTableWidget(0, len(HEADERS), self)
+        self.Table_Items.setHorizontalHeaderLabels(HEADERS)
+        self.Table_Items.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.Table_Items.verticalHeader().setVisible(False)
+        self.Table_Items.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+
+        self.PButton_Newer = QPushButton(self, text="Newer")
+        self.PButton_Newer.clicked.connect(self.Newer)
+        self.PButton_Older = QPushButton(self, text="Older")
+        self.PButton_Older.clicked.connect(self.Older)
+        self.Label_Page = QLabel(self)
+        self.Label_Page.setAlignment(Qt.AlignCenter)
+
+        self.hbox_pages = QHBoxLayout()
+        self.hbox_pages.setSpacing(SPACING)
+        self.hbox_pages.addWidget(self.PButton_Newer)
+        self.hbox_pages.addWidget(self.Label_Page)
+        self.hbox_pages.addWidget(self.PButton_Older)
+
+        self.ComboBox_Format = QComboBox(self)
+        self.ComboBox_Format.addItems(FORMATS)
+        self.PButton_Export = QPushButton(self, text="Export")
+        self.PButton_Export.clicked.connect(self.Export)
+        self.ProgressBar_Export = QProgressBar(self)
+        self.Label_Export = QLabel(self)
+        self.exporter.progress.connect(self.ExportProgress)
+        self.exporter.finished.connect(self.ExportDone)
+        self.exporter.cancelled.connect(self.ExportDone)
+        self.exporter.failed.connect(self.ExportDone)
+
+        self.hbox_export = QHBoxLayout()
+        self.hbox_export.setSpacing(SPACING)
+        self.hbox_export.addWidget(self.ComboBox_Format)
+        self.hbox_export.addWidget(self.PButton_Export)
+        self.hbox_export.addWidget(self.ProgressBar_Export)
+        self.hbox_export.addWidget(self.Label_Export)
+
+        self.vbox = QVBoxLayout()
+        self.vbox.setContentsMargins(MARGIN, MARGIN, MARGIN, MARGIN)
+        self.vbox.setSpacing(PADDING)
+        self.vbox.addLayout(self.hbox)
+        self.vbox.addWidget(self.Label_Summary)
+        self.vbox.addWidget(self.Table_Items)
+        self.vbox.addLayout(self.hbox_pages)
+        self.vbox.addLayout(self.hbox_export)
+        self.setLayout(self.vbox)
+        self.resize(800, 600)
+
+    # the current filters as Items / Summary keyword arguments
+    def Filters(self) -> dict:
+        since, until = Period(PERIODS[self.ComboBox_Period.currentText()])
+        scale = self.ComboBox_Scale.currentText()
+        product = self.ComboBox_Product.currentText()
+        outside = None
+        if self.CheckBox_Outside.isChecked():
+            outside = (self.SpinBox_Low.value(), self.SpinBox_High.value())
+        return {
+            "since": since,
+            "until": until,
+            "scale": None if scale in ("", ANY) else scale,
+            "product": None if product in ("", ANY) else product,
+            "outside": outside,
+        }
+
+    def FillChoices(self, comboBox: QComboBox, choices: list) -> None:
+        current = comboBox.currentText()
+        comboBox.clear()
+        comboBox.addItems([ANY] + choices)
+        if current in choices:
+            comboBox.setCurrentText(current)
+
+    # filters changed, start over at the newest page
+    @pyqtSlot()
+    def Search(self):
+        self.cursors = [None]
+        self.Load()
+
+    @pyqtSlot()
+    def Older(self):
+        if self.next is not None:
+            self.cursors.append(self.next)
+            self.Load()
+
+    @pyqtSlot()
+    def Newer(self):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+            self.Load()
+
+    @TimedSlot("ItemHistoryPanel.Load")
+    def Load(self) -> None:
+        filters = self.Filters()
+        summary = self.query.Summary(**filters)
+        rows, self.next = self.query.Items(after=self.cursors[-1], **filters)
+
+        text = (
+            f"{summary['items']} items, {summary['count']} pieces, "
+            f"{summary['total_weight']} g"
+        )
+        if summary["piece_weight_mean"] is not None:
+            text += (
+                f", piece weight {summary['piece_weight_mean']:.1f} g "
+                f"({summary['piece_weight_min']} - {summary['piece_weight_max']} g)"
+            )
+        if "outside" in summary:
+            text += f", {summary['outside']} outside"
+        self.Label_Summary.setText(text)
+
+        self.Table_Items.setRowCount(len(rows))
+        for row, item in enumerate(rows):
+            time = QDateTime.fromMSecsSinceEpoch(int(item["timestamp"] * 1000))
+            values = (
+                time.toString("yyyy-MM-dd hh:mm:ss"),
+                item["scale"],
+                item["product"],
+                item["piece_weight"],
+                item["count"],
+                item["total_weight"],
+            )
+            for column, value in enumerate(values):
+                text = "" if value is None else str(value)
+                self.Table_Items.setItem(row, column, QTableWidgetItem(text))
+
+        page = len(self.cursors)
+        self.Label_Page.setText(f"Page {page}")
+        self.PButton_Newer.setEnabled(page > 1)
+        self.PButton_Older.setEnabled(self.next is not None)
+
+    # the selection, not just the page, on the exporter's thread
+    @pyqtSlot()
+    def Export(self):
+        source = ItemSource(self.query.path, **self.Filters())
+        path = self.exporter.Export(source, self.ComboBox_Format.currentText())
+        if path is None:
+            self.Label_Export.setText("An export is already running")
+            return
+        self.exporting = True
+        self.PButton_Export.setEnabled(False)
+        self.ProgressBar_Export.reset()
+        self.Label_Export.setText(f"Exporting to {path}")
+
+    @pyqtSlot(int, int)
+    def ExportProgress(self, done: int, total: int):
+        if not self.exporting:
+            return
+        self.ProgressBar_Export.setMaximum(max(total, 1))
+        self.ProgressBar_Export.setValue(done)
+
+    @pyqtSlot(str)
+    def ExportDone(self, result: str):
+        if not self.exporting:
+            return
+        self.exporting = False
+        self.PButton_Export.setEnabled(True)
+        self.Label_Export.setText(result)
+
+    # new items were written
+    @pyqtSlot(int)
+    def Invalidate(self, written: int = 0):
+        self.query.Invalidate()
+        if self.isVisible() and len(self.cursors) == 1:
+            self.Load()
+
+    def showEvent(self, event):
+        self.query.Invalidate()
+        self.FillChoices(self.ComboBox_Scale, self.query.Scales())
+        self.FillChoices(self.ComboBox_Product, self.query.Products())
+        self.Search()
+        super(ItemHistoryPanel, self).showEvent(event)
+
+    def closeEvent(self, event):
+        self.query.Close()
+        event.accept()
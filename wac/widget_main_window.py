@@ -1,4 +1,6 @@
-from PyQt5 import QtWidgets, QtSerialPort
+import os
+
+from PyQt5 import QtWidgets
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (
     QLabel,
@@ -27,11 +29,28 @@ from PyQt5.QtCore import (
 
 
 from wac.widget_calibration import CalibrationWidget
+from wac.catalog import ProductCatalog
 from wac.command_button import Command
+from wac.command_registry import COMMANDS, PRESET_PIECE_WEIGHT
+from wac.command_request import CommandRequest, RequestScheduler
+from wac.router import Route, Router
+from wac.diagnostics import LagMonitor, LagProbe, TimedSlot
+from wac.discovery import DiscoveryService
+from wac.event_bus import ACKS, PROMPTS, RESULTS, SAMPLES, STATE, EventBus
+from wac.export import Exporter
+from wac.hotplug import HotplugWatcher
+from wac.metrics import REGISTRY, MetricsServer
+from wac.profiler import Profiler
+from wac.tracing import TRACE_ENABLED, TRACER
+from wac.results_query import ResultsQuery
+from wac.results_store import ItemTracker, ResultsStore
+from wac.widget_diagnostics import DiagnosticsPanel
+from wac.widget_item_history import ItemHistoryPanel
 from wac.widget_prompt import PromptWidget
 from wac.widget_serialconnection import SerialConnectionWidget
 from wac.serial_interface import SerialInterface
 from wac.widget_weighandcount import WeighAndCountWidget
+from wac.theme import ApplicationStyleSheet
 
 
 QSSLED = """
@@ -73,96 +92,106 @@ MARGIN = 10
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
-class Request(QObject):
+class Request(Router):
     # output the chosen command to serial output
     command = pyqtSignal(object)
     reset_progresscounter = pyqtSignal()
 
-    # serial connection signal
+    # serial connection signals
     terminate_serial = pyqtSignal()
+    serial_connect = pyqtSignal(object)
+    serial_disconnect = pyqtSignal(object)
 
     # to output to the prompt widget
     prompt = pyqtSignal(str)
 
     def __init__(self, *args, **kwargs):
         super(Request, self).__init__(*args, **kwargs)
+        self.setObjectName("MainWindow_Request")
+        self.scheduler = RequestScheduler()
+
+    """
+    Every command leaving the window is wrapped in a CommandRequest with its
+    own id, the handlers and the serial worker only ever see the request
+    """
 
     @pyqtSlot(object)
-    def Process(self, cmd: Command, route: dict = {}):
+    @TimedSlot("MainWindow.Request.Process")
+    def Process(self, cmd: Command):
         self.reset_progresscounter.emit()
-        route = {
-            "CONNECT": self.Connect,
-            "DISCONNECT": self.Disconnect,
-            "CALIBRATE": self.Calibrate,
-            "TARE": self.Tare,
-            "COUNT": self.Count,
-            "RECOUNT": self.Recount,
-            "WEIGH": self.Weigh,
-            "REWEIGH": self.Reweigh,
-            "STARTWEIGH": self.StartWeigh,
-            "STARTCOUNT": self.StartCount,
-            "FINISH": self.Finish,
-            "RESET": self.Reset,
-            "LOGITEM": self.LogItem,
-        }
-        fn = route[cmd.cmdType]
-        fn(cmd)
-
-    def Connect(self, cmd: Command) -> None:
-        # self.serial_connection.emit(cmd)
-        pass
-
-    def Disconnect(self, cmd: Command) -> None:
-        # self.serial_connection.emit(cmd)
-        pass
-
-    def Calibrate(self, cmd: Command) -> None:
+        super(Request, self).Process(self.scheduler.Schedule(cmd))
+
+    @Route("CONNECT")
+    def Connect(self, cmd: CommandRequest) -> None:
+        self.serial_connect.emit(cmd)
+
+    @Route("DISCONNECT")
+    def Disconnect(self, cmd: CommandRequest) -> None:
+        self.serial_disconnect.emit(cmd)
+
+    @Route("CALIBRATE")
+    def Calibrate(self, cmd: CommandRequest) -> None:
         self.command.emit(cmd)
 
-    def Tare(self, cmd: Command) -> None:
+    @Route("TARE")
+    def Tare(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptStatus)
         self.command.emit(cmd)
 
-    def Count(self, cmd: Command) -> None:
+    @Route("COUNT")
+    def Count(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptStatus)
         self.command.emit(cmd)
 
-    def Recount(self, cmd: Command) -> None:
+    @Route("RECOUNT")
+    def Recount(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptStatus)
         self.command.emit(cmd)
 
-    def Weigh(self, cmd: Command) -> None:
+    @Route("WEIGH")
+    def Weigh(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptStatus)
         self.command.emit(cmd)
 
-    def Reweigh(self, cmd: Command) -> None:
+    @Route("REWEIGH")
+    def Reweigh(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptStatus)
         self.command.emit(cmd)
 
-    def StartWeigh(self, cmd: Command) -> None:
+    @Route("STARTWEIGH")
+    def StartWeigh(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptHowTo)
         self.command.emit(cmd)
 
-    def StartCount(self, cmd: Command) -> None:
+    @Route("STARTCOUNT")
+    def StartCount(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptHowTo)
         self.command.emit(cmd)
 
-    def Finish(self, cmd: Command) -> None:
+    @Route("FINISH")
+    def Finish(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptHowTo)
         self.command.emit(cmd)
 
-    def Reset(self, cmd: Command) -> None:
+    @Route("RESET")
+    def Reset(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptStatus)
         self.command.emit(cmd)
 
-    def LogItem(self, cmd: Command) -> None:
+    @Route("LOGITEM")
+    def LogItem(self, cmd: CommandRequest) -> None:
+        self.command.emit(cmd)
+
+    @Route("SETPIECEWEIGHT")
+    def SetPieceWeight(self, cmd: CommandRequest) -> None:
+        self.prompt.emit(cmd.promptStatus)
         self.command.emit(cmd)
 
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
-class Response(QObject):
+class Response(Router):
     # trigger the next state
     command = pyqtSignal(object)
 
@@ -171,98 +200,120 @@ class Response(QObject):
     serial_connection = pyqtSignal(object)
     return_home = pyqtSignal()
     prompt = pyqtSignal(str)
+    settled_weight = pyqtSignal(int)
+    log_item = pyqtSignal(object)  # ItemTracker
+    piece_weight = pyqtSignal(int)  # accepted at Start Count, g
 
     calibration_complete = pyqtSignal()
 
     def __init__(self, *args, **kwargs):
         super(Response, self).__init__(*args, **kwargs)
+        self.setObjectName("MainWindow_Response")
+        self.item = ItemTracker()
 
     """
     Processes that occur after a response is received fromt he PIC18
     """
 
     @pyqtSlot(object)
-    def Process(self, cmd: Command, route: dict = {}):
+    @TimedSlot("MainWindow.Response.Process")
+    def Process(self, cmd: CommandRequest):
         print("[serial] receive response")
-        route = {
-            "CONNECT": self.Connect,
-            "DISCONNECT": self.Disconnect,
-            "CALIBRATE": self.Calibrate,
-            "TARE": self.Tare,
-            "COUNT": self.Count,
-            "RECOUNT": self.Recount,
-            "WEIGH": self.Weigh,
-            "REWEIGH": self.Reweigh,
-            "STARTWEIGH": self.StartWeigh,
-            "STARTCOUNT": self.StartCount,
-            "FINISH": self.Finish,
-            "RESET": self.Reset,
-            "LOGITEM": self.LogItem,
-        }
-        fn = route[cmd.cmdType]
-        fn(cmd)
-
-    def Connect(self, cmd: Command) -> None:
+        super(Response, self).Process(cmd)
+
+    @Route("CONNECT")
+    def Connect(self, cmd: CommandRequest) -> None:
         self.prompt.emit("Connected")
 
-    def Disconnect(self, cmd: Command) -> None:
+    @Route("DISCONNECT")
+    def Disconnect(self, cmd: CommandRequest) -> None:
         self.prompt.emit("Disconnected")
 
-    def Calibrate(self, cmd: Command) -> None:
+    @Route("CALIBRATE")
+    def Calibrate(self, cmd: CommandRequest) -> None:
         self.prompt.emit("Calibration Complete")
 
         self.calibration_complete.emit()
         self.calibration.emit(cmd)
 
-    def Tare(self, cmd: Command) -> None:
+    @Route("TARE")
+    def Tare(self, cmd: CommandRequest) -> None:
         self.prompt.emit("Tare Complete")
 
         self.calibration_complete.emit()
         self.calibration.emit(cmd)
 
-    def Weigh(self, cmd: Command) -> None:
+    @Route("WEIGH")
+    def Weigh(self, cmd: CommandRequest) -> None:
         text = f"Item weighs {cmd.returnValue} grams.\n\n{cmd.promptProceed}"
         self.prompt.emit(text)
+        self.settled_weight.emit(cmd.returnValue)
+        self.item.Weigh(cmd.returnValue)
         self.weigh_and_count.emit(cmd)
 
-    def Reweigh(self, cmd: Command) -> None:
+    @Route("REWEIGH")
+    def Reweigh(self, cmd: CommandRequest) -> None:
         text = f"Item weighs {cmd.returnValue} grams.\n\n{cmd.promptProceed}"
         self.prompt.emit(text)
+        self.settled_weight.emit(cmd.returnValue)
+        self.item.Weigh(cmd.returnValue)
         self.weigh_and_count.emit(cmd)
 
-    def Count(self, cmd: Command) -> None:
+    @Route("COUNT")
+    def Count(self, cmd: CommandRequest) -> None:
         text = (
             f"There are {cmd.returnValue} items, in the basket.\n\n{cmd.promptProceed}"
         )
         self.prompt.emit(text)
+        self.item.Count(cmd.returnValue)
         self.weigh_and_count.emit(cmd)
 
-    def Recount(self, cmd: Command) -> None:
+    @Route("RECOUNT")
+    def Recount(self, cmd: CommandRequest) -> None:
         text = (
             f"There are {cmd.returnValue} items, in the basket.\n\n{cmd.promptProceed}"
         )
         self.prompt.emit(text)
+        self.item.Count(cmd.returnValue)
         self.weigh_and_count.emit(cmd)
 
-    def StartWeigh(self, cmd: Command) -> None:
+    @Route("STARTWEIGH")
+    def StartWeigh(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptHowTo)
+        self.item.Reset()
         self.weigh_and_count.emit(cmd)
 
-    def StartCount(self, cmd: Command) -> None:
+    @Route("STARTCOUNT")
+    def StartCount(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptHowTo)
+        if self.item.weights:
+            self.piece_weight.emit(self.item.weights[-1])
         self.weigh_and_count.emit(cmd)
 
-    def Finish(self, cmd: Command) -> None:
+    @Route("FINISH")
+    def Finish(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptStatus)
         self.weigh_and_count.emit(cmd)
 
-    def Reset(self, cmd: Command) -> None:
+    @Route("RESET")
+    def Reset(self, cmd: CommandRequest) -> None:
         text = "Scales Reset!"
         self.prompt.emit(text)
+        self.item.Reset()
         self.weigh_and_count.emit(cmd)
 
-    def LogItem(self, cmd: Command) -> None:
+    @Route("LOGITEM")
+    def LogItem(self, cmd: CommandRequest) -> None:
         self.prompt.emit(cmd.promptStatus)
+        self.log_item.emit(self.item)
+        self.weigh_and_count.emit(cmd)
+
+    # a new item, counted with the catalog's piece weight
+    @Route("SETPIECEWEIGHT")
+    def SetPieceWeight(self, cmd: CommandRequest) -> None:
+        self.prompt.emit(f"Piece weight {cmd.argument} grams, from the catalog.")
+        self.item.Reset()
+        self.item.Preset(int(cmd.argument))
         self.weigh_and_count.emit(cmd)
 
 
@@ -282,37 +333,57 @@ QStatusBar {
 
 class MainWindow(QWidget):
 
-    process_serial_response = pyqtSignal(object)
     led_display_raw = pyqtSignal(int)
     dataviewer_liveupdate = pyqtSignal(int)
+    dataviewer_livebatch = pyqtSignal(object)  # the samples of one bus tick
 
     autoconnect = pyqtSignal(str)
     autoconnect_success = pyqtSignal()
+    discover = pyqtSignal()
     autoconnect_fail = pyqtSignal()
+    device_added = pyqtSignal()
+    device_removed = pyqtSignal()
 
     """ The constructor."""
 
     def __init__(self, parent=None):
         super(MainWindow, self).__init__(parent)
+        if TRACE_ENABLED:
+            TRACER.Start()
         self.is_connected = False
         self.request = Request()
         self.response = Response()
 
-        self.prompt = PromptWidget(parent=self)
+        # one exporter for the whole app, one export at a time
+        self.exporter = Exporter(parent=self)
+        self.prompt = PromptWidget(exporter=self.exporter, parent=self)
         self.prompt.setMinimumWidth(300)
         self.calibration = CalibrationWidget(parent=self)
-        self.weigh_and_count = WeighAndCountWidget(parent=self)
+        self.catalog = ProductCatalog()
+        self.weigh_and_count = WeighAndCountWidget(catalog=self.catalog, parent=self)
         self.serial_connection = SerialConnectionWidget(parent=self)
+        self.lagMonitor = LagMonitor(parent=self)
+        self.bus = EventBus(parent=self)
+        self.results = ResultsStore(parent=self)
+        self.history = ItemHistoryPanel(
+            ResultsQuery(self.results.path), exporter=self.exporter
+        )
+        self.hotplug = HotplugWatcher(parent=self)
+        self.profiler = Profiler(parent=self)
+        self.diagnostics = DiagnosticsPanel(
+            monitor=self.lagMonitor, profiler=self.profiler
+        )
         self.setupUi()
-        self.List_Of_Commands = self.findChildren(Command)
-        self.CmdPromptDict = {_.cmdType: _.promptHowTo for _ in self.List_Of_Commands}
-        self.CmdCommandDict = {_.cmd: _ for _ in self.List_Of_Commands}
+        self.commands = COMMANDS
+        self.CmdPromptDict = {_.cmdType: _.promptHowTo for _ in self.commands}
         self.currentState = "DISCONNECTED"
 
         self.progressCounter = 0
 
         self.runSerialConnection()
         self.runConnections()
+        self.runMetrics()
+        self.profiler.Begin()
         self.setupStates()
 
         self.HomePrompt()
@@ -384,10 +455,51 @@ class MainWindow(QWidget):
         )
         self.setLayout(self.gridLayout)
 
+    # queue depths and lag are read when the endpoint is scraped, see metrics.py
+    def runMetrics(self):
+        REGISTRY.Collect(
+            "wac_pending_requests",
+            "Commands waiting for the scale",
+            lambda: len(self.worker.tracker),
+        )
+        REGISTRY.Collect(
+            "wac_reconnecting",
+            "1 while the supervisor reopens the port",
+            lambda: int(self.worker.supervisor.reconnecting),
+        )
+        REGISTRY.Collect(
+            "wac_bus_queue_depth",
+            "Payloads waiting for the next bus tick",
+            lambda: {name: len(_) for name, _ in list(self.bus.queues.items())},
+            ("topic",),
+        )
+        REGISTRY.Collect(
+            "wac_bus_dropped_total",
+            "Payloads dropped from a full topic",
+            lambda: {name: _.dropped for name, _ in self.bus.stats.items()},
+            ("topic",),
+            "counter",
+        )
+        REGISTRY.Collect(
+            "wac_results_pending",
+            "Logged items not yet written to the results store",
+            lambda: len(self.results.writer.pending),
+        )
+        REGISTRY.Collect(
+            "wac_event_loop_lag_seconds",
+            "Last lag measured on every event loop",
+            lambda: {
+                name: lag / 1e3 for name, lag in list(self.lagMonitor.current.items())
+            },
+            ("thread",),
+        )
+        self.metrics = MetricsServer()
+        self.metrics.Start()
+
     # function to establish a serial connection on a separate thread
     def runSerialConnection(self):
         self.thread = QThread()
-        self.worker = SerialInterface(commandDict=self.CmdCommandDict)
+        self.worker = SerialInterface(commands=self.commands)
         # move the worker the thread
         self.worker.moveToThread(self.thread)
         # start the worker
@@ -397,6 +509,31 @@ class MainWindow(QWidget):
         self.worker.finished.connect(self.worker.deleteLater)
         # connect the threads finished signals
         self.thread.finished.connect(self.thread.deleteLater)
+        # watch both event loops for stalls
+        self.guiProbe = self.lagMonitor.Watch(LagProbe("GUI", parent=self))
+        self.guiProbe.Start()
+        self.workerProbe = self.lagMonitor.Watch(LagProbe("Worker"))
+        self.workerProbe.moveToThread(self.thread)
+        self.thread.started.connect(self.workerProbe.Start)
+        self.worker.finished.connect(self.workerProbe.Stop)
+        self.worker.finished.connect(self.workerProbe.deleteLater)
+        # cProfile or stack sampling on both threads, off until asked for
+        self.profiler.Watch("GUI")
+        self.profiler.Watch("Worker", self.thread)
+        # thread names for the trace viewer
+        TRACER.NameThread("GUI")
+        self.thread.started.connect(
+            lambda: TRACER.NameThread("Worker"), Qt.DirectConnection
+        )
+        # event driven or coalescing reads, switched from the diagnostics panel
+        self.diagnostics.read_policy.connect(self.worker.SetReadPolicy)
+        self.worker.read_policy_changed.connect(
+            self.diagnostics.ComboBox_ReadPolicy.setCurrentText
+        )
+        # probe ports on the worker thread, the GUI never waits on a port
+        self.discovery = DiscoveryService()
+        self.discovery.moveToThread(self.thread)
+        self.worker.finished.connect(self.discovery.deleteLater)
         # start the thread
         self.thread.start()
 
@@ -420,45 +557,92 @@ class MainWindow(QWidget):
         self.response.serial_connection.connect(self.serial_connection.response.Process)
 
         # SerialConnection <---> Worker
-        self.serial_connection.request.connect.connect(self.worker.Connect)
-        self.serial_connection.request.disconnect.connect(self.worker.Disconnect)
+        self.serial_connection.request.connect.connect(self.request.Process)
+        self.serial_connection.request.disconnect.connect(self.request.Process)
+        self.request.serial_connect.connect(self.worker.Connect)
+        self.request.serial_disconnect.connect(self.worker.Disconnect)
 
         self.worker.serial_disconnected.connect(
             self.serial_connection.response.disconnected
         )
         self.worker.serial_connected.connect(self.serial_connection.response.connected)
 
-        # worker <---> SerialDataViewer
-        # self.worker.serial_send.connect(self.prompt.serial_data_viewer.ViewDataSent)
-        self.worker.serial_receive.connect(
-            self.prompt.serial_data_viewer.ViewDataReceived
+        # Worker ---> EventBus, queued on the worker thread, delivered per tick
+        self.worker.live_data.connect(self.bus.Publisher(SAMPLES), Qt.DirectConnection)
+        self.worker.serial_cmd_response.connect(
+            lambda request: self.bus.Publish(
+                RESULTS if request.spec.returnsValue else ACKS, request
+            ),
+            Qt.DirectConnection,
         )
         self.worker.serial_status.connect(
-            self.prompt.serial_data_viewer.ViewSerialStatus
+            lambda running: self.bus.Publish(
+                STATE, "connected" if running else "disconnected"
+            ),
+            Qt.DirectConnection,
+        )
+        self.worker.supervisor.lost.connect(
+            lambda error: self.bus.Publish(STATE, "reconnecting"),
+            Qt.DirectConnection,
         )
 
+        # EventBus ---> SerialDataViewer
+        # self.worker.serial_send.connect(self.prompt.serial_data_viewer.ViewDataSent)
+        self.bus.Subscribe(SAMPLES, self.prompt.serial_data_viewer.ViewDataBatch)
+        self.bus.Subscribe(STATE, self.prompt.serial_data_viewer.ViewSerialStates)
+
         # MainWindow ---> Worker
         self.request.terminate_serial.connect(self.worker.Terminate)
 
-        # Mainwindow ---> Prompt
-        self.request.prompt.connect(self.prompt.TextEdit_Prompt.setText)
-        self.response.prompt.connect(self.prompt.TextEdit_Prompt.setText)
-
-        self.serial_connection.request.prompt.connect(
-            self.prompt.TextEdit_Prompt.setText
+        # Mainwindow ---> EventBus ---> Prompt, the newest prompt of a tick wins
+        self.request.prompt.connect(self.bus.Publisher(PROMPTS))
+        self.response.prompt.connect(self.bus.Publisher(PROMPTS))
+        self.serial_connection.request.prompt.connect(self.bus.Publisher(PROMPTS))
+        self.bus.Subscribe(
+            PROMPTS, lambda prompts: self.prompt.TextEdit_Prompt.setText(prompts[-1])
         )
-        self.worker.live_data.connect(self.LCDLiveData)
+        self.bus.Subscribe(SAMPLES, self.LiveSamples)
 
         self.request.reset_progresscounter.connect(self.ResetProgressBar)
         self.dataviewer_liveupdate.connect(
             self.prompt.serial_data_viewer.live_plot_update
         )
+        self.dataviewer_livebatch.connect(
+            self.prompt.serial_data_viewer.live_plot_batch
+        )
+        self.response.settled_weight.connect(
+            self.prompt.serial_data_viewer.HistogramPlot.AddSettled
+        )
 
+        self.discover.connect(self.discovery.Discover)
+        self.discovery.found.connect(self.AutoConnectFound)
+        self.discovery.failed.connect(self.AutoConnectFailed)
         self.autoconnect.connect(self.worker.AutoConnect)
+
+        # Hotplug ---> MainWindow
+        self.hotplug.added.connect(self.DeviceAdded)
+        self.hotplug.removed.connect(self.DeviceRemoved)
+        self.hotplug.Start()
+        self.device_added.connect(self.worker.supervisor.RetryNow)
+        self.device_removed.connect(self.worker.supervisor.Removed)
+
+        # Supervisor ---> MainWindow
+        self.worker.supervisor.lost.connect(self.ConnectionLost)
+        self.worker.supervisor.restored.connect(self.ConnectionRestored)
+        self.worker.supervisor.gave_up.connect(self.ConnectionGaveUp)
         self.worker.autoconnect.connect(self.AutoConnectResult)
 
         self.autoconnect_success.connect(self.serial_connection.response.autoconnected)
 
+        # MainWindow ---> ResultsStore
+        self.response.log_item.connect(self.LogItem)
+        self.response.piece_weight.connect(self.PieceWeightAccepted)
+        self.results.written.connect(self.history.Invalidate)
+
+        # Prompt ---> Diagnostics
+        self.prompt.PButton_Diagnostics.clicked.connect(self.diagnostics.show)
+        self.prompt.PButton_History.clicked.connect(self.history.show)
+
     # setup states
     def setupStates(self):
         self.state_disconnected = QState()
@@ -522,6 +706,9 @@ class MainWindow(QWidget):
 
     def HomePrompt(self):
         cmds, text = ["STARTWEIGH", "CALIBRATE", "TARE"], ""
+        if PRESET_PIECE_WEIGHT:
+            # only a firmware with SETPIECEWEIGHT can skip the weigh
+            cmds.insert(1, "SETPIECEWEIGHT")
         for _, cmd in enumerate(cmds):
             text = text + f"{_+1}) {self.CmdPromptDict[cmd]}\n\n"
         self.CmdPromptDict.update({"HOMEPROMPT": text})
@@ -567,13 +754,24 @@ class MainWindow(QWidget):
 
         if reply == QMessageBox.Yes:
 
+            # queued ahead of Terminate, the worker's profile stops first
+            self.profiler.Stop()
             self.request.terminate_serial.emit()
+            self.hotplug.Stop()
+            self.results.Shutdown()
+            self.exporter.Shutdown()
+            self.metrics.Stop()
             # if self.autoConnectTimer.isActive:
             #    self.autoConnectTimer.stop()
 
             try:
                 if self.prompt.serial_data_viewer.isVisible():
                     self.prompt.serial_data_viewer.close()
+                self.prompt.serial_data_viewer.HistoryPlot.Close()
+                if self.diagnostics.isVisible():
+                    self.diagnostics.close()
+                if self.history.isVisible():
+                    self.history.close()
             except RuntimeError:
                 pass
 
@@ -582,32 +780,34 @@ class MainWindow(QWidget):
         else:
             event.ignore()
 
-    @pyqtSlot(str)
-    def SerialParser(self, serIn):
-        if "-" in serIn:
-            start = serIn.index("-")
-            command = "".join(serIn[start : start + 2])
-            print(command)
-            commandx = self.CmdCommandDict[command]
-            self.process_serial_response.emit(commandx)
+    # one batch of live data lines per bus tick, the display shows the newest
+    @TimedSlot("MainWindow.LiveSamples")
+    def LiveSamples(self, lines: list):
+        samples = []
+        for line in lines:
+            try:
+                samples.append(int(line))
+            except ValueError:
+                pass
+        if not samples:
+            return
+
+        if samples[-1] > 950:
+            self.lcdoutput.setText("ERROR!")
+            self.prompt.TextEdit_Prompt.setText(
+                "ERROR: Too heavy! Maximum Wieght Reached!"
+            )
+        else:
+            self.lcdoutput.setText(f"{samples[-1]:03d} g")
 
-    @pyqtSlot(str)
-    def LCDLiveData(self, serIn):
-        try:
-            rawint = int(serIn)
-            if rawint > 950:
-                self.lcdoutput.setText("ERROR!")
-                self.prompt.TextEdit_Prompt.setText(
-                    "ERROR: Too heavy! Maximum Wieght Reached!"
-                )
-            else:
-                self.lcdoutput.setText(f"{rawint:03d} g")
-                self.progressCounter += 1
-                self.progressbar.setValue(self.progressCounter)
-                self.dataviewer_liveupdate.emit(rawint)
-                # self.lcdoutput.display(f'{rawint}g')
-        except ValueError:
-            pass
+        # only the readings over range are dropped, the rest are recorded
+        valid = [_ for _ in samples if _ <= 950]
+        if not valid:
+            return
+        self.progressCounter += len(valid)
+        self.progressbar.setValue(self.progressCounter)
+        # one plot update for the whole tick, not one per sample
+        self.dataviewer_livebatch.emit(valid)
 
     def ResetProgressBar(self):
         self.progressbar.reset()
@@ -624,15 +824,80 @@ class MainWindow(QWidget):
 
         self.request.prompt.emit(text)
 
-        # while not self.is_connected:
-        avbPorts = QtSerialPort.QSerialPortInfo.availablePorts()
+        # the discovery service answers with found -> autoconnect or failed
+        self.discover.emit()
+
+    # a serial adapter appeared, connect straight away if we are waiting for one
+    @pyqtSlot(str)
+    def DeviceAdded(self, path: str):
+        print(f"[hotplug] added {path}")
+        if self.state_disconnected.active():
+            self.AutoConnect()
+        else:
+            # the supervisor may be waiting for it
+            self.device_added.emit()
+
+    # the adapter of the open port is gone, let the supervisor reconnect
+    @pyqtSlot(str)
+    def DeviceRemoved(self, path: str):
+        print(f"[hotplug] removed {path}")
+        if self.state_disconnected.active():
+            return
+        port = self.worker.port_name
+        if not os.path.isabs(port):
+            port = os.path.join("/dev", port)
+        if not os.path.exists(port):
+            self.device_removed.emit()
+
+    @pyqtSlot(str)
+    def ConnectionLost(self, error: str):
+        self.request.prompt.emit(
+            f"Connection to the scale lost ({error}), reconnecting..."
+        )
+
+    @pyqtSlot(float, int)
+    def ConnectionRestored(self, outage: float, attempts: int):
+        self.request.prompt.emit(f"Reconnected after {outage:.1f} s, resuming.")
+
+    @pyqtSlot(float, int)
+    def ConnectionGaveUp(self, outage: float, attempts: int):
+        self.request.prompt.emit(
+            f"Could not reconnect after {outage:.0f} s ({attempts} attempts)."
+            " Please check the cable and connect again."
+        )
 
-        for p in avbPorts:
-            if f"{p.manufacturer()}" == "Prolific":
-                self.autoconnect.emit(f"{p.portName()}")
-            else:
-                text = "Wieghing Scale Not Detected! Please ensure the device is connected properly and has sufficient power."
-                self.request.prompt.emit(text)
+    # hand the finished item to the writer thread, never waits for the disk
+    @pyqtSlot(object)
+    def LogItem(self, tracker: ItemTracker):
+        item = tracker.Item(
+            scale=self.worker.port_name, product=self.weigh_and_count.Product()
+        )
+        if item is not None:
+            self.results.Record(item)
+
+    # the operator moved on to counting, the weigh is good enough to learn from
+    @pyqtSlot(int)
+    def PieceWeightAccepted(self, pieceWeight: int):
+        product = self.weigh_and_count.Product()
+        if product is None:
+            return
+        learned = self.catalog.Learn(product, pieceWeight)
+        print(f"[catalog] {learned}")
+
+    @pyqtSlot()
+    def AutoConnectFailed(self):
+        # discovery answers up to a handshake later, the operator may have
+        # connected by hand in the meantime
+        if not self.state_disconnected.active():
+            return
+        text = "Wieghing Scale Not Detected! Please ensure the device is connected properly and has sufficient power."
+        self.request.prompt.emit(text)
+
+    @pyqtSlot(str)
+    def AutoConnectFound(self, port: str):
+        if not self.state_disconnected.active():
+            return
+        self.autoconnect.emit(port)
 
     @pyqtSlot(bool)
     def AutoConnectResult(self, result: bool):
@@ -653,6 +918,7 @@ if __name__ == "__main__":
 
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
+    app.setStyleSheet(ApplicationStyleSheet())
     w = MainWindow()
     w.show()
     sys.exit(app.exec_())
@@ -0,0 +1,188 @@
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QGridLayout,
+    QGroupBox,
+    QLineEdit,
+    QPushButton,
+)
+from PyQt5.QtGui import QFont
+from PyQt5.QtCore import QTimer, pyqtSlot, Qt
+
+from time import perf_counter
+
+from wac.diagnostics import TimedSlot
+from wac.scale_manager import ScaleChannel, ScaleManager
+from wac.theme import SetStyleState
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+PADDING = 10
+SPACING = 10
+MARGIN = 10
+COLUMNS = 2
+FRAME_RATE = 10  # dashboard refreshes per second
+
+"""
+MultiScaleDashboard: one compact tile per scale of a ScaleManager with the
+filtered live weight, connection status and sample rate. All tiles are
+refreshed from one timer by reading each channel's ring buffers, no per
+sample signal reaches the GUI thread.
+"""
+
+
+class ScaleTile(QGroupBox):
+    def __init__(self, channel: ScaleChannel, parent=None):
+        super(ScaleTile, self).__init__(parent)
+        self.channel = channel
+        self.lastTotal = 0
+        self.setupUi()
+        self.SetStatus(channel.state)
+
+    def setupUi(self):
+        self.setTitle(self.channel.name)
+
+        lcdFont = QFont("Consolas")
+        lcdFont.setPointSize(28)
+
+        self.Label_Weight = QLabel(self, text=f"{0:03d} g")
+        self.Label_Weight.setFont(lcdFont)
+        self.Label_Weight.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+        self.Label_Status = QLabel(self)
+        self.Label_Status.setObjectName("ScaleStatus")
+        self.Label_Rate = QLabel(self, text="0 samples/s")
+        self.Label_Rate.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+
+        self.grid = QGridLayout()
+        self.grid.setContentsMargins(MARGIN, MARGIN, MARGIN, MARGIN)
+        self.grid.setSpacing(SPACING)
+        self.grid.addWidget(self.Label_Weight, 0, 0, 1, 2)
+        self.grid.addWidget(self.Label_Status, 1, 0)
+        self.grid.addWidget(self.Label_Rate, 1, 1)
+        self.setLayout(self.grid)
+
+    def SetStatus(self, status: str) -> None:
+        self.Label_Status.setText(status.capitalize())
+        SetStyleState(self.Label_Status, "connection", status)
+
+    # called once per frame with the seconds since the previous frame
+    def Refresh(self, elapsed: float) -> None:
+        weight = self.channel.filtered.Last()
+        if weight is not None:
+            self.Label_Weight.setText(f"{round(weight):03d} g")
+
+        total = self.channel.raw.Total()
+        rate = (total - self.lastTotal) / elapsed if elapsed else 0
+        self.lastTotal = total
+        self.Label_Rate.setText(f"{rate:.0f} samples/s")
+
+
+class MultiScaleDashboard(QWidget):
+    def __init__(self, manager: ScaleManager, parent=None):
+        super(MultiScaleDashboard, self).__init__(parent)
+        self.manager = manager
+        self.tiles = {}
+        self.lastFrame = perf_counter()
+        self.setupUi()
+
+        for channel in manager:
+            self.AddTile(channel)
+        manager.scale_added.connect(self.AddTile)
+        manager.scale_removed.connect(self.RemoveTile)
+        manager.status.connect(self.SetStatus)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000 // FRAME_RATE)
+        self.timer.timeout.connect(self.Refresh)
+        self.timer.start()
+
+    def setupUi(self):
+        self.setWindowTitle("Scales")
+
+        self.LineEdit_Port = QLineEdit(self)
+        self.LineEdit_Port.setPlaceholderText("Port, e.g. COM6")
+        self.LineEdit_Port.returnPressed.connect(self.AddScale)
+        self.PButton_Add = QPushButton(self, text="Add")
+        self.PButton_Add.clicked.connect(self.AddScale)
+
+        self.PButton_Connect = QPushButton(self, text="Connect All")
+        self.PButton_Connect.clicked.connect(self.manager.ConnectAll)
+        self.PButton_Disconnect = QPushButton(self, text="Disconnect All")
+        self.PButton_Disconnect.clicked.connect(self.manager.DisconnectAll)
+        self.PButton_Tare = QPushButton(self, text="Tare All")
+        self.PButton_Tare.clicked.connect(lambda: self.manager.Request("TARE"))
+        self.PButton_Weigh = QPushButton(self, text="Weigh All")
+        self.PButton_Weigh.clicked.connect(lambda: self.manager.Request("WEIGH"))
+
+        self.hbox = QHBoxLayout()
+        self.hbox.setSpacing(SPACING)
+        self.hbox.addWidget(self.LineEdit_Port)
+        self.hbox.addWidget(self.PButton_Add)
+        self.hbox.addWidget(self.PButton_Connect)
+        self.hbox.addWidget(self.PButton_Disconnect)
+        self.hbox.addWidget(self.PButton_Tare)
+        self.hbox.addWidget(self.PButton_Weigh)
+
+        self.grid = QGridLayout()
+        self.grid.setSpacing(SPACING)
+
+        self.vbox = QVBoxLayout()
+        self.vbox.setContentsMargins(MARGIN, MARGIN, MARGIN, MARGIN)
+        self.vbox.setSpacing(PADDING)
+        self.vbox.addLayout(self.hbox)
+        self.vbox.addLayout(self.grid)
+        self.vbox.addStretch()
+        self.setLayout(self.vbox)
+
+    @pyqtSlot()
+    def AddScale(self):
+        port = self.LineEdit_Port.text().strip()
+        if not port or port in self.manager.channels:
+            return
+        self.manager.Add(port)
+        self.LineEdit_Port.clear()
+
+    @pyqtSlot(object)
+    def AddTile(self, channel: ScaleChannel):
+        tile = ScaleTile(channel, self)
+        self.tiles[channel.name] = tile
+        self.Layout()
+
+    @pyqtSlot(str)
+    def RemoveTile(self, name: str):
+        tile = self.tiles.pop(name, None)
+        if tile is not None:
+            self.grid.removeWidget(tile)
+            tile.deleteLater()
+            self.Layout()
+
+    def Layout(self) -> None:
+        for tile in self.tiles.values():
+            self.grid.removeWidget(tile)
+        for index, tile in enumerate(self.tiles.values()):
+            self.grid.addWidget(tile, index // COLUMNS, index % COLUMNS)
+
+    @pyqtSlot(str, str)
+    def SetStatus(self, name: str, status: str):
+        tile = self.tiles.get(name)
+        if tile is not None:
+            tile.SetStatus(status)
+
+    @pyqtSlot()
+    @TimedSlot("MultiScaleDashboard.Refresh")
+    def Refresh(self):
+        if not self.isVisible():
+            return
+        now = perf_counter()
+        elapsed, self.lastFrame = now - self.lastFrame, now
+        for tile in self.tiles.values():
+            tile.Refresh(elapsed)
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.manager.Shutdown()
+        event.accept()
@@ -6,11 +6,21 @@ from PyQt5.QtWidgets import (
     QGridLayout,
     QGroupBox,
     QPushButton,
+    QComboBox,
+    QProgressBar,
+    QHBoxLayout,
 )
-from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QTimer
+
+import time
 
 from wac.command_button import Command
-from wac.router import Router
+from wac.diagnostics import TimedSlot
+from wac.export import FORMATS, Exporter, SampleSource
+from wac.histogram import FixedBinHistogram
+from wac.history import MinMaxPyramid
+from wac.paths import DataPath
+from wac.router import Route, Router
 
 import sys
 from matplotlib.pyplot import text
@@ -38,14 +48,11 @@ class Request(Router):
         super(Request, self).__init__(*args, **kwargs)
         self.setObjectName("Prompt_Request")
 
-        self.route = {
-            "OPENVIEWER": self.OpenViewer,
-            "CLOSEVIEWER": self.CloseViewer,
-        }
-
+    @Route("OPENVIEWER")
     def OpenViewer(self, cmd: Command) -> None:
         self.viewer_open.emit(cmd)
 
+    @Route("CLOSEVIEWER")
     def CloseViewer(self, cmd: Command) -> None:
         self.viewer_close.emit(cmd)
 
@@ -63,14 +70,11 @@ class Response(Router):
         super(Response, self).__init__(*args, **kwargs)
         self.setObjectName("Prompt_Response")
 
-        self.route = {
-            "OPENVIEWER": self.OpenViewer,
-            "CLOSEVIEWER": self.CloseViewer,
-        }
-
+    @Route("OPENVIEWER")
     def OpenViewer(self, cmd: Command) -> None:
         self.viewer_opened.emit(cmd)
 
+    @Route("CLOSEVIEWER")
     def CloseViewer(self, cmd: Command) -> None:
         self.viewer_closed.emit(cmd)
 
@@ -82,12 +86,12 @@ class PromptWidget(QWidget):
 
     """The constructor."""
 
-    def __init__(self, parent=None):
+    def __init__(self, exporter: Exporter = None, parent=None):
         super(PromptWidget, self).__init__(parent)
         self.request = Request(parent=parent)
         self.response = Response(parent=parent)
 
-        self.serial_data_viewer = SerialDataViewer()
+        self.serial_data_viewer = SerialDataViewer(exporter=exporter)
 
         self.setupUi()
 
@@ -109,6 +113,8 @@ class PromptWidget(QWidget):
             checked=False,
             checkable=True,
         )
+        self.PButton_Diagnostics = QPushButton(self, text="Launch Diagnostics")
+        self.PButton_History = QPushButton(self, text="Item History")
 
         # Grid Layout
         self.vbox = QVBoxLayout()
@@ -116,6 +122,8 @@ class PromptWidget(QWidget):
         self.vbox.setSpacing(PADDING)
         self.vbox.addWidget(self.TextEdit_Prompt)
         self.vbox.addWidget(self.PButton_SerialDataViewer)
+        self.vbox.addWidget(self.PButton_Diagnostics)
+        self.vbox.addWidget(self.PButton_History)
 
         self.GBox_Prompt = QGroupBox(self, title="Prompt")
         self.GBox_Prompt.setLayout(self.vbox)
@@ -161,12 +169,250 @@ class LivePlotter(QWidget):
         self.setStyleSheet("border-radius: 3px;")
 
     @pyqtSlot(int)
+    @TimedSlot("LivePlotter.update")
     def update(self, rawInt):
-        print(rawInt)
         self.data[:-1] = self.data[1:]
         self.data[-1] = rawInt
         self.curve.setData(self.data)
 
+    # a batch of samples, shifted in at once and drawn once
+    @pyqtSlot(object)
+    @TimedSlot("LivePlotter.Extend")
+    def Extend(self, samples: list):
+        n = min(len(samples), len(self.data))
+        if not n:
+            return
+        self.data[:-n] = self.data[n:]
+        self.data[-n:] = samples[-n:]
+        self.curve.setData(self.data)
+
+
+"""
+HistoryBrowser: pan and zoom across everything recorded this session.
+Live samples are pushed into a MinMaxPyramid on disk, every redraw reads only
+the pyramid level that matches the visible range. Export writes the raw
+samples of the whole session on the exporter's thread.
+"""
+
+
+class HistoryBrowser(QWidget):
+
+    REFRESH = 1000  # ms between redraws while following the live edge
+
+    def __init__(
+        self, history: MinMaxPyramid = None, exporter: Exporter = None, parent=None
+    ):
+        super(HistoryBrowser, self).__init__(parent)
+        self.history = history if history is not None else MinMaxPyramid()
+        # the application's exporter is shared, one export at a time app wide
+        self.ownExporter = exporter is None
+        self.exporter = exporter or Exporter(parent=self)
+        self.exporting = False  # the running export is this browser's
+        self.setupUi()
+
+        self.myPlot.sigXRangeChanged.connect(self.Refresh)
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.REFRESH)
+        self.timer.timeout.connect(self.Follow)
+        self.timer.start()
+
+    def setupUi(self):
+        self.verticalLayout = QVBoxLayout()
+        pen = pg.mkPen(color="r")
+        self.win = pg.GraphicsLayoutWidget()
+        self.myPlot = self.win.addPlot()
+        self.myPlot.setYRange(0, 1000)
+        self.myPlot.setMouseEnabled(x=True, y=False)
+        self.myPlot.disableAutoRange()
+        self.curve = self.myPlot.plot(pen=pen)
+
+        self.PButton_Follow = QPushButton(
+            self, text="Follow Live", checkable=True, checked=True
+        )
+        self.PButton_ShowAll = QPushButton(self, text="Show All")
+        self.PButton_ShowAll.clicked.connect(self.ShowAll)
+
+        self.ComboBox_Format = QComboBox(self)
+        self.ComboBox_Format.addItems(FORMATS)
+        self.PButton_Export = QPushButton(self, text="Export Session")
+        self.PButton_Export.clicked.connect(self.Export)
+        self.ProgressBar_Export = QProgressBar(self)
+        self.exporter.progress.connect(self.ExportProgress)
+        self.exporter.finished.connect(self.ExportDone)
+        self.exporter.cancelled.connect(self.ExportDone)
+        self.exporter.failed.connect(self.ExportDone)
+
+        self.hbox_export = QHBoxLayout()
+        self.hbox_export.addWidget(self.ComboBox_Format)
+        self.hbox_export.addWidget(self.PButton_Export)
+        self.hbox_export.addWidget(self.ProgressBar_Export)
+
+        self.verticalLayout.addWidget(self.win)
+        self.verticalLayout.addWidget(self.PButton_Follow)
+        self.verticalLayout.addWidget(self.PButton_ShowAll)
+        self.verticalLayout.addLayout(self.hbox_export)
+        self.setLayout(self.verticalLayout)
+
+    @pyqtSlot(int)
+    def update(self, rawInt):
+        self.history.Push(rawInt)
+
+    @pyqtSlot(object)
+    def Extend(self, samples: list):
+        self.history.Extend(samples)
+
+    @pyqtSlot()
+    @TimedSlot("HistoryBrowser.Refresh")
+    def Refresh(self):
+        start, stop = self.myPlot.viewRange()[0]
+        maxPoints = max(self.win.width(), 100)
+        x, y = self.history.Envelope(start, stop + 1, maxPoints)
+        self.curve.setData(x, y)
+
+    @pyqtSlot()
+    def Follow(self):
+        if not self.isVisible() or not self.PButton_Follow.isChecked():
+            return
+        start, stop = self.myPlot.viewRange()[0]
+        width = max(stop - start, 1000)
+        end = len(self.history)
+        self.myPlot.setXRange(max(end - width, 0), end, padding=0)
+
+    @pyqtSlot()
+    def ShowAll(self):
+        self.PButton_Follow.setChecked(False)
+        self.myPlot.setXRange(0, max(len(self.history), 1), padding=0)
+
+    @pyqtSlot()
+    def Export(self):
+        # buffered samples go to the file first, the export reads the file
+        self.history.Flush()
+        source = SampleSource(self.history.path)
+        path = self.exporter.Export(source, self.ComboBox_Format.currentText())
+        if path is None:
+            self.PButton_Export.setToolTip("An export is already running")
+            return
+        self.exporting = True
+        self.PButton_Export.setEnabled(False)
+        self.ProgressBar_Export.reset()
+
+    @pyqtSlot(int, int)
+    def ExportProgress(self, done: int, total: int):
+        if not self.exporting:
+            return
+        self.ProgressBar_Export.setMaximum(max(total, 1))
+        self.ProgressBar_Export.setValue(done)
+
+    @pyqtSlot(str)
+    def ExportDone(self, result: str):
+        if not self.exporting:
+            return
+        self.exporting = False
+        self.PButton_Export.setEnabled(True)
+        self.PButton_Export.setToolTip(result)
+
+    def Close(self):
+        self.timer.stop()
+        if self.ownExporter:
+            self.exporter.Shutdown()
+        self.history.Close()
+
+
+"""
+HistogramPanel: distribution of settled weights and of live noise for the
+current session. Live samples are queued and added to the counters as one
+batch per frame, redraws happen at FRAME_RATE and only when something changed.
+Live noise is each sample's deviation from the mean of its batch.
+"""
+
+
+class HistogramPanel(QWidget):
+
+    FRAME_RATE = 4  # redraws per second
+
+    def __init__(self, parent=None):
+        super(HistogramPanel, self).__init__(parent)
+        self.settled = FixedBinHistogram(low=0, high=1000, bins=200)
+        self.noise = FixedBinHistogram(low=-10, high=10, bins=40)
+        self.pending = []
+        self.dirty = False
+        self.setupUi()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000 // self.FRAME_RATE)
+        self.timer.timeout.connect(self.Redraw)
+        self.timer.start()
+
+    def setupUi(self):
+        self.verticalLayout = QVBoxLayout()
+        brush = pg.mkBrush(color="r")
+        self.win = pg.GraphicsLayoutWidget()
+        self.settledPlot = self.win.addPlot(title="Settled Weight (g)")
+        self.win.nextRow()
+        self.noisePlot = self.win.addPlot(title="Live Noise (g)")
+        self.settledCurve = self.settledPlot.plot(
+            self.settled.edges, self.settled.Bins(), stepMode=True, brush=brush
+        )
+        self.noiseCurve = self.noisePlot.plot(
+            self.noise.edges, self.noise.Bins(), stepMode=True, brush=brush
+        )
+        self.settledCurve.setFillLevel(0)
+        self.noiseCurve.setFillLevel(0)
+
+        self.PButton_Reset = QPushButton(self, text="Reset Session")
+        self.PButton_Reset.clicked.connect(self.Reset)
+        self.PButton_Export = QPushButton(self, text="Export")
+        self.PButton_Export.clicked.connect(self.Export)
+        self.Label_Export = QLabel(self, text="")
+
+        self.verticalLayout.addWidget(self.win)
+        self.verticalLayout.addWidget(self.PButton_Reset)
+        self.verticalLayout.addWidget(self.PButton_Export)
+        self.verticalLayout.addWidget(self.Label_Export)
+        self.setLayout(self.verticalLayout)
+
+    @pyqtSlot(int)
+    def update(self, rawInt):
+        self.pending.append(rawInt)
+
+    @pyqtSlot(object)
+    def Extend(self, samples: list):
+        self.pending.extend(samples)
+
+    @pyqtSlot(int)
+    def AddSettled(self, weight):
+        self.settled.Add((weight,))
+        self.dirty = True
+
+    @pyqtSlot()
+    @TimedSlot("HistogramPanel.Redraw")
+    def Redraw(self):
+        if self.pending:
+            batch, self.pending = np.asarray(self.pending), []
+            self.noise.Add(batch - batch.mean())
+            self.dirty = True
+
+        if self.dirty and self.isVisible():
+            self.settledCurve.setData(self.settled.edges, self.settled.Bins())
+            self.noiseCurve.setData(self.noise.edges, self.noise.Bins())
+            self.dirty = False
+
+    @pyqtSlot()
+    def Reset(self):
+        self.pending = []
+        self.settled.Reset()
+        self.noise.Reset()
+        self.dirty = True
+
+    @pyqtSlot()
+    def Export(self):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        settledPath = DataPath("histograms", f"{stamp}-settled.csv")
+        noisePath = DataPath("histograms", f"{stamp}-noise.csv")
+        self.settled.Export(settledPath)
+        self.noise.Export(noisePath)
+        self.Label_Export.setText(f"Exported to {settledPath}")
+
 
 """
 SerialDataViewer Class: enables viewing of the serial input, output and status
@@ -197,27 +443,45 @@ class SerialDataViewer(QWidget):
         "CONNECTED": "[SerialIO][Connect] Connected",
         "DISCONNECTED": "[SerialIO][Disconnect] Disconnected",
         "TERMINATED": "[SerialIO][Terminate] Terminated",
+        "RECONNECTING": "[SerialIO][Supervisor] Reconnecting",
     }
 
     viewer_closed = pyqtSignal()
 
     live_plot_update = pyqtSignal(int)
+    live_plot_batch = pyqtSignal(object)  # list of samples, one bus tick
 
-    def __init__(self, parent=None):
+    def __init__(self, exporter: Exporter = None, parent=None):
         super(SerialDataViewer, self).__init__(parent)
+        self.exporter = exporter
         self.setupUi()
         self.live_plot_update.connect(self.LivePlot.update)
+        self.live_plot_update.connect(self.HistoryPlot.update)
+        self.live_plot_update.connect(self.HistogramPlot.update)
+        self.live_plot_batch.connect(self.LivePlot.Extend)
+        self.live_plot_batch.connect(self.HistoryPlot.Extend)
+        self.live_plot_batch.connect(self.HistogramPlot.Extend)
 
     def setupUi(self):
         """Serial output Text box"""
         self.TextEdit_SerialStatus = QTextEdit(readOnly=True)
         self.LivePlot = LivePlotter()
         self.LivePlot.setMaximumSize(300, 300)
+        self.HistoryPlot = HistoryBrowser(exporter=self.exporter)
+        self.HistoryPlot.setMinimumSize(300, 300)
+        self.HistogramPlot = HistogramPanel()
+        self.HistogramPlot.setMinimumSize(300, 300)
         self.TextEdit_DataReceived = QTextEdit(readOnly=True)
 
         self.Label_SerialSend = QLabel(text="Live Plot")
         self.Label_SerialSend.setAlignment(Qt.AlignCenter)
 
+        self.Label_History = QLabel(text="History")
+        self.Label_History.setAlignment(Qt.AlignCenter)
+
+        self.Label_Histogram = QLabel(text="Histogram")
+        self.Label_Histogram.setAlignment(Qt.AlignCenter)
+
         self.Label_SerialReceive = QLabel(text="Receive")
         self.Label_SerialReceive.setAlignment(Qt.AlignCenter)
 
@@ -231,6 +495,12 @@ class SerialDataViewer(QWidget):
         self.vbox.addWidget(self.Label_SerialSend)
         self.vbox.addWidget(self.LivePlot)
 
+        self.vbox.addWidget(self.Label_History)
+        self.vbox.addWidget(self.HistoryPlot)
+
+        self.vbox.addWidget(self.Label_Histogram)
+        self.vbox.addWidget(self.HistogramPlot)
+
         self.vbox.addWidget(self.Label_SerialReceive)
         self.vbox.addWidget(self.TextEdit_DataReceived)
 
@@ -242,6 +512,7 @@ class SerialDataViewer(QWidget):
         self.live_plot_update.emit(serSend)
 
     @pyqtSlot(str)
+    @TimedSlot("SerialDataViewer.ViewDataReceived")
     def ViewDataReceived(self, serRec: str):
         self.TextEdit_DataReceived.append(serRec)
 
@@ -250,6 +521,15 @@ class SerialDataViewer(QWidget):
         text = self.STATUS["CONNECTED"] if serStat else self.STATUS["DISCONNECTED"]
         self.TextEdit_SerialStatus.append(text)
 
+    # EventBus batches
+    @TimedSlot("SerialDataViewer.ViewDataBatch")
+    def ViewDataBatch(self, lines: list):
+        self.TextEdit_DataReceived.append("".join(lines).rstrip("\r\n"))
+
+    def ViewSerialStates(self, states: list):
+        for state in states:
+            self.TextEdit_SerialStatus.append(self.STATUS[state.upper()])
+
     def closeEvent(self, event):
         self.viewer_closed.emit()
         event.accept()
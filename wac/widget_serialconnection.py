@@ -9,29 +9,14 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import QStateMachine, pyqtSignal, pyqtSlot, QState, Qt
 
 from wac.command_button import Command, MultiCommandButton
-from wac.router import Router
+from wac.router import Route, Router
 from wac.command_button import SerialCommands
+from wac.theme import SetStyleState
 
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
-QSS_CONNECT = """
-QPushButton {
-    background-color: green;
-    color: white;      
-    font-size: 16px;
-}
-"""
-
-QSS_DISCONNECT = """
-QPushButton {
-    background-color: red;
-    color: white;
-    font-size: 16px;
-}
-"""
-
 PADDING = 10
 SPACING = 10
 MARGIN = 10
@@ -52,15 +37,12 @@ class Request(Router):
         super(Request, self).__init__(*args, **kwargs)
         self.setObjectName("SerialConnection_Request")
 
-        self.route = {
-            "CONNECT": self.Connect,
-            "DISCONNECT": self.Disconnect,
-        }
-
+    @Route("CONNECT")
     def Connect(self, cmd: Command) -> None:
         self.connect.emit(cmd)
         print("[serial request] Connect button")
 
+    @Route("DISCONNECT")
     def Disconnect(self, cmd: Command) -> None:
         self.disconnect.emit(cmd)
 
@@ -79,14 +61,11 @@ class Response(Router):
         super(Response, self).__init__(*args, **kwargs)
         self.setObjectName("SerialConnection_Response")
 
-        self.route = {
-            "CONNECT": self.Connect,
-            "DISCONNECT": self.Disconnect,
-        }
-
+    @Route("CONNECT")
     def Connect(self, cmd: Command) -> None:
         self.connected.emit()
 
+    @Route("DISCONNECT")
     def Disconnect(self, cmd: Command) -> None:
         self.disconnected.emit()
 
@@ -171,14 +150,14 @@ class SerialConnectionWidget(QWidget):
     @pyqtSlot()
     def EntryDisconnected(self):
         self.Connection_Button.SetDefaultCmd("Connect")
-        self.Connection_Button.setStyleSheet(QSS_DISCONNECT)
+        SetStyleState(self.Connection_Button, "connection", "disconnected")
         self.Connection_Button.setEnabled(True)
         self.Connection_Button.ConfigureButton()
 
     @pyqtSlot()
     def EntryConnected(self):
         self.Connection_Button.NextCommand()
-        self.Connection_Button.setStyleSheet(QSS_CONNECT)
+        SetStyleState(self.Connection_Button, "connection", "connected")
         self.Connection_Button.setEnabled(True)
         self.Connection_Button.ConfigureButton()
 
@@ -1,6 +1,8 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QGridLayout, QGroupBox
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QGridLayout, QGroupBox, QComboBox
 from PyQt5.QtCore import QStateMachine, pyqtSignal, pyqtSlot, QState
 
+from wac.catalog import ProductCatalog
+from wac.command_registry import PRESET_PIECE_WEIGHT
 from wac.command_button import (
     Command,
     CommandButton,
@@ -9,8 +11,9 @@ from wac.command_button import (
     WeighCommands,
     CountCommands,
     ResetAndLogCommands,
+    ProductCommands,
 )
-from wac.router import Router
+from wac.router import Route, Router
 
 PADDING = 10
 SPACING = 10
@@ -27,45 +30,47 @@ class Request(Router):
     def __init__(self, *args, **kwargs):
         super(Request, self).__init__(*args, **kwargs)
         self.setObjectName("WeighAndCount_Request")
-        self.route = {
-            "STARTWEIGH": self.StartWeigh,
-            "STARTCOUNT": self.StartCount,
-            "FINISH": self.Finish,
-            "WEIGH": self.Weigh,
-            "REWEIGH": self.ReWeigh,
-            "COUNT": self.Count,
-            "RECOUNT": self.ReCount,
-            "RESET": self.Reset,
-            "LOGITEM": self.LogItem,
-        }
 
+    @Route("STARTWEIGH")
     def StartWeigh(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
+    @Route("STARTCOUNT")
     def StartCount(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
+    @Route("FINISH")
     def Finish(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
+    @Route("WEIGH")
     def Weigh(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
+    @Route("REWEIGH")
     def ReWeigh(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
+    @Route("COUNT")
     def Count(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
+    @Route("RECOUNT")
     def ReCount(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
+    @Route("RESET")
     def Reset(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
+    @Route("LOGITEM")
     def LogItem(self, cmd: Command) -> None:
         self.command.emit(cmd)
 
+    @Route("SETPIECEWEIGHT")
+    def SetPieceWeight(self, cmd: Command) -> None:
+        self.command.emit(cmd)
+
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
@@ -76,50 +81,55 @@ class Response(Router):
     weigh_and_count_finished = pyqtSignal()
     initiated = pyqtSignal()
     reset_state = pyqtSignal()
+    item_logged = pyqtSignal()
+    piece_weight_set = pyqtSignal()
 
     def __init__(self, *args, **kwargs):
         super(Response, self).__init__(*args, **kwargs)
         self.setObjectName("WeighAndCount_Response")
 
-        self.route = {
-            "STARTWEIGH": self.StartWeigh,
-            "STARTCOUNT": self.StartCount,
-            "FINISH": self.Finish,
-            "WEIGH": self.Weigh,
-            "REWEIGH": self.ReWeigh,
-            "COUNT": self.Count,
-            "RECOUNT": self.ReCount,
-            "RESET": self.Reset,
-            "LOGITEM": self.LogItem,
-        }
-
+    @Route("STARTWEIGH")
     def StartWeigh(self, cmd: Command) -> None:
         self.next_state.emit()
 
+    @Route("STARTCOUNT")
     def StartCount(self, cmd: Command) -> None:
         self.next_state.emit()
 
+    @Route("FINISH")
     def Finish(self, cmd: Command) -> None:
         self.next_state.emit()
         self.weigh_and_count_finished.emit()
 
+    @Route("WEIGH")
     def Weigh(self, cmd: Command) -> None:
         self.next_state.emit()
 
+    @Route("REWEIGH")
     def ReWeigh(self, cmd: Command) -> None:
         cmd.EnableButton()
 
+    @Route("COUNT")
     def Count(self, cmd: Command) -> None:
         self.next_state.emit()
 
+    @Route("RECOUNT")
     def ReCount(self, cmd: Command) -> None:
         cmd.EnableButton()
 
+    @Route("RESET")
     def Reset(self, cmd: Command) -> None:
         self.reset_state.emit()
 
+    # the item is stored by the main window, log it once
+    @Route("LOGITEM")
     def LogItem(self, cmd: Command) -> None:
-        pass
+        self.item_logged.emit()
+
+    # the scale has the catalog's piece weight, skip weighing
+    @Route("SETPIECEWEIGHT")
+    def SetPieceWeight(self, cmd: Command) -> None:
+        self.piece_weight_set.emit()
 
 
 # ------------------------------------------------------------------------------
@@ -131,14 +141,16 @@ class WeighAndCountWidget(QWidget):
 
     """The constructor."""
 
-    def __init__(self, parent=None):
+    def __init__(self, catalog: ProductCatalog = None, parent=None):
         super(WeighAndCountWidget, self).__init__(parent)
 
+        self.catalog = catalog if catalog is not None else ProductCatalog()
         self.request = Request(parent=parent)
         self.response = Response(parent=parent)
 
         self.setupUi()
         self.response.reset_state.connect(self.ResetStateSignal)
+        self.response.item_logged.connect(self.Log_Button.DisableButton)
         self.setupStates()
         self.machine.start()
 
@@ -171,10 +183,20 @@ class WeighAndCountWidget(QWidget):
         self.Log_Button = CommandButton(cmd=cmd_log)
         self.Log_Button.ConfigureButton()
 
+        # products with a known piece weight go straight to counting
+        cmdList = self.ConnectButtons(ProductCommands(parent=self))
+        self.cmd_setPieceWeight = cmdList[0]
+        self.ComboBox_Product = QComboBox(self)
+        self.ComboBox_Product.setEditable(True)
+        self.ComboBox_Product.lineEdit().setPlaceholderText("Product (SKU)")
+        self.ComboBox_Product.activated.connect(self.ProductChosen)
+        self.FillProducts()
+
         self.vbox = QVBoxLayout()
         self.vbox.setContentsMargins(MARGIN, MARGIN, MARGIN, MARGIN)
         self.vbox.setSpacing(PADDING)
 
+        self.vbox.addWidget(self.ComboBox_Product)
         [self.vbox.addWidget(btn) for btn in self.findChildren(MultiCommandButton)]
         self.vbox.addWidget(self.Log_Button)
         self.vbox.addWidget(self.Reset_Button)
@@ -200,26 +222,57 @@ class WeighAndCountWidget(QWidget):
             cmd.cmd_signal.connect(self.request.Process)
         return cmd_list
 
+    def FillProducts(self) -> None:
+        current = self.ComboBox_Product.currentText()
+        self.ComboBox_Product.clear()
+        self.ComboBox_Product.addItems([""] + self.catalog.Skus())
+        self.ComboBox_Product.setCurrentText(current)
+
+    # the SKU of the item being weighed and counted, None without one
+    def Product(self) -> str:
+        return self.ComboBox_Product.currentText().strip() or None
+
+    # a known product sends its piece weight if the firmware takes one, a new
+    # one is weighed as usual and learns its piece weight at Start Count
+    @pyqtSlot(int)
+    def ProductChosen(self, index: int):
+        if not PRESET_PIECE_WEIGHT or not self.state_start.active():
+            return
+        pieceWeight = self.catalog.PieceWeight(self.Product())
+        # parts under 0.5 g round to 0, the scale would divide by it
+        if pieceWeight is None or pieceWeight <= 0:
+            return
+        self.ComboBox_Product.setEnabled(False)
+        self.cmd_setPieceWeight.argument = str(pieceWeight)
+        self.cmd_setPieceWeight.EmitCommand()
+
     # setup states
     def setupStates(self):
         self.state_start = QState()
+        self.state_preset = QState()
         self.state_weigh = QState()
         self.state_reweigh = QState()
         self.state_count = QState()
         self.state_recount = QState()
 
         self.state_start.addTransition(self.response.next_state, self.state_weigh)
+        self.state_start.addTransition(
+            self.response.piece_weight_set, self.state_preset
+        )
+        self.state_preset.addTransition(self.response.next_state, self.state_count)
         self.state_weigh.addTransition(self.response.next_state, self.state_reweigh)
         self.state_reweigh.addTransition(self.response.next_state, self.state_count)
         self.state_count.addTransition(self.response.next_state, self.state_recount)
         self.state_recount.addTransition(self.response.next_state, self.state_start)
 
+        self.state_preset.addTransition(self.Reset_Button.clicked, self.state_start)
         self.state_weigh.addTransition(self.Reset_Button.clicked, self.state_start)
         self.state_reweigh.addTransition(self.Reset_Button.clicked, self.state_start)
         self.state_count.addTransition(self.Reset_Button.clicked, self.state_start)
         self.state_recount.addTransition(self.Reset_Button.clicked, self.state_start)
 
         self.state_start.entered.connect(self.EntryStart)
+        self.state_preset.entered.connect(self.EntryPreset)
         self.state_weigh.entered.connect(self.EntryWeigh)
         self.state_reweigh.entered.connect(self.EntryReWeigh)
         self.state_count.entered.connect(self.EntryCount)
@@ -228,6 +281,7 @@ class WeighAndCountWidget(QWidget):
 
         self.machine = QStateMachine()
         self.machine.addState(self.state_start)
+        self.machine.addState(self.state_preset)
         self.machine.addState(self.state_weigh)
         self.machine.addState(self.state_reweigh)
         self.machine.addState(self.state_count)
@@ -242,11 +296,28 @@ class WeighAndCountWidget(QWidget):
         self.Log_Button.ConfigureButton()
         self.Log_Button.setEnabled(False)
         self.Reset_Button.setEnabled(False)
+        self.ComboBox_Product.setEnabled(True)
+        self.FillProducts()
         self.ConfigureButtons()
 
+    # piece weight from the catalog, start counting without weighing
+    @pyqtSlot()
+    def EntryPreset(self):
+        self.response.initiated.emit()
+        self.Protocol_Button.SetDefaultCmd("Start Count")
+        self.Protocol_Button.setEnabled(False)
+        self.Weigh_Button.setEnabled(False)
+        self.Count_Button.setEnabled(False)
+        self.Log_Button.setEnabled(False)
+        self.Reset_Button.setEnabled(True)
+        self.ComboBox_Product.setEnabled(False)
+        self.ConfigureButtons()
+        self.Protocol_Button.ForwardSignal()
+
     @pyqtSlot()
     def EntryWeigh(self):
         self.response.initiated.emit()
+        self.ComboBox_Product.setEnabled(False)
         self.Protocol_Button.NextCommand()
         self.Protocol_Button.setEnabled(False)
         self.Weigh_Button.setEnabled(True)
@@ -284,20 +355,16 @@ class WeighAndCountWidget(QWidget):
         self.Weigh_Button.setEnabled(False)
         self.Count_Button.setEnabled(True)
         # self.Log_Button.setText("Log Item")
-        self.Log_Button.setEnabled(False)
+        # counted, the item can be logged now
+        self.Log_Button.setEnabled(True)
         self.Reset_Button.setEnabled(True)
         self.ConfigureButtons()
 
+    # finished, the next item starts from the first command of every button,
+    # whether it was weighed or came from the catalog
     @pyqtSlot()
     def ResetState(self):
-        self.Protocol_Button.NextCommand()
-        self.Weigh_Button.NextCommand()
-        self.Count_Button.NextCommand()
-
-        self.Protocol_Button.setEnabled(True)
-        self.Weigh_Button.setEnabled(False)
-        self.Count_Button.setEnabled(False)
-        self.ConfigureButtons()
+        self.ResetStateSignal()
 
     @pyqtSlot()
     def ResetStateSignal(self):